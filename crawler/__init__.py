@@ -3,5 +3,15 @@ from .crawling import *
 from .filtering import *
 from .openreview_crawling import *
 from .citation import *
+from .citation_cache import *
+from .store import *
+from .state import *
+from .crawl_cache import *
+from .rate_limit import *
+from .harvest import *
+from .planner import *
+from .record import *
+from .endpoints import *
+from .venue import *
 from .utils import *
 from .parsing import *
\ No newline at end of file
@@ -0,0 +1,166 @@
+import argparse
+import contextlib
+import io
+import json
+import time
+from typing import Any, Callable
+
+from crawler.citation import sort_citation_crossref, sort_citation_openalex
+from crawler.crawling import crawling_basic, main_crawling
+from crawler.openreview_crawling import crawling_openreview_v2
+from crawler.rate_limit import get_rate_limiter, reset_rate_limiters
+from crawler.replay import Cassette, StandInServer
+
+BENCHMARK_KEYWORDS = {
+    "main": [["retrieval augmented generation", "retrieval-augmented generation", "RAG"], ["question answering"]],
+    "optional": ["benchmark", "survey"],
+}
+BENCHMARK_ARXIV_QUERY = 'all:"retrieval augmented generation"'
+BENCHMARK_OPENREVIEW_QUERY = "retrieval augmented generation"
+
+
+def measure(server: StandInServer,
+            name: str,
+            run: Callable[[], list],
+            sources: tuple[str, ...],
+            scale: float = 1.0,
+            quiet: bool = True) -> dict[str, Any]:
+    """
+    Runs one benchmark against the stand-in server with fresh rate limiters.
+
+    Args:
+        server: The running, installed stand-in server.
+        name: The benchmark name.
+        run: Runs the crawl and returns the documents.
+        sources: The sources whose requests and limiters are counted.
+        scale: Multiplies the default rate-limit budgets.
+        quiet: Hide what the crawlers print.
+
+    Returns:
+        {"name", "docs", "seconds", "docs_per_sec", "requests", "throttled", "empty",
+         "limiter_requests", "slept"}
+    """
+
+    reset_rate_limiters(scale)
+    server.reset_stats()
+    limiters = [get_rate_limiter(source) for source in sources]
+
+    output = io.StringIO() if quiet else None
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        start = time.perf_counter()
+        documents = run()
+        seconds = time.perf_counter() - start
+
+    docs = len(documents or [])
+    return {
+        "name": name,
+        "docs": docs,
+        "seconds": seconds,
+        "docs_per_sec": docs / seconds if seconds > 0 else 0.0,
+        "requests": sum(server.requests[source] for source in sources),
+        "throttled": sum(server.throttled[source] for source in sources),
+        "empty": sum(server.empty[source] for source in sources),
+        "limiter_requests": sum(limiter.requests for limiter in limiters),
+        "slept": sum(limiter.total_slept for limiter in limiters),
+    }
+
+def run_benchmarks(server: StandInServer,
+                   num: int = 200,
+                   email: str = "benchmark@example.org",
+                   scale: float = 1.0,
+                   only: list[str] | None = None,
+                   quiet: bool = True) -> list[dict[str, Any]]:
+    """
+    Benchmarks the crawlers and citation sorters against a stand-in server.
+
+    Args:
+        server: The running, installed stand-in server.
+        num: The number of documents each crawl asks for.
+        email: The polite-pool email sent to Crossref / OpenAlex.
+        scale: Multiplies the default rate-limit budgets.
+        only: Run only the benchmarks with these names.
+        quiet: Hide what the crawlers print.
+
+    Returns:
+        One result per benchmark, see measure().
+    """
+
+    # The citation sorters get their documents from an untimed arXiv crawl.
+    documents: list = []
+
+    def citation_documents() -> list:
+        if not documents:
+            reset_rate_limiters(max(scale, 100.0))
+            with contextlib.redirect_stdout(io.StringIO()):
+                documents.extend(crawling_basic(BENCHMARK_ARXIV_QUERY, num))
+        return documents
+
+    benchmarks = [
+        ("crawling_basic", ("arxiv",),
+         lambda: crawling_basic(BENCHMARK_ARXIV_QUERY, num)),
+        ("crawling_openreview_v2", ("openreview",),
+         lambda: crawling_openreview_v2(BENCHMARK_OPENREVIEW_QUERY, num, accept=False)),
+        ("main_crawling", ("arxiv",),
+         lambda: main_crawling(BENCHMARK_KEYWORDS, num=num, sort_op="submitted", use_cache=False)),
+        ("main_crawling_shard", ("arxiv",),
+         lambda: main_crawling(BENCHMARK_KEYWORDS, num=num, sort_op="submitted", shard=True)),
+        ("sort_citation_crossref", ("crossref",),
+         lambda: sort_citation_crossref(citation_documents(), email, use_cache=False)),
+        ("sort_citation_openalex", ("openalex",),
+         lambda: sort_citation_openalex(citation_documents(), email, use_cache=False)),
+    ]
+
+    results = []
+    for name, sources, run in benchmarks:
+        if only and name not in only:
+            continue
+        if name.startswith("sort_citation"):
+            citation_documents()
+        results.append(measure(server, name, run, sources, scale=scale, quiet=quiet))
+    return results
+
+def format_results(results: list[dict[str, Any]]) -> str:
+    header = f"{'benchmark':<24}{'docs':>7}{'sec':>9}{'docs/s':>9}{'reqs':>7}{'429s':>6}{'empty':>7}{'slept':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(f"{r['name']:<24}{r['docs']:>7}{r['seconds']:>9.2f}{r['docs_per_sec']:>9.1f}"
+                     f"{r['requests']:>7}{r['throttled']:>6}{r['empty']:>7}{r['slept']:>9.2f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline crawler throughput benchmark against a local stand-in server.")
+    parser.add_argument("--cassette", default=None, help="JSON file of recorded responses")
+    parser.add_argument("--record", action="store_true", help="forward misses to the real APIs and record them")
+    parser.add_argument("--synthetic", type=int, default=None,
+                        help="answer misses with N generated papers per query (default: 1000 without a cassette)")
+    parser.add_argument("--num", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="probability of a 429 response")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every n-th request with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="probability of an empty page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the default rate-limit budgets")
+    parser.add_argument("--email", default="benchmark@example.org")
+    parser.add_argument("--only", action="append", help="benchmark name (repeatable)")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    synthetic = args.synthetic if args.synthetic is not None else (0 if args.cassette or args.record else 1000)
+    server = StandInServer(Cassette(args.cassette), record=args.record, synthetic=synthetic,
+                           latency=args.latency, throttle_every=args.throttle_every,
+                           throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                           empty_rate=args.empty_rate, seed=args.seed)
+
+    with server:
+        results = run_benchmarks(server, num=args.num, email=args.email, scale=args.scale, only=args.only)
+
+    print(format_results(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,87 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawler.citation_cache import CitationCache, get_default_citation_cache
+from crawler.endpoints import DEFAULT_ENDPOINTS, get_endpoint
+from crawler.rate_limit import get_rate_limiter, request_with_limiter
+
+# Defaults only; requests go to get_endpoint("crossref") / get_endpoint("openalex").
+CROSSREF_WORKS_URL = DEFAULT_ENDPOINTS["crossref"]
+OPENALEX_WORKS_URL = DEFAULT_ENDPOINTS["openalex"]
+
+# Number of lookups that may be in flight at the same time.
+DEFAULT_MAX_WORKERS = 8
+
+# Number of DOIs packed into one bulk request. OpenAlex accepts up to 100 OR-ed filter values.
+DEFAULT_BATCH_SIZE = 50
+
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = DEFAULT_MAX_WORKERS) -> requests.Session:
+    """
+    Returns the process-wide pooled session shared by all citation lookups.
+
+    Reusing one session keeps TCP/TLS connections alive between requests instead of
+    paying a new handshake for every title.
+
+    Args:
+        pool_size: The number of keep-alive connections kept per host.
+            Only used when the session is created for the first time.
+
+    Returns:
+        The shared requests.Session.
+    """
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _resolve_cache(cache: CitationCache | None, use_cache: bool) -> CitationCache | None:
+    if not use_cache:
+        return None
+    return cache if cache is not None else get_default_citation_cache()
+
+
 # This function retrieves the citation count for a single paper title at a time.
 # If the paper cannot be found via the Crossref API, it simply returns a citation count of 0.
-def get_citation_crossref(title: str, email: str) -> int:
+def get_citation_crossref(title: str, email: str, session: requests.Session | None = None,
+                          cache: CitationCache | None = None, use_cache: bool = True) -> int:
     """
     Searches for a paper using its title via the Crossref API and retrieves its citation count.
+    The citation cache is consulted first, so a recently resolved title costs no HTTP call.
 
     Args:
         title: The title of the paper.
         email: An argument used for polite pool access.
             Providing an email allows for unrestricted API usage.
+        session: The session used to send the request. Defaults to the shared pooled session.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
 
     Returns:
         The citation count of the paper found using the title.
     """
 
-    base_url = "https://api.crossref.org/works"
+    return _cached_lookup(_fetch_citation_crossref, "crossref", title, email, session,
+                          _resolve_cache(cache, use_cache))
+
+# Returns None instead of 0 on errors so that failures are never written to the cache.
+def _fetch_citation_crossref(title: str, email: str, session: requests.Session | None = None) -> int | None:
+    base_url = get_endpoint("crossref")
 
     params = {
         "query.title": title,
@@ -22,8 +90,11 @@ def get_citation_crossref(title: str, email: str) -> int:
     }
 
     try:
-        # The requests.get() function combines the URL and parameters to request data from the Crossref server.
-        response = requests.get(base_url, params=params)
+        session = session or get_session()
+
+        # session.get() combines the URL and parameters to request data from the Crossref server.
+        # The limiter paces the request and retries it when Crossref throttles us.
+        response = request_with_limiter(session, base_url, get_rate_limiter("crossref"), params=params)
 
         # Check the HTTP status code.
         # If the response is not successful (i.e., 4xx or 5xx error), raise an HTTPError exception.
@@ -49,24 +120,31 @@ def get_citation_crossref(title: str, email: str) -> int:
 
     # Executed when a network error occurs during requests.get(), or when the JSON structure is not as expected.
     except (requests.exceptions.RequestException, KeyError, IndexError):
-        return 0
-
-import requests
+        return None
 
-def get_citation_openalex(title: str, email: str) -> int:
+def get_citation_openalex(title: str, email: str, session: requests.Session | None = None,
+                          cache: CitationCache | None = None, use_cache: bool = True) -> int:
     """
     Searches for the citation count of a paper using its title via the OpenAlex API.
+    The citation cache is consulted first, so a recently resolved title costs no HTTP call.
 
     Args:
         title: The title of the paper.
         email: An argument used for polite pool access.
             Providing an email allows for unrestricted API usage.
+        session: The session used to send the request. Defaults to the shared pooled session.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
 
     Returns:
         The citation count of the paper found using the title.
     """
 
-    base_url = "https://api.openalex.org/works"
+    return _cached_lookup(_fetch_citation_openalex, "openalex", title, email, session,
+                          _resolve_cache(cache, use_cache))
+
+def _fetch_citation_openalex(title: str, email: str, session: requests.Session | None = None) -> int | None:
+    base_url = get_endpoint("openalex")
     params = {
         'search': title,
         'per_page': 1, # Request only the single most relevant result
@@ -74,7 +152,8 @@ def get_citation_openalex(title: str, email: str) -> int:
     }
 
     try:
-        response = requests.get(base_url, params=params)
+        session = session or get_session()
+        response = request_with_limiter(session, base_url, get_rate_limiter("openalex"), params=params)
         response.raise_for_status()  # Handle exceptions when an HTTP error occurs
         data = response.json()
 
@@ -89,10 +168,260 @@ def get_citation_openalex(title: str, email: str) -> int:
 
     except requests.exceptions.RequestException as e:
         print(f"API request error: {e}")
+        return None
+
+
+def _cached_lookup(fetch, source: str, title: str, email: str,
+                   session: requests.Session | None, cache: CitationCache | None) -> int:
+    if cache is not None:
+        cached = cache.get(source, title)
+        if cached is not None:
+            return cached
+
+    return _fetch_and_store(fetch, source, title, email, session, cache)
+
+def _fetch_and_store(fetch, source: str, title: str, email: str,
+                     session: requests.Session | None, cache: CitationCache | None) -> int:
+    citation_count = fetch(title, email, session)
+    if citation_count is None:
         return 0
 
+    if cache is not None:
+        cache.put(source, title, citation_count)
+    return citation_count
+
+
+def _get_citations_concurrently(fetch, source: str, titles: list[str], email: str, max_workers: int,
+                                cache: CitationCache | None) -> list[int]:
+    # Identical titles are looked up only once, and cache hits never reach the thread pool.
+    unique_titles = list(dict.fromkeys(titles))
+    count_by_title = cache.get_many(source, unique_titles) if cache is not None else {}
+    missing_titles = [title for title in unique_titles if title not in count_by_title]
 
-def sort_citation_crossref(document: list[dict[str, str]], email: str) -> list[dict[str, str]]:
+    if missing_titles:
+        session = get_session()
+        workers = max(1, min(max_workers, len(missing_titles)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(
+                lambda title: _fetch_and_store(fetch, source, title, email, session, cache),
+                missing_titles
+            ))
+        count_by_title.update(zip(missing_titles, counts))
+
+    return [count_by_title[title] for title in titles]
+
+def get_citations_crossref(titles: list[str], email: str, max_workers: int = DEFAULT_MAX_WORKERS,
+                           cache: CitationCache | None = None, use_cache: bool = True) -> list[int]:
+    """
+    Retrieves the citation counts of many papers concurrently via the Crossref API.
+
+    Args:
+        titles: The titles of the papers.
+        email: An argument used for polite pool access.
+            Providing an email allows for unrestricted API usage.
+        max_workers: The maximum number of requests in flight at the same time.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
+            Titles found in the cache are not sent to the API.
+
+    Returns:
+        The citation counts, in the same order as `titles`.
+    """
+
+    return _get_citations_concurrently(_fetch_citation_crossref, "crossref", titles, email, max_workers,
+                                       _resolve_cache(cache, use_cache))
+
+
+def get_citations_openalex(titles: list[str], email: str, max_workers: int = DEFAULT_MAX_WORKERS,
+                           cache: CitationCache | None = None, use_cache: bool = True) -> list[int]:
+    """
+    Retrieves the citation counts of many papers concurrently via the OpenAlex API.
+
+    Args:
+        titles: The titles of the papers.
+        email: An argument used for polite pool access.
+            Providing an email allows for unrestricted API usage.
+        max_workers: The maximum number of requests in flight at the same time.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
+            Titles found in the cache are not sent to the API.
+
+    Returns:
+        The citation counts, in the same order as `titles`.
+    """
+
+    return _get_citations_concurrently(_fetch_citation_openalex, "openalex", titles, email, max_workers,
+                                       _resolve_cache(cache, use_cache))
+
+
+_ARXIV_VERSION = re.compile(r"v\d+$")
+_DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:")
+
+def _normalize_doi(doi: str) -> str:
+    doi = str(doi or "").strip().lower()
+    for prefix in _DOI_PREFIXES:
+        if doi.startswith(prefix):
+            return doi[len(prefix):]
+    return doi
+
+def document_dois(doc: dict, include_arxiv: bool = True) -> list[str]:
+    """
+    Collects the DOIs under which a document can be resolved without a title search.
+
+    Args:
+        doc: The document. Its 'doi' and 'arxiv_id' keys are used when present.
+        include_arxiv: Whether to derive the arXiv DataCite DOI (10.48550/arxiv.<id>) from 'arxiv_id'.
+            Crossref does not index these DOIs, OpenAlex does.
+
+    Returns:
+        The normalized DOIs of the document, possibly empty.
+    """
+
+    dois = []
+    if doc.get('doi'):
+        dois.append(_normalize_doi(doc['doi']))
+    if include_arxiv and doc.get('arxiv_id'):
+        arxiv_id = _ARXIV_VERSION.sub("", str(doc['arxiv_id']).strip())
+        dois.append(f"10.48550/arxiv.{arxiv_id}".lower())
+    return dois
+
+
+def _fetch_citations_by_doi_crossref(dois: list[str], email: str, session: requests.Session) -> dict[str, int] | None:
+    # Crossref OR-s repeated filters of the same name.
+    params = {
+        "filter": ",".join(f"doi:{doi}" for doi in dois),
+        "rows": len(dois),
+        "select": "DOI,is-referenced-by-count",
+        "mailto": email
+    }
+
+    try:
+        response = request_with_limiter(session, get_endpoint("crossref"), get_rate_limiter("crossref"), params=params)
+        response.raise_for_status()
+        items = response.json()['message']['items']
+        return {_normalize_doi(item['DOI']): item.get('is-referenced-by-count', 0) for item in items}
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print(f"API request error: {e}")
+        return None
+
+def _fetch_citations_by_doi_openalex(dois: list[str], email: str, session: requests.Session) -> dict[str, int] | None:
+    params = {
+        "filter": "doi:" + "|".join(dois),
+        "per_page": len(dois),
+        "select": "doi,cited_by_count",
+        "mailto": email
+    }
+
+    try:
+        response = request_with_limiter(session, get_endpoint("openalex"), get_rate_limiter("openalex"), params=params)
+        response.raise_for_status()
+        results = response.json().get('results') or []
+        return {_normalize_doi(work['doi']): work.get('cited_by_count', 0) for work in results if work.get('doi')}
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print(f"API request error: {e}")
+        return None
+
+
+def _resolve_citations(document: list[dict], email: str, source: str, fetch_by_doi, fetch_by_title,
+                       include_arxiv: bool, batch_size: int, max_workers: int,
+                       cache: CitationCache | None) -> list[int]:
+    doc_dois = [document_dois(doc, include_arxiv=include_arxiv) for doc in document]
+    unique_dois = list(dict.fromkeys(doi for dois in doc_dois for doi in dois))
+
+    # DOI lookups are cached separately from title lookups of the same source.
+    doi_source = f"{source}-doi"
+    count_by_doi = cache.get_many(doi_source, unique_dois) if cache is not None else {}
+    missing_dois = [doi for doi in unique_dois if doi not in count_by_doi]
+
+    if missing_dois:
+        session = get_session()
+        batches = [missing_dois[i:i + batch_size] for i in range(0, len(missing_dois), batch_size)]
+        workers = max(1, min(max_workers, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for found in executor.map(lambda batch: fetch_by_doi(batch, email, session), batches):
+                if not found:
+                    continue
+                count_by_doi.update(found)
+                if cache is not None:
+                    cache.put_many(doi_source, found)
+
+    counts: list[int | None] = []
+    for dois in doc_dois:
+        hits = [count_by_doi[doi] for doi in dois if doi in count_by_doi]
+        counts.append(max(hits) if hits else None)
+
+    # Only documents that could not be resolved by identifier fall back to the fuzzy title search.
+    unresolved = [i for i, count in enumerate(counts) if count is None]
+    if unresolved:
+        titles = [document[i]["title"] for i in unresolved]
+        title_counts = _get_citations_concurrently(fetch_by_title, source, titles, email, max_workers, cache)
+        for i, count in zip(unresolved, title_counts):
+            counts[i] = count
+
+    return counts
+
+
+def resolve_citations_crossref(document: list[dict[str, str]], email: str,
+                               batch_size: int = DEFAULT_BATCH_SIZE,
+                               max_workers: int = DEFAULT_MAX_WORKERS,
+                               cache: CitationCache | None = None, use_cache: bool = True) -> list[int]:
+    """
+    Retrieves the citation counts of the documents via the Crossref API, many works per request.
+
+    Documents with a 'doi' are resolved in bulk by identifier, `batch_size` DOIs per request.
+    The remaining documents fall back to the concurrent title search.
+
+    Args:
+        document: The list of documents.
+        email: An argument used for polite pool access.
+            Providing an email allows for unrestricted API usage.
+        batch_size: The number of DOIs packed into one request.
+        max_workers: The maximum number of requests in flight at the same time.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
+
+    Returns:
+        The citation counts, in the same order as `document`.
+    """
+
+    return _resolve_citations(document, email, "crossref",
+                              _fetch_citations_by_doi_crossref, _fetch_citation_crossref,
+                              include_arxiv=False, batch_size=batch_size, max_workers=max_workers,
+                              cache=_resolve_cache(cache, use_cache))
+
+def resolve_citations_openalex(document: list[dict[str, str]], email: str,
+                               batch_size: int = DEFAULT_BATCH_SIZE,
+                               max_workers: int = DEFAULT_MAX_WORKERS,
+                               cache: CitationCache | None = None, use_cache: bool = True) -> list[int]:
+    """
+    Retrieves the citation counts of the documents via the OpenAlex API, many works per request.
+
+    Documents with a 'doi' or an 'arxiv_id' are resolved in bulk by identifier, `batch_size` DOIs
+    per request, and skip the fuzzy title search entirely.
+    The remaining documents fall back to the concurrent title search.
+
+    Args:
+        document: The list of documents.
+        email: An argument used for polite pool access.
+            Providing an email allows for unrestricted API usage.
+        batch_size: The number of DOIs packed into one request. At most 100.
+        max_workers: The maximum number of requests in flight at the same time.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
+
+    Returns:
+        The citation counts, in the same order as `document`.
+    """
+
+    return _resolve_citations(document, email, "openalex",
+                              _fetch_citations_by_doi_openalex, _fetch_citation_openalex,
+                              include_arxiv=True, batch_size=min(batch_size, 100), max_workers=max_workers,
+                              cache=_resolve_cache(cache, use_cache))
+
+
+def sort_citation_crossref(document: list[dict[str, str]], email: str,
+                           max_workers: int = DEFAULT_MAX_WORKERS,
+                           cache: CitationCache | None = None, use_cache: bool = True) -> list[dict[str, str]]:
     """
     Sorts the documents by citation count using the Crossref API.
 
@@ -100,20 +429,19 @@ def sort_citation_crossref(document: list[dict[str, str]], email: str) -> list[d
         document: The list of documents to be sorted.
         email: An argument used for polite pool access.
             Providing an email allows for unrestricted API usage.
+        max_workers: The maximum number of citation lookups in flight at the same time.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
 
     Returns:
         The list of documents sorted by citation count.
     """
 
-    title_list = [doc["title"] for doc in document]
-    citation_list = []
-
-    for title in title_list:
-        citation_count = get_citation_crossref(title, email)
-        citation_list.append(citation_count)
+    citation_list = resolve_citations_crossref(document, email, max_workers=max_workers,
+                                              cache=cache, use_cache=use_cache)
 
     print(citation_list)
-    # Zip together title_list and citation_count
+    # Zip together document and citation_list
     paired_list = list(zip(document, citation_list))
 
     # Sort the zipped list in descending order based on the citation count (the second element of each pair).
@@ -126,7 +454,9 @@ def sort_citation_crossref(document: list[dict[str, str]], email: str) -> list[d
 
     return sorted_target_list
 
-def sort_citation_openalex(document: list[dict[str, str]], email: str) -> list[dict[str, str]]:
+def sort_citation_openalex(document: list[dict[str, str]], email: str,
+                           max_workers: int = DEFAULT_MAX_WORKERS,
+                           cache: CitationCache | None = None, use_cache: bool = True) -> list[dict[str, str]]:
     """
     Sorts the documents by citation count using the OpenAlex API.
 
@@ -134,20 +464,19 @@ def sort_citation_openalex(document: list[dict[str, str]], email: str) -> list[d
         document: The list of documents to be sorted.
         email: An argument used for polite pool access.
             Providing an email allows for unrestricted API usage.
+        max_workers: The maximum number of citation lookups in flight at the same time.
+        cache: The citation cache to use. Defaults to the process-wide on-disk cache.
+        use_cache: Whether to read and write the citation cache at all.
 
     Returns:
         The list of documents sorted by citation count.
     """
 
-    title_list = [doc["title"] for doc in document]
-    citation_list = []
-
-    for title in title_list:
-        citation_count = get_citation_openalex(title, email)
-        citation_list.append(citation_count)
+    citation_list = resolve_citations_openalex(document, email, max_workers=max_workers,
+                                              cache=cache, use_cache=use_cache)
 
     print(citation_list)
-    # Zip together title_list and citation_count
+    # Zip together document and citation_list
     paired_list = list(zip(document, citation_list))
 
     # Sort the zipped list in descending order based on the citation count (the second element of each pair).
@@ -0,0 +1,171 @@
+import os
+import sqlite3
+import threading
+import time
+
+from crawler.utils import DEFAULT_CACHE_DIR, normalize_title
+
+DEFAULT_CITATION_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "citations.sqlite3")
+
+
+class CitationCache:
+    """
+    SQLite-backed cache of citation counts keyed by (source, normalized title).
+
+    Sources ending in "-doi" (e.g. "crossref-doi") hold DOI lookups. Their keys are the
+    lowercased DOIs, since normalize_title would drop the punctuation that tells DOIs apart.
+
+    Entries older than `ttl` seconds are treated as missing, and a write that takes the cache
+    above `max_entries` rows evicts the oldest ones, so it never holds more than `max_entries`.
+    The cache is safe to share between the worker threads of the batch lookups.
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_CITATION_CACHE_PATH,
+                 ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 100_000):
+        """
+        Args:
+            path: The SQLite file. Use ":memory:" for a cache that is not persisted.
+            ttl: The number of seconds a citation count stays valid.
+            max_entries: The maximum number of rows kept on disk.
+        """
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS citations ("
+            " source TEXT NOT NULL,"
+            " title_key TEXT NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (source, title_key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS citations_fetched_at ON citations (fetched_at)")
+        self._conn.commit()
+        # Row count tracked per write, so the bound is checked without a COUNT(*) scan per put.
+        self._count = self._conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
+
+    def get(self, source: str, title: str) -> int | None:
+        """
+        Returns the cached citation count, or None when it is missing or expired.
+        """
+
+        return self.get_many(source, [title]).get(title)
+
+    def get_many(self, source: str, titles: list[str]) -> dict[str, int]:
+        """
+        Looks up many titles at once.
+
+        Args:
+            source: The citation source, e.g. "crossref" or "openalex".
+            titles: The titles of the papers, or their DOIs for a "-doi" source.
+
+        Returns:
+            A dictionary from title to citation count containing only the fresh cache hits.
+        """
+
+        keys = {title: _cache_key(source, title) for title in titles}
+        unique_keys = list(set(keys.values()))
+        min_fetched_at = time.time() - self.ttl
+
+        found = {}
+        with self._lock:
+            # Stay below SQLite's limit on the number of bound parameters.
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT title_key, count FROM citations"
+                    f" WHERE source = ? AND fetched_at >= ? AND title_key IN ({placeholders})",
+                    [source, min_fetched_at, *chunk]
+                ).fetchall()
+                found.update(rows)
+
+        return {title: found[key] for title, key in keys.items() if key in found}
+
+    def put(self, source: str, title: str, count: int) -> None:
+        """
+        Stores the citation count of a paper, replacing any previous entry.
+        """
+
+        self.put_many(source, {title: count})
+
+    def put_many(self, source: str, counts: dict[str, int]) -> None:
+        """
+        Stores many citation counts in a single transaction.
+        """
+
+        now = time.time()
+        rows = {_cache_key(source, title): int(count) for title, count in counts.items()}
+        with self._lock:
+            self._count += len(rows) - self._count_existing(source, list(rows))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO citations (source, title_key, count, fetched_at) VALUES (?, ?, ?, ?)",
+                [(source, key, count, now) for key, count in rows.items()]
+            )
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM citations")
+            self._conn.commit()
+            self._count = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
+
+    def _count_existing(self, source: str, keys: list[str]) -> int:
+        existing = 0
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            existing += self._conn.execute(
+                f"SELECT COUNT(*) FROM citations WHERE source = ? AND title_key IN ({placeholders})",
+                [source, *chunk]
+            ).fetchone()[0]
+        return existing
+
+    def _evict(self) -> None:
+        # Expired rows go first, then the oldest rows above max_entries.
+        self._conn.execute("DELETE FROM citations WHERE fetched_at < ?", (time.time() - self.ttl,))
+        # Recounted here, which also corrects for writes of other processes on the same file
+        self._count = self._conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM citations WHERE rowid IN"
+                " (SELECT rowid FROM citations ORDER BY fetched_at LIMIT ?)",
+                (excess,)
+            )
+            self._count = self.max_entries
+
+
+def _cache_key(source: str, text: str) -> str:
+    if source.endswith("-doi"):
+        return str(text or "").strip().lower()
+    return normalize_title(text)
+
+
+_default_cache: CitationCache | None = None
+_default_cache_lock = threading.Lock()
+
+def get_default_citation_cache() -> CitationCache:
+    """
+    Returns the process-wide citation cache stored under DEFAULT_CACHE_DIR.
+    """
+
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CitationCache()
+        return _default_cache
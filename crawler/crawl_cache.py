@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Hashable
+
+from crawler.state import CrawlState
+
+
+@dataclass
+class CrawlCacheEntry:
+    """
+    A cached main_crawling result.
+
+    Attributes:
+        documents: The final (filtered) documents returned so far.
+        state: The state of the underlying crawl, used to extend the result for a larger `num`.
+            None when the result cannot be extended, e.g. when it was served from a PaperStore.
+        exhausted: True once the source has no more results for the query.
+        created_at: When the entry was first created, in time.time() seconds.
+    """
+
+    documents: list[dict[str, Any]] = field(default_factory=list)
+    state: CrawlState | None = None
+    exhausted: bool = False
+    created_at: float = field(default_factory=time.time)
+
+
+class CrawlCache:
+    """
+    In-memory TTL + LRU cache of main_crawling results, keyed by the compiled query.
+
+    Entries expire `ttl` seconds after they were created, and the least recently used
+    entry is dropped once more than `max_entries` are stored.
+    """
+
+    def __init__(self, ttl: float = 600, max_entries: int = 128):
+        """
+        Args:
+            ttl: The number of seconds a cached result stays valid.
+            max_entries: The maximum number of cached queries.
+        """
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, CrawlCacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> CrawlCacheEntry | None:
+        """
+        Returns the fresh entry for the key, or None when it is missing or expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.created_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: CrawlCacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache used by main_crawling unless another one is passed in.
+default_crawl_cache = CrawlCache()
@@ -1,12 +1,40 @@
 import arxiv
 import time
 import random
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from crawler.parsing import *
 from crawler.openreview_crawling import *
+from crawler.store import PaperStore
+from crawler.state import CrawlState, checkpoint_tag, load_or_new_state, finish_checkpoint
+from crawler.crawl_cache import CrawlCache, CrawlCacheEntry, default_crawl_cache
+from crawler.utils import normalize_title
+from crawler.rate_limit import RateLimiter, get_rate_limiter
+from crawler.planner import plan_subqueries
+from crawler.endpoints import get_endpoint
+from crawler.venue import venue_query_key
+from crawler.dedup import dedupe
+from crawler.record import Paper
 
 import urllib.parse, requests, feedparser
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Iterator
+
+
+class _RateLimitedClient(arxiv.Client):
+    # arxiv.Client의 고정 delay_seconds 대신 공유 rate limiter로 페이지 요청 간격을 조절한다
+    def __init__(self, limiter: RateLimiter, page_size: int = 100, num_retries: int = 5):
+        super().__init__(page_size=page_size, delay_seconds=0.0, num_retries=num_retries)
+        self.limiter = limiter
+        # 요청 주소는 get_endpoint("arxiv") (로컬 재생 서버로 바꿀 수 있다)
+        self.query_url_format = get_endpoint("arxiv") + "?{}"
+        # 응답마다 429/503, Retry-After 헤더를 limiter에 반영
+        self._session.hooks["response"].append(limiter.response_hook)
+
+    def _parse_feed(self, url: str, first_page: bool = True, _try_index: int = 0):
+        self.limiter.acquire()
+        return super()._parse_feed(url, first_page, _try_index)
 
 
 ID_PAT = re.compile(r"/abs/([^/]+)$")  # YYMM.NNNNNvX 추출
@@ -15,9 +43,21 @@ def _short_id(entry_id: str) -> str:
     m = ID_PAT.search(entry_id or "")
     return m.group(1) if m else (entry_id or "")
 
-def crawling_basic(search_query: str, num: int = 50, sort_op: str = "submitted") -> list[dict[str, Any]]:
-    documents: list[dict[str, Any]] = []
-    seen_ids = set()
+def iter_crawling_basic(search_query: str, num: int = 50, sort_op: str = "submitted",
+                        since: datetime | None = None, state: CrawlState | None = None,
+                        checkpoint: str | None = None, resume: bool = False,
+                        tag: str | None = None) -> Iterator[Paper]:
+    # crawling_basic의 generator 버전. 문서를 파싱하는 즉시 하나씩 yield 한다
+    # since: lastupdate 정렬일 때, 이 시각 이하로 업데이트된 논문이 나오면 멈춘다 (증분 동기화용)
+    # state: 이전 크롤링 상태(offset, seen ids, 수집된 문서). 주어지면 그 지점부터 이어서 가져온다
+    # checkpoint: 페이지(100건)마다 상태를 저장할 파일. 오류로 멈추면 저장되고, 끝까지 가면 지워진다
+    # resume: True 이면 checkpoint 파일에서 상태를 불러와 멈춘 지점부터 이어서 가져온다
+    # tag: checkpoint를 이 크롤링에 묶는 태그. 기본값은 쿼리 + sort_op (다른 정렬의 checkpoint는 쓰지 않는다)
+    tag = tag or checkpoint_tag(search_query, sort_op=sort_op)
+    state = load_or_new_state(state, checkpoint, resume, tag=tag)
+    documents: list[dict[str, Any]] = state.documents
+    seen_ids = state.seen
+    reached_since = False
 
     try:
         sort_criterion_map = {
@@ -27,22 +67,36 @@ def crawling_basic(search_query: str, num: int = 50, sort_op: str = "submitted")
         }
         sort_criterion = sort_criterion_map.get(sort_op, arxiv.SortCriterion.SubmittedDate)
 
-        client = arxiv.Client(page_size=100, delay_seconds=3.0, num_retries=5)
+        limiter = get_rate_limiter("arxiv")
+        client = _RateLimitedClient(limiter, page_size=100, num_retries=5)
 
         max_empty_retries = 2
         empty_retries = 0
+        last_saved = state.offset
 
-        while len(documents) < num and empty_retries < max_empty_retries:
+        while len(documents) < num and empty_retries < max_empty_retries and not reached_since:
             try:
+                requested = num - len(documents)  # 남은 만큼만
                 search = arxiv.Search(
                     query=search_query,
-                    max_results=num - len(documents),  # 남은 만큼만
+                    max_results=state.offset + requested,
                     sort_by=sort_criterion
                 )
-                got = 0
-                for result in client.results(search):
+                consumed = 0
+                for result in client.results(search, offset=state.offset):
                     if len(documents) >= num:
                         break
+                    if since is not None and result.updated <= since:
+                        reached_since = True
+                        break
+
+                    # 이전 결과까지 처리가 끝난 페이지 경계에서 저장
+                    if checkpoint and state.offset % client.page_size == 0 and state.offset > last_saved:
+                        state.save(checkpoint, tag=tag)
+                        last_saved = state.offset
+
+                    consumed += 1
+                    state.offset += 1
 
                     entry_id = getattr(result, "entry_id", "") or getattr(result, "id", "")
                     sid = _short_id(entry_id)  # 예: '2408.12345v2'
@@ -54,31 +108,35 @@ def crawling_basic(search_query: str, num: int = 50, sort_op: str = "submitted")
                     if not pdf_url and "/abs/" in entry_id:
                         pdf_url = entry_id.replace("/abs/", "/pdf/") + ".pdf"
 
-                    documents.append({
-                        'title': result.title,
-                        'url': pdf_url or entry_id,
-                        'abstract': result.summary,
-                        'updated_date': result.updated,
-                        'arxiv_id': sid,
-                    })
-                    got += 1
-
-                    if len(documents) % 500 == 0 and len(documents) < num:
-                        print(f"document: {len(documents)}. waiting 7 seconds…")
-                        time.sleep(7)
-
-                if got == 0:
+                    doc = Paper(
+                        title=result.title,
+                        url=pdf_url or entry_id,
+                        abstract=result.summary,
+                        updated_date=result.updated,
+                        arxiv_id=sid,
+                        doi=getattr(result, "doi", None),
+                    )
+                    documents.append(doc)
+                    yield doc
+
+                if reached_since:
+                    break
+                if consumed == 0:
                     empty_retries += 1
-                    print(f"[warn] empty page error → {empty_retries}/2 try (waiting 5 secondes)")
-                    time.sleep(5)
+                    print(f"[warn] empty page error → {empty_retries}/{max_empty_retries} try")
+                    limiter.backoff(empty_retries)
+                elif consumed < requested:
+                    # 서버에 더 이상 결과가 없음
+                    state.exhausted = True
+                    break
                 else:
                     empty_retries = 0
 
             except Exception as e:
                 if "unexpectedly empty" in str(e).lower():
                     empty_retries += 1
-                    print(f"[warn] empty page error → {empty_retries}/2 try (waiting 5 secondes)")
-                    time.sleep(5)
+                    print(f"[warn] empty page error → {empty_retries}/{max_empty_retries} try")
+                    limiter.backoff(empty_retries)
                     continue
                 else:
                     print(f"[stop] error: {e}")
@@ -88,49 +146,399 @@ def crawling_basic(search_query: str, num: int = 50, sort_op: str = "submitted")
     except Exception as e:
         print(f"\n[!] stop error and return: {e}")
 
-    return documents[:num]
+    finally:
+        completed = len(documents) >= num or state.exhausted or reached_since
+        finish_checkpoint(state, checkpoint, completed, tag=tag)
+
+
+def crawling_basic(search_query: str, num: int = 50, sort_op: str = "submitted",
+                   since: datetime | None = None, state: CrawlState | None = None,
+                   checkpoint: str | None = None, resume: bool = False,
+                   tag: str | None = None) -> list[Paper]:
+    # 인자는 iter_crawling_basic과 같다. 전부 모아서 리스트로 반환한다
+    tag = tag or checkpoint_tag(search_query, sort_op=sort_op)
+    state = load_or_new_state(state, checkpoint, resume, tag=tag)
+    for _ in iter_crawling_basic(search_query, num, sort_op, since=since, state=state, checkpoint=checkpoint,
+                                 tag=tag):
+        pass
+    return state.documents[:num]
+
+
+def sync_arxiv(store: PaperStore, search_query: str, num: int = 50) -> list[dict[str, Any]]:
+    """
+    Incrementally syncs an arXiv query into the local store and serves it from there.
+
+    The first call crawls the `num` most recently updated papers. Later calls only page
+    through papers updated after the newest one already stored, which usually costs a
+    single request, and then answer from the store.
+
+    Args:
+        store: The local paper store.
+        search_query: The arXiv search query.
+        num: The number of documents to return.
+
+    Returns:
+        The `num` most recently updated documents matching the query.
+    """
+
+    query_key = f"arxiv:{search_query}"
+    sync = store.get_sync(query_key)
+    since = datetime.fromisoformat(sync[0]) if sync and sync[0] else None
+
+    new_documents = crawling_basic(search_query, num, sort_op="lastupdate", since=since)
+    store.upsert(new_documents, query_key=query_key)
+
+    newest = max((doc['updated_date'] for doc in new_documents if doc.get('updated_date')), default=None)
+    store.mark_synced(query_key, newest.isoformat() if newest else None)
+
+    return store.query_documents(query_key, limit=num)
+
+
+def sync_openreview(store: PaperStore, search_query: str, num: int = 50, accept: bool = True,
+                    max_age: float = 24 * 3600) -> list[dict[str, Any]]:
+    """
+    Syncs an OpenReview query into the local store and serves it from there.
+
+    OpenReview's search endpoint only ranks by relevance, so a crawl cannot stop at
+    already-known papers. Instead a query synced less than `max_age` seconds ago
+    is answered from the store without any request.
+
+    Args:
+        store: The local paper store.
+        search_query: The OpenReview search query.
+        num: The number of documents to return.
+        accept: Passed to crawling_openreview_v2.
+        max_age: The number of seconds a sync stays fresh.
+
+    Returns:
+        Up to `num` documents matching the query, newest first.
+    """
+
+    query_key = f"openreview:{int(accept)}:{search_query}"
+    sync = store.get_sync(query_key)
+    if sync and time.time() - sync[1] < max_age:
+        documents = store.query_documents(query_key, limit=num)
+        if len(documents) >= num:
+            return documents
+
+    new_documents = crawling_openreview_v2(search_query, num, accept)
+    store.upsert(new_documents, query_key=query_key)
+
+    newest = max((doc['cdate'] for doc in new_documents if doc.get('cdate')), default=None)
+    store.mark_synced(query_key, str(newest) if newest is not None else None)
+
+    return store.query_documents(query_key, limit=num)
+
+
+# 날짜 조건이 있을 때 범위 안의 문서 num개를 찾기 위해 훑는 최대 문서 수 (num의 배수)
+MAX_DATE_SCAN_FACTOR = 20
+
+def _compile_query(source: str, keyword_dict: dict, field: str) -> str:
+    if source == "openreview":
+        return soft_parsing_openreview(keyword_dict, field=field)
+    return soft_parsing_arxiv(keyword_dict, field=field)
 
 
 def main_crawling(keyword_dict: dict,
                   field: str = "all",
                   num: int = 50,
                   sort_op: str = "sumitted",
-                  date: list[int] = None, accept = False, openreview: bool = False) -> list[dict[str, any]]:
-
-    if openreview:
-        search_query = soft_parsing_openreview(keyword_dict, field=field)
-        documents = crawling_openreview_v2(search_query, num, accept)
-        if date is None:
-            return documents
-        else:
-            documents = openreview_date_filter(documents, date)
-            return documents
-
-    if date is None:
-        if accept == True:
-            search_query = soft_parsing_arxiv(keyword_dict, field)
-            documents = crawling_openreview_v2(search_query, num, accept)
+                  date: list[int] = None, accept = False, openreview: bool = False,
+                  store: PaperStore | None = None,
+                  cache: CrawlCache | None = None, use_cache: bool = True,
+                  sources: list[str] | None = None,
+                  local: bool = False,
+                  checkpoint: str | None = None, resume: bool = False,
+                  shard: bool = False,
+                  venue: str | None = None) -> list[dict[str, any]]:
+    # venue="ICLR.cc/2024/Conference" 처럼 주면 ingest_openreview_venue로 받아둔 학회 논문에서 로컬로 찾는다
+    # shard=True 이면 넓은 쿼리를 동의어 그룹별 작은 쿼리로 나눠 동시에 크롤링한다 (sharded_crawling)
+    # checkpoint / resume: 크롤러에 그대로 넘긴다. 실패한 긴 크롤링을 멈춘 지점부터 이어서 가져온다
+    # local=True 이면 네트워크 없이 로컬 저장소(harvest로 만든 미러)의 전문 검색 인덱스로 답한다
+    # sources=["arxiv", "openreview"] 처럼 여러 소스를 주면 multi_source_crawling으로 동시에 크롤링한다
+    # accept 정보는 OpenReview에만 있으므로 accept=True 이면 OpenReview로 크롤링한다
+    # store가 주어지면 로컬 저장소에 동기화하고 저장소에서 결과를 돌려준다 (arXiv는 lastupdate 순)
+    # 결과는 (source, 쿼리 문자열, sort, date, accept) 키로 cache에 저장된다.
+    # 같은 쿼리는 바로 반환하고, 더 큰 num이 오면 캐시된 크롤링 상태에서 이어서 가져온다
+
+    if local or venue:
+        return local_crawling(keyword_dict, field=field, num=num, date=date, accept=accept,
+                              openreview=openreview or venue is not None, store=store, venue=venue)
+
+    if shard:
+        return sharded_crawling(keyword_dict, field=field, num=num, sort_op=sort_op, date=date,
+                                accept=accept, openreview=openreview)
+
+    if sources:
+        return multi_source_crawling(keyword_dict, sources, field=field, num=num, sort_op=sort_op,
+                                     date=date, accept=accept, store=store, cache=cache, use_cache=use_cache)
+
+    source = "openreview" if (openreview or accept) else "arxiv"
+    search_query = _compile_query(source, keyword_dict, field)
+    # arXiv는 날짜 범위를 쿼리에 넣어 서버에서 거른다. OpenReview search_notes는 날짜 조건을 지원하지 않는다
+    if source == "arxiv":
+        search_query = add_date_range_arxiv(search_query, date)
+
+    if not use_cache:
+        cache = None
+    elif cache is None:
+        cache = default_crawl_cache
+
+    key = (source, search_query, sort_op if source == "arxiv" else None,
+           tuple(date) if date else None, bool(accept))
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None and (len(entry.documents) >= num or entry.exhausted):
+        return entry.documents[:num]
+
+    date_chain = FilterChain(date=date, source=source)
+    # checkpoint는 쿼리뿐 아니라 sort/date/accept가 모두 같은 크롤링에서만 이어서 쓴다
+    tag = checkpoint_tag(search_query, source=source, sort_op=key[2], date=key[3], accept=key[4])
+    if entry is None or entry.state is None:
+        state = load_or_new_state(None, checkpoint, resume, tag=tag) if store is None else None
+        entry = CrawlCacheEntry(state=state)
+        if state is not None and state.documents:
+            entry.documents = date_chain.apply(state.documents)
+
+    state = entry.state
+    if state is None:
+        # 저장소(store) 경로: 저장소가 돌려준 결과에 날짜 필터만 적용
+        if source == "openreview":
+            crawled = sync_openreview(store, search_query, num, accept)
         else:
-            search_query = soft_parsing_openreview(keyword_dict, field)
-            documents = crawling_basic(search_query, num, sort_op)
+            crawled = sync_arxiv(store, search_query, num)
+        entry.documents = date_chain.apply(crawled)
+        entry.exhausted = len(crawled) < num
     else:
-        if accept == True:
-            new_num = 3 * num
-            search_query = soft_parsing_openreview(keyword_dict, field)
-            documents = crawling_openreview_v2(search_query, num, accept)
-            documents = openreview_date_filter(documents, date)
+        # 범위 안의 문서가 num개 모일 때까지만 페이지를 넘긴다 (날짜 필터는 한 건씩 적용)
+        # 서버에서 날짜를 거르지 못하는 경우를 위해 최대 MAX_DATE_SCAN_FACTOR배까지만 훑는다
+        missing = num - len(entry.documents)
+        scan_limit = len(state.documents) + (MAX_DATE_SCAN_FACTOR * missing if date is not None else missing)
+        if source == "openreview":
+            stream = iter_crawling_openreview_v2(search_query, scan_limit, accept, state=state, checkpoint=checkpoint,
+                                                 tag=tag)
+        else:
+            stream = iter_crawling_basic(search_query, scan_limit, sort_op, state=state, checkpoint=checkpoint,
+                                         tag=tag)
+
+        for doc in date_chain.stream(stream):
+            entry.documents.append(doc)
+            if len(entry.documents) >= num:
+                break
+        stream.close()
+        entry.exhausted = state.exhausted
+        # 범위 안의 문서를 다 모아서 일찍 멈춘 경우도 완료로 보고 checkpoint를 지운다
+        if len(entry.documents) >= num:
+            finish_checkpoint(state, checkpoint, completed=True, tag=tag)
+
+    if cache is not None:
+        cache.put(key, entry)
+
+    return entry.documents[:num]
+
+
+
+def local_crawling(keyword_dict: dict,
+                   field: str = "all",
+                   num: int = 50,
+                   date: list[int] = None, accept: bool = False, openreview: bool = False,
+                   store: PaperStore | None = None,
+                   venue: str | None = None) -> list[dict[str, Any]]:
+    """
+    Answers a keyword query from the local paper store without any network request.
+
+    The store's full-text index is searched with the same (Main AND ...) AND (Optional OR ...)
+    structure as the soft parsers. Fill the store with harvest_arxiv or the sync functions first.
+
+    Args:
+        keyword_dict: The keyword dictionary used by the soft parsers.
+        field: The field to search in ("title", "abstract" or "all").
+        num: The number of documents to return.
+        date: [start_year, end_year], applied inside the store query.
+        accept: Keep only accepted OpenReview papers.
+        openreview: Search OpenReview papers instead of arXiv papers.
+        store: The local paper store. Defaults to the store under DEFAULT_CACHE_DIR.
+        venue: Search only the submissions of this venue ingested with ingest_openreview_venue.
+            Without keywords, the venue's papers are returned newest first.
+
+    Returns:
+        Up to `num` documents, best full-text match first.
+    """
+
+    if store is None:
+        store = PaperStore()
+
+    source = "openreview" if (openreview or accept) else "arxiv"
+    query_key = venue_query_key(venue) if venue else None
+    fts_query = soft_parsing_fts(keyword_dict, field)
+
+    if not fts_query:
+        if query_key is None:
+            return []
+        # 키워드 없이 학회 전체: 날짜/accept 필터를 한 번에 적용
+        chain = FilterChain(date=date, accept=accept, source=source)
+        return chain.apply(store.query_documents(query_key))[:num]
+
+    # accept 필터는 검색 후에 적용하므로 넉넉히 가져온다
+    limit = num * MAX_DATE_SCAN_FACTOR if accept else num
+    documents = store.search(fts_query, limit=limit, source=source, date=date, query_key=query_key)
+    if accept:
+        documents = FilterChain(accept=True).apply(documents)
+
+    return documents[:num]
+
+
+_SHARD_DONE = object()
+
+def _dedupe_key(doc: dict[str, Any]) -> str:
+    if doc.get('arxiv_id'):
+        return "arxiv:" + re.sub(r"v\d+$", "", doc['arxiv_id'])
+    return "title:" + normalize_title(doc.get('title', ''))
+
+def sharded_crawling(keyword_dict: dict,
+                     field: str = "all",
+                     num: int = 50,
+                     sort_op: str = "submitted",
+                     date: list[int] = None, accept: bool = False, openreview: bool = False,
+                     max_shards: int = 8) -> list[dict[str, Any]]:
+    """
+    Splits a wide keyword query into sub-queries and crawls them concurrently.
+
+    plan_subqueries splits the widest synonym group, so every sub-query is smaller and cheaper
+    for the server than the full OR/AND query. The shards share the source's rate limiter,
+    their results are unioned and deduplicated, and all shards stop as soon as `num` unique
+    documents have been collected.
+
+    Args:
+        keyword_dict: The keyword dictionary used by the soft parsers.
+        field: The field to search in ("title", "abstract" or "all").
+        num: The number of documents to return.
+        sort_op: The arXiv sort option, applied within each shard.
+        date: [start_year, end_year].
+        accept: Keep only accepted OpenReview papers.
+        openreview: Crawl OpenReview instead of arXiv.
+        max_shards: The maximum number of concurrent sub-queries.
+
+    Returns:
+        Up to `num` unique documents, in the order they arrived.
+    """
+
+    source = "openreview" if (openreview or accept) else "arxiv"
+    shards = plan_subqueries(keyword_dict, max_shards=max_shards)
+
+    queries = []
+    for shard_dict in shards:
+        query = _compile_query(source, shard_dict, field)
+        if source == "arxiv":
+            query = add_date_range_arxiv(query, date)
+        queries.append(query)
+
+    date_chain = FilterChain(date=date, source=source)
+    results: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    scan_limit = MAX_DATE_SCAN_FACTOR * num if (date is not None and source == "openreview") else num
+
+    def crawl(query: str):
+        if source == "openreview":
+            stream = iter_crawling_openreview_v2(query, scan_limit, accept)
         else:
-            new_num = 3 * num
-            search_query = soft_parsing_arxiv(keyword_dict, field)
-            documents = crawling_basic(search_query, new_num, sort_op)
-            documents = arxiv_date_filter(documents, date)
+            stream = iter_crawling_basic(query, scan_limit, sort_op)
+        try:
+            for doc in stream:
+                if stop.is_set():
+                    break
+                results.put(doc)
+        finally:
+            stream.close()
+            results.put(_SHARD_DONE)
 
-    if len(documents) > num:
-        documents = documents[:num]
+    documents: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    executor = ThreadPoolExecutor(max_workers=len(queries))
+    try:
+        for query in queries:
+            executor.submit(crawl, query)
+
+        running = len(queries)
+        while running and len(documents) < num:
+            doc = results.get()
+            if doc is _SHARD_DONE:
+                running -= 1
+                continue
+            key = _dedupe_key(doc)
+            if key in seen or not date_chain(doc):
+                continue
+            seen.add(key)
+            documents.append(doc)
+    finally:
+        # Workers notice the stop flag after their current page and exit on their own
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
 
     return documents
 
 
+def multi_source_crawling(keyword_dict: dict,
+                          sources: list[str] = ("arxiv", "openreview"),
+                          field: str = "all",
+                          num: int = 50,
+                          sort_op: str = "submitted",
+                          date: list[int] = None, accept: bool = False,
+                          store: PaperStore | None = None,
+                          cache: CrawlCache | None = None, use_cache: bool = True,
+                          dedupe_threshold: float = 0.8) -> list[dict[str, Any]]:
+    """
+    Crawls several sources concurrently and merges the results into one deduplicated list.
+
+    Every source runs main_crawling in its own thread, so the total latency is that of the
+    slowest source. Results are interleaved source by source, and near-duplicates (e.g. the
+    arXiv preprint and the OpenReview submission of a paper with a slightly different title)
+    are collapsed with crawler.dedup.dedupe.
+
+    Args:
+        keyword_dict: The keyword dictionary used by the soft parsers.
+        sources: The sources to crawl, any of "arxiv" and "openreview".
+        field: The field to search in ("title", "abstract" or "all").
+        num: The number of merged documents to return. Each source is asked for `num` documents.
+        sort_op: The arXiv sort option.
+        date: [start_year, end_year] applied to every source.
+        accept: Keep only accepted OpenReview papers. Has no effect on the arXiv source.
+        store: An optional local paper store, see main_crawling.
+        cache: The crawl cache, see main_crawling.
+        use_cache: Whether to use the crawl cache.
+        dedupe_threshold: The title similarity above which two papers are merged.
+
+    Returns:
+        The merged documents. Each carries a 'source' key; a paper found in several sources
+        is marked like "arxiv+openreview" and has the missing keys filled from the other records.
+    """
+
+    unknown = [src for src in sources if src not in ("arxiv", "openreview")]
+    if unknown:
+        raise ValueError(f"Invalid source: {unknown}")
+
+    def crawl(src: str) -> list[dict[str, Any]]:
+        return main_crawling(keyword_dict, field=field, num=num, sort_op=sort_op, date=date,
+                             accept=accept and src == "openreview", openreview=src == "openreview",
+                             store=store, cache=cache, use_cache=use_cache)
+
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        results = dict(zip(sources, executor.map(crawl, sources)))
+
+    interleaved: list[dict[str, Any]] = []
+    longest = max((len(docs) for docs in results.values()), default=0)
+    for i in range(longest):
+        for src in sources:
+            if i >= len(results[src]):
+                continue
+            # Copy so the cached crawl results are not modified
+            doc = Paper.from_dict(results[src][i])
+            doc['source'] = src
+            interleaved.append(doc)
+
+    # 같은 논문의 arXiv 판과 OpenReview 판은 제목이 조금 달라도 하나로 합친다
+    merged = dedupe(interleaved, threshold=dedupe_threshold)
+    return merged[:num]
+
 
 def random_crawling(sample_size: int = 20, num: int = 10) -> list[dict[str, str]]:
     """
@@ -0,0 +1,200 @@
+import zlib
+from collections import defaultdict
+from typing import Any, Iterable
+
+import numpy as np
+
+from crawler.record import Paper, paper_key
+from crawler.utils import normalize_title
+
+# MinHash over title shingles, LSH with `bands` bands of num_perm / bands rows.
+# With 64 permutations in 16 bands, pairs with a title Jaccard of about 0.5 become candidates.
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+# The number of later members of an LSH bucket each member is compared with
+MAX_BUCKET_PAIRS = 64
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _shingles(text: str, size: int) -> set[str]:
+    text = normalize_title(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def _word_shingles(text: str, size: int = 3) -> set[str]:
+    words = normalize_title(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _permutations(num_perm: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    # a < 2^31 and x < 2^32 keep a * x + b below 2^64
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    return a, b
+
+def minhash_signatures(shingle_sets: list[set[str]], num_perm: int = DEFAULT_NUM_PERM, seed: int = 1) -> np.ndarray:
+    """
+    Computes MinHash signatures.
+
+    Args:
+        shingle_sets: One set of shingles per record.
+        num_perm: The signature length.
+        seed: The seed of the hash permutations.
+
+    Returns:
+        A uint64 array of shape [len(shingle_sets), num_perm]. Empty sets get an all-max signature.
+    """
+
+    a, b = _permutations(num_perm, seed)
+    signatures = np.full((len(shingle_sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, shingles in enumerate(shingle_sets):
+        if not shingles:
+            continue
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        signatures[i] = ((np.outer(a, hashes) + b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+    return signatures
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # The earlier record stays the root, so groups keep first-occurrence order
+            if rj < ri:
+                ri, rj = rj, ri
+            self.parent[rj] = ri
+
+
+def find_duplicates(records: list[dict[str, Any]],
+                    threshold: float = 0.8,
+                    abstract_threshold: float = 0.6,
+                    shingle_size: int = 3,
+                    num_perm: int = DEFAULT_NUM_PERM,
+                    bands: int = DEFAULT_BANDS) -> list[list[int]]:
+    """
+    Groups near-duplicate records, e.g. the arXiv preprint and the OpenReview submission of a paper.
+
+    Records with the same arXiv id / forum id or DOI are always grouped. Other candidates come
+    from MinHash LSH over character shingles of the normalized titles, so the cost stays roughly
+    linear in the number of records. A candidate pair is a duplicate when its title Jaccard
+    similarity is at least `threshold`, or at least 0.5 while the abstracts (word 3-grams) have
+    a Jaccard similarity of at least `abstract_threshold`.
+
+    Args:
+        records: The crawled documents.
+        threshold: The title similarity above which two records are duplicates.
+        abstract_threshold: The abstract similarity that admits records with less similar titles.
+        shingle_size: The character shingle length of the titles.
+        num_perm: The MinHash signature length.
+        bands: The number of LSH bands. num_perm must be divisible by it.
+
+    Returns:
+        The groups of record indices, each in input order, ordered by their first record.
+    """
+
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands")
+
+    n = len(records)
+    uf = _UnionFind(n)
+
+    # 1) Exact identifiers
+    first_by_id: dict[str, int] = {}
+    for i, record in enumerate(records):
+        ids = [paper_key(record)]
+        if record.get('doi'):
+            ids.append("doi:" + str(record['doi']).lower())
+        for key in ids:
+            if key is None:
+                continue
+            if key in first_by_id:
+                uf.union(first_by_id[key], i)
+            else:
+                first_by_id[key] = i
+
+    # 2) LSH candidates on title shingles
+    title_shingles = [_shingles(record.get('title') or "", shingle_size) for record in records]
+    signatures = minhash_signatures(title_shingles, num_perm=num_perm)
+    rows = num_perm // bands
+
+    candidates: set[tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        band_rows = signatures[:, band * rows:(band + 1) * rows]
+        for i in range(n):
+            if title_shingles[i]:
+                buckets[band_rows[i].tobytes()].append(i)
+        # Every pair of a bucket is a candidate; members of an oversized bucket (e.g. many
+        # papers titled "Introduction") are only paired with the MAX_BUCKET_PAIRS that follow them
+        for members in buckets.values():
+            for position, i in enumerate(members):
+                for j in members[position + 1:position + 1 + MAX_BUCKET_PAIRS]:
+                    candidates.add((i, j))
+
+    # 3) Verify candidates with the exact similarities
+    abstract_shingles: dict[int, set[str]] = {}
+    def abstract_of(i: int) -> set[str]:
+        if i not in abstract_shingles:
+            abstract_shingles[i] = _word_shingles(records[i].get('abstract') or "")
+        return abstract_shingles[i]
+
+    for i, j in candidates:
+        if uf.find(i) == uf.find(j):
+            continue
+        similarity = _jaccard(title_shingles[i], title_shingles[j])
+        if similarity >= threshold or (similarity >= 0.5 and _jaccard(abstract_of(i), abstract_of(j)) >= abstract_threshold):
+            uf.union(i, j)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(n):
+        groups.setdefault(uf.find(i), []).append(i)
+    return sorted(groups.values(), key=lambda group: group[0])
+
+
+def merge_group(records: list[dict[str, Any]], group: Iterable[int]) -> Paper:
+    """
+    Collapses a group of duplicate records into one Paper.
+
+    The first record is kept and its missing or empty fields are filled from the others.
+    Their 'source' values are joined, e.g. "arxiv+openreview".
+    """
+
+    group = list(group)
+    merged = Paper.from_dict(records[group[0]])
+    sources = [merged['source']] if merged.get('source') else []
+    for i in group[1:]:
+        for k, v in records[i].items():
+            if k == 'source':
+                if v and v not in sources:
+                    sources.append(v)
+            elif merged.get(k) in (None, "") and v not in (None, ""):
+                merged[k] = v
+    if sources:
+        merged['source'] = "+".join(dict.fromkeys(src for value in sources for src in value.split("+")))
+    return merged
+
+def dedupe(records: list[dict[str, Any]], threshold: float = 0.8, **kwargs) -> list[Paper]:
+    """
+    Returns the records with near-duplicates collapsed, see find_duplicates and merge_group.
+    Each merged record takes the position of its first occurrence.
+    """
+
+    return [merge_group(records, group) for group in find_duplicates(records, threshold=threshold, **kwargs)]
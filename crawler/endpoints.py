@@ -0,0 +1,54 @@
+import os
+import threading
+
+# Base URLs of the external APIs.
+#   arxiv: the Atom query API used by the arxiv package.
+#   arxiv_oai: the OAI-PMH endpoint used by harvest_arxiv.
+#   openreview: the API v2 host used by OpenReviewClient.
+#   crossref / openalex: the works endpoints used by the citation lookups.
+DEFAULT_ENDPOINTS = {
+    "arxiv": "https://export.arxiv.org/api/query",
+    "arxiv_oai": "https://oaipmh.arxiv.org/oai",
+    "openreview": "https://api2.openreview.net",
+    "crossref": "https://api.crossref.org/works",
+    "openalex": "https://api.openalex.org/works",
+}
+
+_endpoints: dict[str, str] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(source: str) -> str:
+    """
+    Returns the base URL the crawlers use for a source.
+
+    The URL can be overridden with set_endpoint() or with the environment variable
+    PAPER_REC_<SOURCE>_URL (e.g. PAPER_REC_ARXIV_URL), for example to point the crawlers
+    at a local server that replays recorded responses.
+
+    Args:
+        source: "arxiv", "arxiv_oai", "openreview", "crossref" or "openalex".
+
+    Returns:
+        The base URL, without a trailing slash.
+    """
+
+    with _endpoints_lock:
+        if source in _endpoints:
+            return _endpoints[source]
+    if source not in DEFAULT_ENDPOINTS:
+        raise ValueError(f"Unknown source: {source}")
+    return os.environ.get(f"PAPER_REC_{source.upper()}_URL", DEFAULT_ENDPOINTS[source]).rstrip("/")
+
+def set_endpoint(source: str, url: str | None) -> None:
+    """
+    Replaces the base URL of a source. None restores the default.
+    """
+
+    if source not in DEFAULT_ENDPOINTS:
+        raise ValueError(f"Unknown source: {source}")
+    with _endpoints_lock:
+        if url is None:
+            _endpoints.pop(source, None)
+        else:
+            _endpoints[source] = url.rstrip("/")
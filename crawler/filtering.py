@@ -1,93 +1,157 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 import re
+from typing import Any as any, Callable, Iterable, Iterator
 from crawler.query import *
 from crawler.openreview_crawling import *
 
-def v1_accept_filter(documents: list[dict[str, any]]) -> list[dict[str, any]]:
-
-    # Accept으로 간주할 키워드 패턴 (대소문자 무시)
-    # Oral, Poster, Spotlight 발표도 Accept된 논문이므로 포함
-    accept_pattern = re.compile('accept|oral|poster|spotlight', re.IGNORECASE)
+# Accept으로 간주할 키워드 패턴 (대소문자 무시)
+# Oral, Poster, Spotlight 발표도 Accept된 논문이므로 포함
+_ACCEPT_PATTERN = re.compile('accept|oral|poster|spotlight', re.IGNORECASE)
 
-    filtered_documents = [
-        doc for doc in documents
-        if accept_pattern.search(doc.get('decision_info', ''))
-    ]
 
-    return filtered_documents
+@lru_cache(maxsize=65536)
+def _year_of_timestamp(ms: int | float) -> int | None:
+    # OpenReview의 ms timestamp → 연도. 같은 timestamp를 여러 번 거를 때 다시 파싱하지 않는다
+    try:
+        return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).year
+    except Exception:
+        return None
 
-# 최종 업데이트 기준
-def arxiv_date_filter(documents: list[dict[str, any]], date: list[int]) -> list[dict[str, any]]:
-    if not date or len(date) != 2:
-        return documents
+def paper_year(doc: dict[str, any], source: str = "openreview") -> int | None:
+    """
+    Returns the publication year of a document. The document is not modified.
 
-    start_year, end_year = date[0], date[1]
-    filtered_documents = []
+    arXiv: the year of `updated_date` (last update).
+    OpenReview: content year > mdate (ms) > cdate (ms).
 
-    for doc in documents:
-        if 'updated_date' in doc and isinstance(doc['updated_date'], datetime):
-            paper_year = doc['updated_date'].year
-            if start_year <= paper_year <= end_year:
-                filtered_documents.append(doc)
+    Args:
+        doc: A crawled document.
+        source: "arxiv" or "openreview".
 
-    return filtered_documents
+    Returns:
+        The year, or None if the document has no usable date.
+    """
 
-from datetime import datetime, timezone
-from typing import Any as any
+    if source == "arxiv":
+        updated = doc.get('updated_date')
+        year = updated.year if isinstance(updated, datetime) else None
+    else:
+        # content.year 또는 year
+        year = doc.get('year')
+        if isinstance(year, int):
+            return year
+        year = doc.get('content_year') if isinstance(doc.get('content_year'), int) else None
+        for key in ('mdate', 'cdate'):
+            if year is None and isinstance(doc.get(key), (int, float)):
+                year = _year_of_timestamp(doc[key])
+
+    return year
+
+
+def _is_available(doc: dict[str, any]) -> bool:
+    title = str(doc.get('title', '') or '').strip()
+    abstract = str(doc.get('abstract', '') or '').strip()
+    url = str(doc.get('url', '') or '').strip()
+
+    ok_title = (title and title.upper() != 'N/A')
+    ok_abstract = (abstract and abstract.upper() != 'N/A')
+    ok_url = (url and url.upper() != 'N/A' and url.startswith(('http://', 'https://')))
+    return bool(ok_title and ok_abstract and ok_url)
+
+def _is_accepted(doc: dict[str, any]) -> bool:
+    return _ACCEPT_PATTERN.search(doc.get('decision_info', '') or '') is not None
+
+
+class FilterChain:
+    """
+    Document filters compiled once and applied in a single pass.
+
+    Chaining na_filter, the date filters and v1_accept_filter builds one list per filter.
+    A FilterChain checks every requested predicate per document instead, so a list is
+    filtered with one allocation (`apply`) and a crawler generator can be filtered lazily
+    (`stream`). The documents themselves are never modified.
+
+    Example:
+        chain = FilterChain(na=True, date=[2022, 2024], source="openreview")
+        for doc in chain.stream(iter_crawling_openreview_v2(query, 500)):
+            ...
+    """
+
+    def __init__(self,
+                 na: bool = False,
+                 date: list[int] | None = None,
+                 accept: bool = False,
+                 source: str = "arxiv",
+                 predicates: Iterable[Callable[[dict[str, any]], bool]] = ()):
+        """
+        Args:
+            na: Drop documents whose title, abstract or URL is missing or "N/A".
+            date: [start_year, end_year]. Other values disable the date filter.
+            accept: Keep only accepted OpenReview papers.
+            source: "arxiv" or "openreview", selects how the year is derived.
+            predicates: Additional predicates, checked after the built-in ones.
+        """
+
+        compiled = []
+        if na:
+            compiled.append(_is_available)
+        if date and len(date) == 2:
+            start_year, end_year = date[0], date[1]
+
+            def in_range(doc: dict[str, any]) -> bool:
+                year = paper_year(doc, source)
+                return year is not None and start_year <= year <= end_year
+
+            compiled.append(in_range)
+        if accept:
+            compiled.append(_is_accepted)
+        compiled.extend(predicates)
+
+        self._predicates = tuple(compiled)
+
+    def __bool__(self) -> bool:
+        return bool(self._predicates)
+
+    def __call__(self, doc: dict[str, any]) -> bool:
+        for predicate in self._predicates:
+            if not predicate(doc):
+                return False
+        return True
+
+    def apply(self, documents: Iterable[dict[str, any]]) -> list[dict[str, any]]:
+        """
+        Returns the documents that pass every predicate, in order.
+        """
+
+        if not self._predicates:
+            return list(documents)
+        return [doc for doc in documents if self(doc)]
+
+    def stream(self, documents: Iterable[dict[str, any]]) -> Iterator[dict[str, any]]:
+        """
+        Lazily yields the documents that pass every predicate, e.g. from a crawler generator.
+        """
+
+        for doc in documents:
+            if self(doc):
+                yield doc
 
-def openreview_date_filter(documents: list[dict[str, any]], date: list[int]) -> list[dict[str, any]]:
 
-# 우선순위: content.year(또는 year) > mdate(ms) > cdate(ms)
+def v1_accept_filter(documents: list[dict[str, any]]) -> list[dict[str, any]]:
+    return FilterChain(accept=True).apply(documents)
 
+# 최종 업데이트 기준
+def arxiv_date_filter(documents: list[dict[str, any]], date: list[int]) -> list[dict[str, any]]:
     if not date or len(date) != 2:
         return documents
+    return FilterChain(date=date, source="arxiv").apply(documents)
 
-    start_year, end_year = date[0], date[1]
-    filtered_documents = []
-
-    for doc in documents:
-        paper_year = None
-
-        # content.year 또는 year
-        if isinstance(doc.get('year'), int):
-            paper_year = doc['year']
-        elif isinstance(doc.get('content_year'), int):
-            paper_year = doc['content_year']
-
-        # mdate(수정 시각, ms)
-        if paper_year is None and isinstance(doc.get('mdate'), (int, float)):
-            try:
-                paper_year = datetime.fromtimestamp(doc['mdate'] / 1000, tz=timezone.utc).year
-            except Exception:
-                pass
-
-        # cdate(생성 시각, ms)
-        if paper_year is None and isinstance(doc.get('cdate'), (int, float)):
-            try:
-                paper_year = datetime.fromtimestamp(doc['cdate'] / 1000, tz=timezone.utc).year
-            except Exception:
-                pass
-
-        # 필터 적용
-        if paper_year is not None and start_year <= paper_year <= end_year:
-            filtered_documents.append(doc)
-
-    return filtered_documents
-
-
+# 우선순위: content.year(또는 year) > mdate(ms) > cdate(ms)
+def openreview_date_filter(documents: list[dict[str, any]], date: list[int]) -> list[dict[str, any]]:
+    if not date or len(date) != 2:
+        return documents
+    return FilterChain(date=date, source="openreview").apply(documents)
 
 def na_filter(documents: list[dict[str, any]]) -> list[dict[str, any]]:
-    filtered_documents = []
-    for doc in documents:
-        title = str(doc.get('title', '') or '').strip()
-        abstract = str(doc.get('abstract', '') or '').strip()
-        url = str(doc.get('url', '') or '').strip()
-
-        ok_title = (title and title.upper() != 'N/A')
-        ok_abstract = (abstract and abstract.upper() != 'N/A')
-        ok_url = (url and url.upper() != 'N/A' and url.startswith(('http://', 'https://')))
-
-        if ok_title and ok_abstract and ok_url:
-            filtered_documents.append(doc)
-
-    return filtered_documents
\ No newline at end of file
+    return FilterChain(na=True).apply(documents)
@@ -0,0 +1,223 @@
+import argparse
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+import requests
+
+from crawler.record import Paper
+from crawler.endpoints import DEFAULT_ENDPOINTS, get_endpoint
+from crawler.rate_limit import get_rate_limiter, request_with_limiter
+from crawler.store import PaperStore
+
+ARXIV_OAI_URL = DEFAULT_ENDPOINTS["arxiv_oai"]
+
+_NS = {
+    "oai": "http://www.openarchives.org/OAI/2.0/",
+    "arxiv": "http://arxiv.org/OAI/arXiv/",
+}
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _text(element: ET.Element | None, path: str) -> str:
+    found = element.find(path, _NS) if element is not None else None
+    return _WHITESPACE.sub(" ", found.text or "").strip() if found is not None else ""
+
+def _parse_date(value: str) -> datetime | None:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def parse_oai_page(xml_text: str) -> tuple[list[Paper], str | None]:
+    """
+    Parses one OAI-PMH ListRecords page in the `arXiv` metadata format.
+
+    Args:
+        xml_text: The response body.
+
+    Returns:
+        The documents on the page, in the same format as crawling_basic plus a 'categories'
+        list, and the resumption token of the next page (None on the last page).
+    """
+
+    root = ET.fromstring(xml_text)
+
+    error = root.find("oai:error", _NS)
+    if error is not None:
+        # "noRecordsMatch" is an empty result, not a failure
+        if error.get("code") == "noRecordsMatch":
+            return [], None
+        raise RuntimeError(f"OAI-PMH error {error.get('code')}: {error.text}")
+
+    documents = []
+    for record in root.iterfind(".//oai:ListRecords/oai:record", _NS):
+        header = record.find("oai:header", _NS)
+        if header is not None and header.get("status") == "deleted":
+            continue
+
+        meta = record.find("oai:metadata/arxiv:arXiv", _NS)
+        arxiv_id = _text(meta, "arxiv:id")
+        if not arxiv_id:
+            continue
+
+        updated = _parse_date(_text(meta, "arxiv:updated")) or _parse_date(_text(meta, "arxiv:created"))
+        documents.append(Paper(
+            title=_text(meta, "arxiv:title"),
+            url=f"https://arxiv.org/pdf/{arxiv_id}",
+            abstract=_text(meta, "arxiv:abstract"),
+            updated_date=updated,
+            arxiv_id=arxiv_id,
+            doi=_text(meta, "arxiv:doi") or None,
+            extra={'categories': _text(meta, "arxiv:categories").split()},
+        ))
+
+    token_element = root.find(".//oai:ListRecords/oai:resumptionToken", _NS)
+    token = (token_element.text or "").strip() if token_element is not None else ""
+    return documents, token or None
+
+
+def iter_harvest_arxiv(set_spec: str | None = "cs",
+                       from_date: str | None = None,
+                       until_date: str | None = None,
+                       resumption_token: str | None = None,
+                       base_url: str | None = None,
+                       session: requests.Session | None = None) -> Iterator[tuple[list[Paper], str | None]]:
+    """
+    Pages through arXiv's OAI-PMH ListRecords endpoint.
+
+    Args:
+        set_spec: The OAI set, e.g. "cs" or "physics:hep-th". None harvests everything.
+        from_date: Only records updated on or after this date (YYYY-MM-DD).
+        until_date: Only records updated on or before this date (YYYY-MM-DD).
+        resumption_token: Continue an interrupted harvest from this token.
+        base_url: The OAI-PMH endpoint. Defaults to get_endpoint("arxiv_oai").
+        session: The session used to send the requests.
+
+    Returns:
+        An iterator over (documents, next resumption token) per page.
+    """
+
+    session = session or requests.Session()
+    base_url = base_url or get_endpoint("arxiv_oai")
+    limiter = get_rate_limiter("arxiv")
+
+    if resumption_token:
+        params = {"verb": "ListRecords", "resumptionToken": resumption_token}
+    else:
+        params = {"verb": "ListRecords", "metadataPrefix": "arXiv"}
+        if set_spec:
+            params["set"] = set_spec
+        if from_date:
+            params["from"] = from_date
+        if until_date:
+            params["until"] = until_date
+
+    while True:
+        # OAI-PMH flow control answers 503 + Retry-After, which the limiter honors.
+        response = request_with_limiter(session, base_url, limiter, max_retries=5, params=params, timeout=120)
+        response.raise_for_status()
+
+        documents, token = parse_oai_page(response.text)
+        yield documents, token
+
+        if not token:
+            return
+        params = {"verb": "ListRecords", "resumptionToken": token}
+
+
+def harvest_arxiv(store: PaperStore,
+                  set_spec: str | None = "cs",
+                  categories: list[str] | None = None,
+                  from_date: str | None = None,
+                  until_date: str | None = None,
+                  resume: bool = True,
+                  max_pages: int | None = None,
+                  base_url: str | None = None) -> int:
+    """
+    Bulk-ingests arXiv metadata into the local store to build an offline searchable mirror.
+
+    The resumption token is saved after every page, so an interrupted harvest continues
+    where it stopped when called again with the same arguments. A finished harvest records
+    the day it started, and calling it again only asks for the records changed since then.
+
+    Args:
+        store: The local paper store.
+        set_spec: The OAI set, e.g. "cs".
+        categories: Keep only papers listed in one of these categories, e.g. ["cs.CL", "cs.IR"].
+        from_date: Only records updated on or after this date (YYYY-MM-DD).
+        until_date: Only records updated on or before this date (YYYY-MM-DD).
+        resume: Continue the same harvest from its saved resumption token, or from the day the
+            last finished run started. False harvests everything from from_date again.
+        max_pages: Stop after this many pages. The harvest can be resumed later.
+        base_url: The OAI-PMH endpoint. Defaults to get_endpoint("arxiv_oai").
+
+    Returns:
+        The number of documents written to the store.
+    """
+
+    base_url = base_url or get_endpoint("arxiv_oai")
+    harvest_key = f"arxiv-oai:{base_url}:{set_spec}:{from_date}:{until_date}"
+    started_key = f"{harvest_key}:started"
+    token = store.get_harvest_token(harvest_key) if resume else None
+    wanted = set(categories) if categories else None
+
+    if token:
+        started = store.get_harvest_token(started_key)
+    else:
+        # Records changed during the harvest get a datestamp on or after the day it starts.
+        # One day earlier absorbs clock skew with the server; `from` is inclusive and
+        # upserts are idempotent, so the overlap only costs a few repeated records.
+        started = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d")
+        synced = store.get_sync(harvest_key) if resume else None
+        if synced and synced[0]:
+            from_date = max(from_date or "", synced[0])
+            if until_date and from_date > until_date:
+                print(f"[harvest] up to date since {synced[0]}")
+                return 0
+        store.set_harvest_token(started_key, started)
+
+    written = 0
+    pages = 0
+    finished = False
+    for documents, next_token in iter_harvest_arxiv(set_spec, from_date, until_date,
+                                                    resumption_token=token, base_url=base_url):
+        if wanted is not None:
+            documents = [doc for doc in documents if wanted.intersection(doc['categories'])]
+        written += store.upsert(documents)
+        store.set_harvest_token(harvest_key, next_token)
+        finished = next_token is None
+
+        pages += 1
+        print(f"[harvest] page {pages}: {written} documents")
+        if max_pages is not None and pages >= max_pages:
+            break
+
+    if finished:
+        store.mark_synced(harvest_key, started)
+        store.set_harvest_token(started_key, None)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harvest arXiv metadata into the local paper store.")
+    parser.add_argument("--set", dest="set_spec", default="cs", help='OAI set, e.g. "cs" or "physics:hep-th"')
+    parser.add_argument("--category", action="append", dest="categories", help='e.g. "cs.CL" (repeatable)')
+    parser.add_argument("--from", dest="from_date", help="YYYY-MM-DD")
+    parser.add_argument("--until", dest="until_date", help="YYYY-MM-DD")
+    parser.add_argument("--store", default=None, help="SQLite file of the paper store")
+    parser.add_argument("--base-url", default=None, help="OAI-PMH endpoint (default: arXiv)")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="harvest everything again, ignoring the saved progress")
+    args = parser.parse_args()
+
+    store = PaperStore(args.store) if args.store else PaperStore()
+    written = harvest_arxiv(store, set_spec=args.set_spec, categories=args.categories,
+                            from_date=args.from_date, until_date=args.until_date,
+                            resume=not args.restart, max_pages=args.max_pages, base_url=args.base_url)
+    print(f"[harvest] done: {written} documents, {len(store)} papers in store")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,11 @@ from datetime import datetime
 import time
 import re
 from crawler.filtering import *
+from crawler.record import Paper
+from crawler.state import CrawlState, checkpoint_tag, load_or_new_state, finish_checkpoint
+from crawler.endpoints import get_endpoint
+from crawler.rate_limit import RateLimiter, get_rate_limiter
+from typing import Iterator
 
 
 # venue마다 형식이 달라서, 다 v2에서 사용하는 문자열로 변환
@@ -37,72 +42,90 @@ def _extract_reset_time(err) -> str | None:
         return m.group(2)
     return None
 
-def _sleep_until_iso(iso: str, fallback_secs: int = 3):
-    """ISO8601(Z) 시간까지 대기. 실패 시 fallback 대기."""
+def _parse_iso(iso: str) -> datetime | None:
+    """ISO8601(Z) 문자열을 datetime으로. 실패하면 None."""
     try:
-        rt = datetime.fromisoformat(iso.replace('Z', '+00:00'))
-        now = datetime.now(timezone.utc)
-        wait = max(0.0, (rt - now).total_seconds())
-        time.sleep(wait)
+        return datetime.fromisoformat(iso.replace('Z', '+00:00'))
     except Exception:
-        time.sleep(fallback_secs)
+        return None
+
+# OpenReview API 호출 하나를 공유 rate limiter를 거쳐 보낸다
+# 오류나면 max_retries번까지 재시도. 그 쉬라는 에러(429)면 resetTime까지 limiter가 막는다
+# 끝내 실패하면 None
+def _request_openreview(call, limiter: RateLimiter, max_retries: int = 3):
+    for attempt in range(1, max_retries + 1):
+        limiter.acquire()
+        try:
+            result = call()
+            limiter.on_success()
+            return result
+        except Exception as e:
+            print(f"error. retry ({attempt}/{max_retries}): {e}")
+            if attempt == max_retries:
+                return None
+            msg = str(e).lower()
+            if '429' in msg or 'ratelimiterror' in msg or 'too many requests' in msg:
+                reset_iso = None
+                if hasattr(e, 'args') and e.args:
+                    reset_iso = _extract_reset_time(e.args[0])
+                if not reset_iso:
+                    reset_iso = _extract_reset_time(e)
+                reset_at = _parse_iso(reset_iso) if reset_iso else None
+                if reset_at:
+                    print(f"limit error: resetTime={reset_iso} .")
+                    limiter.on_throttle(reset_at=reset_at)
+                else:
+                    limiter.on_throttle()
+                    limiter.backoff(attempt)
+            else:
+                limiter.backoff(attempt)
+    return None
 
 # search_notes를 사용하는데, 이건 relevance로 가져온다
-# 100개 넘으면 귾어서 가져온다. 그 사이는 3초 쉬기
-# 오류나면 3번 재시도. 만약 그 쉬라는 에러면 정말로 쉰다
+# 100개 넘으면 귾어서 가져온다. 요청 간격은 공유 rate limiter("openreview")가 정한다
+# 오류나면 3번 재시도. 만약 그 쉬라는 에러면 resetTime까지 limiter가 막는다
 # 중복 제거
-def crawling_openreview_v2(
+# state가 주어지면 그 offset부터 이어서 가져온다
+# crawling_openreview_v2의 generator 버전. 문서를 파싱하는 즉시 하나씩 yield 한다
+# checkpoint가 주어지면 페이지마다 상태를 저장하고, resume=True 이면 저장된 지점부터 이어서 가져온다
+def iter_crawling_openreview_v2(
         search_query: str,
         limit: int,
-        accept: bool = True
-) -> list[dict[str, any]]:
-
-    documents = []
-    seen_forums = set()
-    client = openreview.api.OpenReviewClient(baseurl='https://api2.openreview.net')
+        accept: bool = True,
+        state: CrawlState | None = None,
+        checkpoint: str | None = None,
+        resume: bool = False,
+        tag: str | None = None
+) -> Iterator[Paper]:
+
+    # tag: checkpoint를 이 크롤링에 묶는 태그. 기본값은 쿼리 + accept
+    tag = tag or checkpoint_tag(search_query, accept=bool(accept))
+    state = load_or_new_state(state, checkpoint, resume, tag=tag)
+    documents = state.documents
+    seen_forums = state.seen
+    client = openreview.api.OpenReviewClient(baseurl=get_endpoint("openreview"))
 
     _non_submission = re.compile(r'/(Comment|Rebuttal|Review)\b', re.IGNORECASE)
-    FIXED_SLEEP_SECS = 3
+    limiter = get_rate_limiter("openreview")
     BATCH_CAP = 100
     MAX_RETRIES = 3
 
     try:
-        collected = 0
-        offset = 0
+        collected = len(documents)
 
         while collected < limit:
             to_fetch = min(BATCH_CAP, max(1, limit - collected))
 
-            notes = None
-            for attempt in range(1, MAX_RETRIES + 1):
-                try:
-                    notes = client.search_notes(
-                        term=search_query,
-                        limit=to_fetch,
-                        offset=offset
-                    )
-                    break
-                except Exception as e:
-                    print(f"error. retry ({attempt}/{MAX_RETRIES}): {e}")
-                    msg = str(e).lower()
-                    if '429' in msg or 'ratelimiterror' in msg or 'too many requests' in msg:
-                        reset_iso = None
-                        if hasattr(e, 'args') and e.args:
-                            reset_iso = _extract_reset_time(e.args[0])
-                        if not reset_iso:
-                            reset_iso = _extract_reset_time(e)
-                        if reset_iso:
-                            print(f"limit error: resetTime={reset_iso} .")
-                            _sleep_until_iso(reset_iso, fallback_secs=FIXED_SLEEP_SECS)
-                        else:
-                            time.sleep(FIXED_SLEEP_SECS)
-                    else:
-                        time.sleep(FIXED_SLEEP_SECS if attempt == MAX_RETRIES else max(1, attempt - 1))
-                    if attempt == MAX_RETRIES:
-                        print("error and return.")
-                        return documents
+            notes = _request_openreview(
+                lambda: client.search_notes(term=search_query, limit=to_fetch, offset=state.offset),
+                limiter, MAX_RETRIES
+            )
+            if notes is None:
+                print("error and return.")
+                return
 
             if not notes:
+                state.exhausted = True
                 break
 
             got_from_server = 0
@@ -138,25 +161,47 @@ def crawling_openreview_v2(
                     continue
                 seen_forums.add(title)
 
-                documents.append({
-                    'title': title,
-                    'url': f"https://openreview.net/forum?id={forum_id}",
-                    'abstract': abstract,
-                    'cdate': note.cdate,
-                    'decision_info': decision_info
-                })
+                doc = Paper(
+                    title=title,
+                    url=f"https://openreview.net/forum?id={forum_id}",
+                    abstract=abstract,
+                    cdate=note.cdate,
+                    decision_info=decision_info
+                )
+                documents.append(doc)
+                yield doc
 
                 collected += 1
                 if collected >= limit:
                     break
 
-            offset += got_from_server
-            if collected < limit:
-                time.sleep(FIXED_SLEEP_SECS)
+            state.offset += got_from_server
+            if checkpoint:
+                state.save(checkpoint, tag=tag)
 
 
     except Exception as e:
         print(f"error and return: {e}")
 
-    return documents
+    finally:
+        completed = len(documents) >= limit or state.exhausted
+        finish_checkpoint(state, checkpoint, completed, tag=tag)
+
+
+def crawling_openreview_v2(
+        search_query: str,
+        limit: int,
+        accept: bool = True,
+        state: CrawlState | None = None,
+        checkpoint: str | None = None,
+        resume: bool = False,
+        tag: str | None = None
+) -> list[Paper]:
+
+    tag = tag or checkpoint_tag(search_query, accept=bool(accept))
+    state = load_or_new_state(state, checkpoint, resume, tag=tag)
+    for _ in iter_crawling_openreview_v2(search_query, limit, accept, state=state, checkpoint=checkpoint, tag=tag):
+        pass
+    return state.documents
+
 
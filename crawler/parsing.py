@@ -175,3 +175,57 @@ def soft_parsing_openreview(keyword_dict: dict, field: str = "all") -> str:
     else:
         return opt_query
 
+
+
+def date_range_arxiv(date: list[int] | None) -> str:
+    """
+    [start_year, end_year] -> lastUpdatedDate:[YYYY01010000 TO YYYY12312359]
+    arxiv_date_filter와 같은 기준(최종 업데이트 날짜)으로 arXiv 서버에서 거른다
+    """
+    if not date or len(date) != 2:
+        return ""
+    start_year, end_year = date[0], date[1]
+    return f"lastUpdatedDate:[{start_year:04d}01010000 TO {end_year:04d}12312359]"
+
+def add_date_range_arxiv(search_query: str, date: list[int] | None) -> str:
+    """
+    (Query) AND lastUpdatedDate:[...]
+    """
+    date_range = date_range_arxiv(date)
+    if not date_range:
+        return search_query
+    if not search_query:
+        return date_range
+    return f"({search_query}) AND {date_range}"
+
+
+def _fts_token(raw: str, field: str = "all") -> str:
+    x = _strip_outer_quotes(str(raw or "")).replace('"', '""')
+    column = {"title": "title", "abstract": "abstract"}.get((field or "all").lower())
+    token = f'"{x}"'
+    return f"{column} : {token}" if column else token
+
+def soft_parsing_fts(keyword_dict: dict, field: str = "all") -> str:
+    """
+    (Main1 AND Main2) AND (Optional1 OR Optional2)
+    PaperStore.search에서 쓰는 SQLite FTS5 문법
+    """
+    main_list = keyword_dict.get("main", [])
+    optional_list = keyword_dict.get("optional", [])
+
+    main_blocks = []
+    for synonyms in main_list:
+        if synonyms:
+            main_blocks.append("(" + " OR ".join(_fts_token(kw, field) for kw in synonyms) + ")")
+    main_query = " AND ".join(main_blocks)
+
+    opt_query = ""
+    if optional_list:
+        opt_query = "(" + " OR ".join(_fts_token(kw, field) for kw in optional_list) + ")"
+
+    if main_query and opt_query:
+        return f"({main_query}) AND {opt_query}"
+    elif main_query:
+        return main_query
+    else:
+        return opt_query
@@ -0,0 +1,39 @@
+def plan_subqueries(keyword_dict: dict, max_shards: int = 8) -> list[dict]:
+    """
+    Splits a keyword dictionary into smaller keyword dictionaries whose union is the original query.
+
+    The soft parsers build (Main1 AND Main2) AND (Optional1 OR Optional2) where every main group
+    is an OR of synonyms. OR distributes over AND, so the widest OR list (a main synonym group
+    or the optional list) can be split into chunks, giving one narrower query per chunk.
+
+    Args:
+        keyword_dict: {"main": [[synonyms, ...], ...], "optional": [...]}.
+        max_shards: The maximum number of sub-queries.
+
+    Returns:
+        The sub-query keyword dictionaries. A query that cannot be split is returned as is.
+    """
+
+    main_list = [list(group) for group in keyword_dict.get("main", [])]
+    optional_list = list(keyword_dict.get("optional", []))
+
+    # Candidates: ("main", index) for each synonym group, ("optional", None) for the optional list
+    candidates = [(len(group), "main", i) for i, group in enumerate(main_list)]
+    candidates.append((len(optional_list), "optional", None))
+    width, kind, index = max(candidates, key=lambda c: c[0])
+
+    if width <= 1 or max_shards <= 1:
+        return [{"main": main_list, "optional": optional_list}]
+
+    alternatives = main_list[index] if kind == "main" else optional_list
+    n_shards = min(max_shards, width)
+    chunks = [alternatives[i::n_shards] for i in range(n_shards)]
+
+    shards = []
+    for chunk in chunks:
+        if kind == "main":
+            shard_main = [chunk if i == index else group for i, group in enumerate(main_list)]
+            shards.append({"main": shard_main, "optional": optional_list})
+        else:
+            shards.append({"main": main_list, "optional": chunk})
+    return shards
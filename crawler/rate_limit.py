@@ -0,0 +1,295 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket whose refill rate adapts with AIMD.
+
+    `acquire()` only sleeps when the bucket is empty, so a well-behaved crawl runs at the
+    allowed rate instead of sleeping fixed amounts. Every success raises the rate additively
+    up to `max_rate`. A throttling response (429/503 or a rate-limit error) halves it down to
+    `min_rate` and blocks all callers until the server's reset time, when one is given.
+
+    Attributes:
+        requests: The number of acquired request slots.
+        throttled: The number of throttling responses reported.
+        total_slept: The total number of seconds callers spent sleeping in this limiter.
+    """
+
+    def __init__(self,
+                 rate: float,
+                 burst: float = 1,
+                 min_rate: float | None = None,
+                 max_rate: float | None = None,
+                 increase: float | None = None,
+                 backoff_base: float = 1.0,
+                 backoff_cap: float = 60.0):
+        """
+        Args:
+            rate: The initial number of requests per second.
+            burst: The bucket size, i.e. how many requests may be sent back to back.
+            min_rate: The lowest rate reached by multiplicative decrease. Defaults to rate / 16.
+            max_rate: The highest rate reached by additive increase. Defaults to rate.
+            increase: The rate added after each success. Defaults to max_rate / 20.
+            backoff_base: The base delay in seconds of the jittered exponential backoff.
+            backoff_cap: The maximum delay in seconds of a single backoff.
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.increase = increase if increase is not None else self.max_rate / 20
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.requests = 0
+        self.throttled = 0
+        self.total_slept = 0.0
+
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes one request slot, sleeping only if none is available.
+
+        Returns:
+            The number of seconds slept.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            self.requests += 1
+
+            # A negative balance is a reservation: this caller waits until it is paid back.
+            wait = max(-self._tokens / self.rate if self._tokens < 0 else 0.0, self._blocked_until - now)
+
+        if wait > 0:
+            self._sleep(wait)
+        return max(wait, 0.0)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: float | None = None, reset_at: datetime | None = None) -> None:
+        """
+        Reports a throttling response.
+
+        Args:
+            retry_after: Seconds to wait before the next request, e.g. from a Retry-After header.
+            reset_at: The time at which the server's limit resets, e.g. OpenReview's resetTime.
+        """
+
+        if reset_at is not None:
+            reset_in = (reset_at - datetime.now(timezone.utc)).total_seconds()
+            retry_after = max(retry_after or 0.0, reset_in)
+
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0)
+            if retry_after and retry_after > 0:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Sleeps with full-jitter exponential backoff before retrying a failed request.
+
+        Args:
+            attempt: The 1-based number of the failed attempt.
+
+        Returns:
+            The number of seconds slept.
+        """
+
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** max(0, attempt - 1)))
+        self._sleep(delay)
+        return delay
+
+    def update_from_headers(self, headers) -> None:
+        """
+        Honors the rate-limit headers of a response.
+
+        Supports Retry-After, X-RateLimit-Remaining / X-RateLimit-Reset and Crossref's
+        X-Rate-Limit-Limit / X-Rate-Limit-Interval.
+        """
+
+        if not headers:
+            return
+
+        limit = headers.get("X-Rate-Limit-Limit")
+        interval = headers.get("X-Rate-Limit-Interval")
+        if limit and interval:
+            try:
+                allowed = float(limit) / float(str(interval).rstrip("s"))
+                with self._lock:
+                    self.max_rate = allowed
+                    self.rate = min(self.rate, allowed)
+            except ValueError:
+                pass
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            try:
+                if float(remaining) < 1:
+                    reset = float(reset)
+                    # Either an epoch timestamp or a number of seconds
+                    wait = reset - time.time() if reset > 1e9 else reset
+                    with self._lock:
+                        self._blocked_until = max(self._blocked_until, time.monotonic() + max(0.0, wait))
+            except ValueError:
+                pass
+
+    def response_hook(self, response: requests.Response, *args, **kwargs) -> None:
+        """
+        A requests response hook that feeds every response back into the limiter.
+        Install with `session.hooks["response"].append(limiter.response_hook)`.
+        """
+
+        self.update_from_headers(response.headers)
+        if response.status_code in (429, 503):
+            self.on_throttle(retry_after=parse_retry_after(response.headers))
+        elif response.ok:
+            self.on_success()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _sleep(self, seconds: float) -> None:
+        with self._lock:
+            self.total_slept += seconds
+        time.sleep(seconds)
+
+
+def parse_retry_after(headers) -> float | None:
+    """
+    Parses a Retry-After header given either in seconds or as an HTTP date.
+    """
+
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def request_with_limiter(session: requests.Session,
+                         url: str,
+                         limiter: RateLimiter,
+                         max_retries: int = 3,
+                         **kwargs) -> requests.Response:
+    """
+    Sends a GET request through a rate limiter, retrying throttled and failed requests.
+
+    Args:
+        session: The session used to send the request.
+        url: The URL.
+        limiter: The limiter of the API.
+        max_retries: The number of retries after a 429/5xx response or a connection error.
+        **kwargs: Passed to session.get().
+
+    Returns:
+        The last response. The caller still calls raise_for_status().
+    """
+
+    for attempt in range(1, max_retries + 2):
+        limiter.acquire()
+        try:
+            response = session.get(url, **kwargs)
+        except requests.exceptions.ConnectionError:
+            if attempt > max_retries:
+                raise
+            limiter.backoff(attempt)
+            continue
+
+        limiter.update_from_headers(response.headers)
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt > max_retries:
+                return response
+            retry_after = parse_retry_after(response.headers)
+            if response.status_code in (429, 503):
+                limiter.on_throttle(retry_after=retry_after)
+            if retry_after is None:
+                limiter.backoff(attempt)
+            continue
+
+        if response.ok:
+            limiter.on_success()
+        return response
+
+
+# Per-source budgets.
+#   arxiv: the API terms allow one request every 3 seconds.
+#   openreview: no published limit; resetTime in 429 errors is honored.
+#   crossref / openalex: polite pool limits of 50 and 10 requests per second.
+_DEFAULT_LIMITS = {
+    "arxiv": dict(rate=1 / 3, burst=1, max_rate=1 / 3),
+    "openreview": dict(rate=1.0, burst=3, max_rate=2.0),
+    "crossref": dict(rate=40.0, burst=10, max_rate=45.0),
+    "openalex": dict(rate=9.0, burst=5, max_rate=9.5),
+}
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(source: str) -> RateLimiter:
+    """
+    Returns the process-wide limiter of a source, creating it on first use.
+    All crawler threads talking to the same API share its budget.
+
+    Args:
+        source: "arxiv", "openreview", "crossref", "openalex" or any other name.
+            Unknown names get a limiter of one request per second.
+
+    Returns:
+        The RateLimiter of the source.
+    """
+
+    with _limiters_lock:
+        if source not in _limiters:
+            _limiters[source] = RateLimiter(**_DEFAULT_LIMITS.get(source, dict(rate=1.0)))
+        return _limiters[source]
+
+def set_rate_limiter(source: str, limiter: RateLimiter) -> None:
+    """
+    Replaces the limiter of a source, e.g. to use a different budget.
+    """
+
+    with _limiters_lock:
+        _limiters[source] = limiter
+
+def reset_rate_limiters(scale: float = 1.0) -> None:
+    """
+    Replaces every source's limiter with a fresh one on the default budget.
+
+    Args:
+        scale: Multiplies the default rates, e.g. 10 to replay recorded traffic ten times faster.
+    """
+
+    with _limiters_lock:
+        for source in set(_limiters) | set(_DEFAULT_LIMITS):
+            limits = dict(_DEFAULT_LIMITS.get(source, dict(rate=1.0)))
+            for name in ("rate", "max_rate"):
+                if name in limits:
+                    limits[name] *= scale
+            _limiters[source] = RateLimiter(**limits)
@@ -0,0 +1,246 @@
+import re
+from collections.abc import Iterable, Iterator, MutableMapping
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any
+
+_ARXIV_VERSION = re.compile(r"v\d+$")
+_FORUM_ID = re.compile(r"[?&]id=([^&]+)")
+
+
+@dataclass(slots=True, eq=False)
+class Paper(MutableMapping):
+    """
+    Compact record of one crawled paper.
+
+    The attributes live in slots instead of a per-document dict. For existing callers a Paper
+    still behaves like the document dicts the crawlers used to return: `doc['title']`,
+    `doc.get('cdate')`, `'arxiv_id' in doc`, `dict(doc)` and `{**doc}` all work. An attribute
+    that is None counts as a missing key, and keys that are not attributes go to `extra`.
+
+    Attributes:
+        title: The title.
+        url: The PDF (arXiv) or forum (OpenReview) URL.
+        abstract: The abstract.
+        updated_date: The last update time (arXiv).
+        arxiv_id: The arXiv id with its version suffix.
+        doi: The DOI, if any.
+        cdate: The creation time in ms (OpenReview).
+        decision_info: The decision or venue string (OpenReview).
+        source: The source(s) of the record, set by multi_source_crawling.
+        year: A publication year given by the source. paper_year prefers it over the record's
+            dates; the date filters read it but never set it.
+        extra: Any other keys, e.g. the 'categories' of a harvested record.
+    """
+
+    title: str = ""
+    url: str | None = None
+    abstract: str | None = None
+    updated_date: datetime | None = None
+    arxiv_id: str | None = None
+    doi: str | None = None
+    cdate: int | None = None
+    decision_info: str | None = None
+    source: str | None = None
+    year: int | None = None
+    extra: dict[str, Any] | None = None
+
+    @classmethod
+    def from_dict(cls, doc: dict[str, Any]) -> "Paper":
+        """
+        Builds a Paper from a document dict. Unknown keys are kept in `extra`.
+        """
+
+        if isinstance(doc, Paper):
+            return doc.copy()
+        paper = cls()
+        for key, value in doc.items():
+            paper[key] = value
+        return paper
+
+    def to_dict(self) -> dict[str, Any]:
+        return {key: self[key] for key in self}
+
+    def copy(self) -> "Paper":
+        paper = Paper(*(getattr(self, name) for name in _FIELD_ORDER))
+        if self.extra:
+            paper.extra = dict(self.extra)
+        return paper
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in _FIELDS:
+            if getattr(self, key) is None:
+                raise KeyError(key)
+            setattr(self, key, None)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for name in _FIELD_ORDER:
+            if getattr(self, name) is not None:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELDS:
+            return getattr(self, key) is not None
+        return bool(self.extra) and key in self.extra
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Paper, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Paper({self.to_dict()!r})"
+
+
+# 'extra' is the overflow dict itself, not a document key
+_FIELD_ORDER = tuple(f.name for f in fields(Paper) if f.name != "extra")
+_FIELDS = frozenset(_FIELD_ORDER)
+
+
+def paper_key(doc: dict[str, Any]) -> str | None:
+    """
+    Returns the deduplication key of a crawled document.
+
+    arXiv documents are keyed by their id without the version suffix, so a newer version
+    replaces the older one. OpenReview documents are keyed by their forum id.
+
+    Args:
+        doc: A document produced by crawling_basic or crawling_openreview_v2.
+
+    Returns:
+        The key, e.g. "arxiv:2408.12345" or "openreview:AbCdEf", or None if the document has no id.
+    """
+
+    if doc.get('arxiv_id'):
+        return "arxiv:" + _ARXIV_VERSION.sub("", str(doc['arxiv_id']))
+    forum_id = doc.get('forum_id')
+    if not forum_id:
+        m = _FORUM_ID.search(str(doc.get('url', '') or ''))
+        forum_id = m.group(1) if m else None
+    if forum_id:
+        return "openreview:" + forum_id
+    return None
+
+
+class PaperBatch:
+    """
+    Columnar view of a list of papers for the retrieval stages.
+
+    Titles, abstracts and ids are kept as parallel lists, built once, so the rag stages can
+    narrow the candidates with `take()` instead of rebuilding per-stage lists from dicts.
+
+    Attributes:
+        records: The papers (or document dicts) in order.
+        titles: The title of each record.
+        abstracts: The abstract of each record ("" when missing).
+        ids: The paper_key of each record (None when it has no id).
+    """
+
+    __slots__ = ("records", "titles", "abstracts", "ids", "_refs")
+
+    def __init__(self,
+                 records: list[dict[str, Any]],
+                 titles: list[str],
+                 abstracts: list[str],
+                 ids: list[str | None]):
+        self.records = records
+        self.titles = titles
+        self.abstracts = abstracts
+        self.ids = ids
+        self._refs = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict[str, Any]]) -> "PaperBatch":
+        batch = cls([], [], [], [])
+        batch.extend(records)
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable["PaperBatch"]) -> "PaperBatch":
+        """
+        Joins batches without re-reading their records.
+        """
+
+        batches = list(batches)
+        batch = cls([], [], [], [])
+        for part in batches:
+            batch.records.extend(part.records)
+            batch.titles.extend(part.titles)
+            batch.abstracts.extend(part.abstracts)
+            batch.ids.extend(part.ids)
+        if batches and all(part._refs is not None for part in batches):
+            batch._refs = [ref for part in batches for ref in part._refs]
+        return batch
+
+    def extend(self, records: Iterable[dict[str, Any]]) -> None:
+        """
+        Appends records, e.g. the next chunk of a crawl stream.
+        """
+
+        for record in records:
+            self.records.append(record)
+            self.titles.append(record.get('title') or "")
+            self.abstracts.append(record.get('abstract') or "")
+            self.ids.append(paper_key(record))
+        self._refs = None
+
+    @property
+    def refs(self) -> list[str]:
+        """
+        "title\\nabstract" of each record, the text used by the dense retriever and the reranker.
+        """
+
+        if self._refs is None:
+            self._refs = [title + "\n" + abstract for title, abstract in zip(self.titles, self.abstracts)]
+        return self._refs
+
+    def take(self, indices: Iterable[int]) -> "PaperBatch":
+        """
+        Returns a new batch with the records at the given indices, in that order.
+        """
+
+        indices = list(indices)
+        batch = PaperBatch([self.records[i] for i in indices],
+                           [self.titles[i] for i in indices],
+                           [self.abstracts[i] for i in indices],
+                           [self.ids[i] for i in indices])
+        if self._refs is not None:
+            batch._refs = [self._refs[i] for i in indices]
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> dict[str, Any]:
+        return self.records[index]
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self.records)
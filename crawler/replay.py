@@ -0,0 +1,488 @@
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from xml.sax.saxutils import escape
+
+import requests
+
+from crawler.endpoints import DEFAULT_ENDPOINTS, get_endpoint, set_endpoint
+
+# Parameters that differ between runs but do not change the response, e.g. the polite-pool email.
+DEFAULT_IGNORED_PARAMS = ("mailto",)
+
+_RECORDED_HEADERS = ("Content-Type", "Retry-After", "X-Rate-Limit-Limit", "X-Rate-Limit-Interval",
+                     "X-RateLimit-Remaining", "X-RateLimit-Reset")
+
+
+def request_key(source: str, method: str, path: str, query: str = "", body: bytes = b"",
+                ignored_params: tuple[str, ...] = DEFAULT_IGNORED_PARAMS) -> str:
+    """
+    Returns the cassette key of a request.
+    Query parameters are sorted, so the key does not depend on their order.
+
+    Args:
+        source: The source name, e.g. "arxiv".
+        method: The HTTP method.
+        path: The path below the source's base URL, e.g. "/notes/search" for OpenReview.
+        query: The raw query string.
+        body: The request body (POST requests only).
+        ignored_params: Query parameters left out of the key.
+
+    Returns:
+        The key, e.g. "GET openreview/notes/search?limit=100&offset=0&term=rag".
+    """
+
+    params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in ignored_params)
+    key = f"{method} {source}{path}?{urlencode(params)}"
+    if body:
+        key += f" #{zlib.crc32(body):08x}"
+    return key
+
+
+class Cassette:
+    """
+    Recorded HTTP responses, keyed by request_key() and stored as one JSON file.
+
+    Each interaction is {"status": int, "headers": {...}, "body": str}. Only successful
+    responses are recorded, so replaying never reproduces a transient error by accident.
+    """
+
+    def __init__(self, path: str | None = None):
+        """
+        Args:
+            path: The JSON file. It is read if it exists. None keeps the cassette in memory.
+        """
+
+        self.path = path
+        self._interactions: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._interactions = json.load(f).get("interactions", {})
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._interactions.get(key)
+
+    def put(self, key: str, status: int, headers: dict[str, str], body: str) -> None:
+        with self._lock:
+            self._interactions[key] = {"status": status, "headers": headers, "body": body}
+
+    def save(self, path: str | None = None) -> None:
+        """
+        Writes the cassette atomically to `path` (defaults to the file it was loaded from).
+        """
+
+        path = path or self.path
+        if not path:
+            raise ValueError("Cassette has no path")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            payload = {"interactions": dict(sorted(self._interactions.items()))}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._interactions)
+
+
+class StandInServer:
+    """
+    Local HTTP server that stands in for arXiv, OpenReview, Crossref and OpenAlex.
+
+    Every source is served under its own path prefix, e.g. http://127.0.0.1:PORT/arxiv for the
+    arXiv query API, and `install()` points get_endpoint() at them, so the unchanged crawlers
+    talk to this server. A request is answered from the cassette. On a miss it is either
+    forwarded to the real API and recorded (`record=True`), answered with generated papers
+    (`synthetic` > 0), or answered with 404.
+
+    Latency, 429 responses and empty pages can be injected to evaluate throttling and retry
+    behaviour offline. Injection is seeded, so a run is reproducible.
+
+    Attributes:
+        requests: Requests received per source.
+        throttled: 429 responses sent per source.
+        empty: Injected empty pages per source.
+        misses: Requests not found in the cassette per source.
+
+    Example:
+        with StandInServer(Cassette("fixtures/arxiv.json"), latency=0.2, throttle_rate=0.05):
+            docs = crawling_basic("all:retrieval", num=300)
+    """
+
+    def __init__(self,
+                 cassette: Cassette | None = None,
+                 record: bool = False,
+                 synthetic: int = 0,
+                 latency: float = 0.0,
+                 throttle_every: int = 0,
+                 throttle_rate: float = 0.0,
+                 retry_after: float = 1.0,
+                 empty_rate: float = 0.0,
+                 seed: int = 0,
+                 upstreams: dict[str, str] | None = None,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        """
+        Args:
+            cassette: The recorded responses. Defaults to an empty in-memory cassette.
+            record: Forward misses to the real APIs and record their responses.
+            synthetic: Answer misses with this many generated papers per query (0 disables).
+            latency: Seconds added to every response.
+            throttle_every: Answer every n-th request of a source with 429 (0 disables).
+            throttle_rate: Probability of answering a request with 429.
+            retry_after: The Retry-After / resetTime delay of injected 429s, in seconds.
+            empty_rate: Probability of replacing a successful page with an empty one.
+            seed: The seed of the random injections.
+            upstreams: The real base URLs used when recording. Defaults to DEFAULT_ENDPOINTS.
+            host: The address to bind.
+            port: The port to bind. 0 picks a free port.
+        """
+
+        self.cassette = cassette if cassette is not None else Cassette()
+        self.record = record
+        self.synthetic = synthetic
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.empty_rate = empty_rate
+        self.upstreams = dict(DEFAULT_ENDPOINTS, **(upstreams or {}))
+
+        self.requests: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self.empty: Counter = Counter()
+        self.misses: Counter = Counter()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._installed: dict[str, str] = {}
+        self._thread: threading.Thread | None = None
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stand_in = self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, source: str) -> str:
+        return f"{self.base_url}/{source}"
+
+    def start(self) -> "StandInServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.uninstall()
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+        if self.record and self.cassette.path:
+            self.cassette.save()
+
+    def install(self, sources: tuple[str, ...] = tuple(DEFAULT_ENDPOINTS)) -> None:
+        """
+        Points get_endpoint() of the given sources at this server.
+        """
+
+        for source in sources:
+            self._installed.setdefault(source, get_endpoint(source))
+            set_endpoint(source, self.url(source))
+
+    def uninstall(self) -> None:
+        for source, previous in self._installed.items():
+            set_endpoint(source, previous)
+        self._installed.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for counter in (self.requests, self.throttled, self.empty, self.misses):
+                counter.clear()
+
+    def __enter__(self) -> "StandInServer":
+        self.start()
+        self.install()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def handle(self, method: str, path: str, body: bytes) -> tuple[int, dict[str, str], bytes]:
+        """
+        Answers one request. Returns (status, headers, body).
+        """
+
+        parts = urlsplit(path)
+        source, _, rest = parts.path.lstrip("/").partition("/")
+        suffix = "/" + rest if rest else ""
+        if source not in DEFAULT_ENDPOINTS:
+            return 404, {"Content-Type": "text/plain"}, f"Unknown source: {source}".encode()
+
+        with self._lock:
+            self.requests[source] += 1
+            count = self.requests[source]
+            throttle = bool((self.throttle_every and count % self.throttle_every == 0)
+                            or (self.throttle_rate and self._random.random() < self.throttle_rate))
+            empty = bool(self.empty_rate) and self._random.random() < self.empty_rate
+            if throttle:
+                self.throttled[source] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+        if throttle:
+            return self._too_many_requests()
+
+        key = request_key(source, method, suffix, parts.query, body)
+        interaction = self.cassette.get(key)
+        if interaction is None:
+            with self._lock:
+                self.misses[source] += 1
+            if self.record:
+                interaction = self._forward(source, method, suffix, parts.query, body, key)
+            elif self.synthetic:
+                interaction = _synthetic_response(source, suffix, dict(parse_qsl(parts.query)), self.synthetic)
+            if interaction is None:
+                return 404, {"Content-Type": "text/plain"}, f"Not recorded: {key}".encode()
+
+        status, headers, text = interaction["status"], dict(interaction["headers"]), interaction["body"]
+        if empty and status == 200:
+            with self._lock:
+                self.empty[source] += 1
+            text = _empty_page(source)
+        return status, headers, text.encode("utf-8")
+
+    def _too_many_requests(self) -> tuple[int, dict[str, str], bytes]:
+        # Same shape as OpenReview's RateLimitError, so its resetTime parsing is exercised too.
+        reset_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_after)
+        error = {
+            "name": "RateLimitError",
+            "message": "Too many requests",
+            "status": 429,
+            "details": {"resetTime": reset_at.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"},
+        }
+        headers = {"Content-Type": "application/json", "Retry-After": f"{self.retry_after:g}"}
+        return 429, headers, json.dumps(error).encode("utf-8")
+
+    def _forward(self, source: str, method: str, suffix: str, query: str, body: bytes,
+                 key: str) -> dict[str, Any] | None:
+        url = self.upstreams[source] + suffix + (f"?{query}" if query else "")
+        try:
+            response = requests.request(method, url, data=body or None, timeout=120,
+                                        headers={"Accept": "*/*", "Content-Type": "application/json"} if body else None)
+        except requests.exceptions.RequestException as e:
+            print(f"[replay] upstream error: {e}")
+            return None
+
+        headers = {name: response.headers[name] for name in _RECORDED_HEADERS if name in response.headers}
+        if response.ok:
+            self.cassette.put(key, response.status_code, headers, response.text)
+        return {"status": response.status_code, "headers": headers, "body": response.text}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._respond(b"")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._respond(self.rfile.read(length) if length else b"")
+
+    def _respond(self, body: bytes):
+        status, headers, payload = self.server.stand_in.handle(self.command, self.path, body)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# --- synthetic responses ---
+
+_SYNTHETIC_START = datetime(2024, 12, 31, tzinfo=timezone.utc)
+_OAI_PAGE_SIZE = 100
+_OAI_CATEGORIES = ("cs.CL", "cs.LG", "cs.IR cs.CL")
+
+def _synthetic_response(source: str, suffix: str, params: dict[str, str], total: int) -> dict[str, Any] | None:
+    if source == "arxiv":
+        query = params.get("search_query", "")
+        start = int(params.get("start", 0))
+        size = int(params.get("max_results", 10))
+        indices = range(start, max(start, min(start + size, total)))
+        body = _arxiv_feed(query, indices, total, start)
+        return {"status": 200, "headers": {"Content-Type": "application/atom+xml"}, "body": body}
+
+    if source == "arxiv_oai" and params.get("verb") == "ListRecords":
+        # The resumption token carries the offset and the `from` date of the harvest
+        if "resumptionToken" in params:
+            offset, _, from_date = params["resumptionToken"].partition("|")
+            offset = int(offset)
+        else:
+            offset, from_date = 0, params.get("from", "")
+        body = _oai_page(offset, from_date, total)
+        return {"status": 200, "headers": {"Content-Type": "text/xml"}, "body": body}
+
+    if source == "openreview" and suffix == "/notes/search":
+        term = params.get("term", "")
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 1000))
+        notes = [_openreview_note(term, i) for i in range(offset, max(offset, min(offset + limit, total)))]
+        return _json_response({"notes": notes, "count": total})
+
+    if source == "openreview" and suffix == "/notes" and "invitation" in params:
+        invitation = params["invitation"]
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 1000))
+        notes = [_openreview_note(invitation, i) for i in range(offset, max(offset, min(offset + limit, total)))]
+        return _json_response({"notes": notes, "count": total})
+
+    if source == "crossref":
+        if "filter" in params:
+            dois = [part[len("doi:"):] for part in params["filter"].split(",") if part.startswith("doi:")]
+            items = [{"DOI": doi, "is-referenced-by-count": _synthetic_count(doi)} for doi in dois]
+        else:
+            title = params.get("query.title") or params.get("query.bibliographic") or ""
+            items = [{"title": [title], "is-referenced-by-count": _synthetic_count(title)}]
+        return _json_response({"status": "ok", "message": {"items": items, "total-results": len(items)}})
+
+    if source == "openalex":
+        if "filter" in params:
+            dois = params["filter"][len("doi:"):].split("|")
+            results = [{"doi": f"https://doi.org/{doi}", "cited_by_count": _synthetic_count(doi)} for doi in dois]
+        else:
+            title = params.get("search", "")
+            results = [{"display_name": title, "cited_by_count": _synthetic_count(title)}]
+        return _json_response({"meta": {"count": len(results)}, "results": results})
+
+    return None
+
+def _json_response(payload: dict[str, Any]) -> dict[str, Any]:
+    return {"status": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(payload)}
+
+def _synthetic_count(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8")) % 500
+
+def _synthetic_topic(query: str) -> str:
+    words = [w.strip('"()') for w in query.replace(":", " ").split()]
+    words = [w for w in words if w and w.lower() not in ("and", "or", "not", "all", "ti", "abs", "to")]
+    return " ".join(words[:4]) or "papers"
+
+def _arxiv_feed(query: str, indices: range, total: int, start: int) -> str:
+    h = zlib.crc32(query.encode("utf-8"))
+    yymm = f"{23 + h % 2}{1 + (h // 2) % 12:02d}"
+    topic = escape(_synthetic_topic(query))
+
+    entries = []
+    for i in indices:
+        arxiv_id = f"{yymm}.{i:05d}"
+        stamp = (_SYNTHETIC_START - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        entries.append(
+            "<entry>"
+            f"<id>http://arxiv.org/abs/{arxiv_id}v1</id>"
+            f"<updated>{stamp}</updated><published>{stamp}</published>"
+            f"<title>Synthetic paper {i} on {topic}</title>"
+            f"<summary>We study {topic}. This is synthetic abstract number {i}.</summary>"
+            "<author><name>Test Author</name></author>"
+            f'<link href="http://arxiv.org/abs/{arxiv_id}v1" rel="alternate" type="text/html"/>'
+            f'<link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v1" rel="related" type="application/pdf"/>'
+            '<arxiv:primary_category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>'
+            '<category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>'
+            "</entry>"
+        )
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"'
+        ' xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        f"<id>http://arxiv.org/api/synthetic</id><title>arXiv Query: {escape(query)}</title>"
+        f"<updated>{_SYNTHETIC_START.strftime('%Y-%m-%dT%H:%M:%SZ')}</updated>"
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>"
+        f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+        f"<opensearch:itemsPerPage>{len(entries)}</opensearch:itemsPerPage>"
+        + "".join(entries) +
+        "</feed>"
+    )
+
+def _oai_page(offset: int, from_date: str, total: int) -> str:
+    # Record i changed i hours before _SYNTHETIC_START, so `from` keeps a prefix of the records
+    stamps = [(_SYNTHETIC_START - timedelta(hours=i)).strftime("%Y-%m-%d") for i in range(total)]
+    matching = sum(stamp >= from_date for stamp in stamps)
+    header = ('<?xml version="1.0" encoding="UTF-8"?>'
+              '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+              f"<responseDate>{_SYNTHETIC_START.strftime('%Y-%m-%dT%H:%M:%SZ')}</responseDate>")
+    if matching == 0:
+        return header + '<error code="noRecordsMatch">No records</error></OAI-PMH>'
+
+    records = []
+    for i in range(offset, min(offset + _OAI_PAGE_SIZE, matching)):
+        arxiv_id = f"2412.{i:05d}"
+        records.append(
+            "<record><header>"
+            f"<identifier>oai:arXiv.org:{arxiv_id}</identifier><datestamp>{stamps[i]}</datestamp>"
+            "<setSpec>cs</setSpec></header>"
+            '<metadata><arXiv xmlns="http://arxiv.org/OAI/arXiv/">'
+            f"<id>{arxiv_id}</id><created>{stamps[i]}</created>"
+            f"<title>Synthetic harvested paper {i}</title>"
+            f"<categories>{_OAI_CATEGORIES[i % len(_OAI_CATEGORIES)]}</categories>"
+            f"<abstract>This is synthetic abstract number {i}.</abstract>"
+            "</arXiv></metadata></record>"
+        )
+    end = offset + len(records)
+    token = f"{end}|{from_date}" if end < matching else ""
+    return (header + "<ListRecords>" + "".join(records)
+            + f'<resumptionToken cursor="{offset}" completeListSize="{matching}">{token}</resumptionToken>'
+            + "</ListRecords></OAI-PMH>")
+
+def _openreview_note(term: str, i: int) -> dict[str, Any]:
+    h = zlib.crc32(term.encode("utf-8"))
+    note_id = f"syn{h:08x}{i:05d}"
+    cdate = int((_SYNTHETIC_START - timedelta(hours=i)).timestamp() * 1000)
+    topic = _synthetic_topic(term)
+    return {
+        "id": note_id,
+        "forum": note_id,
+        "cdate": cdate,
+        "mdate": cdate,
+        "invitations": ["Synthetic.cc/2024/Conference/-/Submission"],
+        "content": {
+            "title": {"value": f"Synthetic paper {i} on {topic}"},
+            "abstract": {"value": f"We study {topic}. This is synthetic abstract number {i}."},
+            "venue": {"value": "Synthetic 2024 Poster" if i % 3 else "Submitted to Synthetic 2024"},
+        },
+    }
+
+def _empty_page(source: str) -> str:
+    if source == "arxiv":
+        return _arxiv_feed("", range(0), 0, 0)
+    if source == "arxiv_oai":
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+                '<error code="noRecordsMatch">No records</error></OAI-PMH>')
+    if source == "openreview":
+        return json.dumps({"notes": [], "count": 0})
+    if source == "crossref":
+        return json.dumps({"status": "ok", "message": {"items": [], "total-results": 0}})
+    return json.dumps({"meta": {"count": 0}, "results": []})
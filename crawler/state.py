@@ -0,0 +1,134 @@
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from crawler.record import Paper
+
+
+@dataclass
+class CrawlState:
+    """
+    Progress of a paged crawl, shared between calls so a crawl can be continued.
+
+    Attributes:
+        offset: The server-side offset of the next result to request.
+        seen: The ids (arXiv) or titles (OpenReview) already collected, used for deduplication.
+        documents: The documents collected so far.
+        exhausted: True once the server has no more results for the query.
+    """
+
+    offset: int = 0
+    seen: set[str] = field(default_factory=set)
+    documents: list[Paper] = field(default_factory=list)
+    exhausted: bool = False
+
+    def save(self, path: str, tag: str | None = None) -> None:
+        """
+        Writes the state to a JSON checkpoint file.
+        The file is replaced atomically, so a crash while saving keeps the previous checkpoint.
+
+        Args:
+            path: The checkpoint file.
+            tag: The search query and parameters of the crawl (see checkpoint_tag), checked again by load().
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        payload = {
+            'tag': tag,
+            'offset': self.offset,
+            'seen': sorted(self.seen),
+            'documents': self.documents,
+            'exhausted': self.exhausted,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, default=_encode)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, tag: str | None = None) -> "CrawlState | None":
+        """
+        Reads a checkpoint written by save().
+
+        Args:
+            path: The checkpoint file.
+            tag: If given, the checkpoint is only used when it was saved with the same tag,
+                i.e. for the same query and crawl parameters.
+
+        Returns:
+            The restored state, or None when there is no usable checkpoint.
+        """
+
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f, object_hook=_decode)
+        except (OSError, ValueError) as e:
+            print(f"[warn] cannot read checkpoint {path}: {e}")
+            return None
+
+        if tag is not None and payload.get('tag') != tag:
+            print(f"[warn] checkpoint {path} belongs to another query or other crawl parameters, ignored")
+            return None
+
+        return cls(
+            offset=payload['offset'],
+            seen=set(payload['seen']),
+            documents=[Paper.from_dict(doc) for doc in payload['documents']],
+            exhausted=payload['exhausted'],
+        )
+
+
+def checkpoint_tag(query: str, **params: Any) -> str:
+    """
+    Builds the tag that ties a checkpoint to a crawl: the search query plus every parameter
+    that changes which results the crawl pages through, e.g. sort_op, date or accept.
+    A checkpoint saved with one sort order or date range is never resumed with another.
+    """
+
+    return json.dumps({'query': query, **params}, sort_keys=True, default=str)
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, Paper):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _decode(obj: dict[str, Any]) -> Any:
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def load_or_new_state(state: CrawlState | None, checkpoint: str | None, resume: bool,
+                      tag: str | None = None) -> CrawlState:
+    """
+    Picks the state a crawler starts from: the given state, a resumed checkpoint or a fresh one.
+    """
+
+    if state is not None:
+        return state
+    if checkpoint and resume:
+        loaded = CrawlState.load(checkpoint, tag=tag)
+        if loaded is not None:
+            print(f"[resume] offset={loaded.offset}, documents={len(loaded.documents)}")
+            return loaded
+    return CrawlState()
+
+def finish_checkpoint(state: CrawlState, checkpoint: str | None, completed: bool,
+                      tag: str | None = None) -> None:
+    """
+    Saves the checkpoint of an unfinished crawl, or removes it once the crawl completed.
+    """
+
+    if not checkpoint:
+        return
+    if completed:
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    else:
+        state.save(checkpoint, tag=tag)
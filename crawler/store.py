@@ -0,0 +1,331 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from crawler.record import Paper, paper_key
+from crawler.utils import DEFAULT_CACHE_DIR
+
+DEFAULT_PAPER_STORE_PATH = os.path.join(DEFAULT_CACHE_DIR, "papers.sqlite3")
+
+_COLUMNS = ("source", "arxiv_id", "forum_id", "title", "url", "abstract",
+            "updated_date", "cdate", "decision_info", "doi")
+
+
+class PaperStore:
+    """
+    Local SQLite store for crawled papers.
+
+    Documents are upserted and deduplicated by arXiv id / OpenReview forum id.
+    For every query the store remembers which papers it returned and the newest
+    `updated_date` (arXiv) or `cdate` (OpenReview) seen so far, so later crawls
+    only need to fetch newer papers. An FTS5 index over titles and abstracts lets
+    keyword queries be answered from the store alone (see `search`).
+    """
+
+    def __init__(self, path: str = DEFAULT_PAPER_STORE_PATH):
+        """
+        Args:
+            path: The SQLite file. Use ":memory:" for a store that is not persisted.
+        """
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                arxiv_id TEXT,
+                forum_id TEXT,
+                title TEXT NOT NULL,
+                url TEXT,
+                abstract TEXT,
+                updated_date TEXT,
+                cdate INTEGER,
+                decision_info TEXT,
+                doi TEXT,
+                stored_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS query_papers (
+                query_key TEXT NOT NULL,
+                paper_key TEXT NOT NULL,
+                PRIMARY KEY (query_key, paper_key)
+            );
+            CREATE TABLE IF NOT EXISTS syncs (
+                query_key TEXT PRIMARY KEY,
+                newest TEXT,
+                synced_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS harvests (
+                harvest_key TEXT PRIMARY KEY,
+                token TEXT,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self) -> None:
+        # External-content FTS5 index over title/abstract, kept in sync by triggers.
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'papers_fts'"
+        ).fetchone()
+        self._conn.executescript(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, abstract, content='papers', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts (rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, abstract)
+                VALUES ('delete', old.rowid, old.title, old.abstract);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, abstract)
+                VALUES ('delete', old.rowid, old.title, old.abstract);
+                INSERT INTO papers_fts (rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+            END;
+            """
+        )
+        if not exists:
+            # Stores created before the index existed
+            self._conn.execute("INSERT INTO papers_fts (papers_fts) VALUES ('rebuild')")
+
+    def upsert(self, documents: list[dict[str, Any]], query_key: str | None = None) -> int:
+        """
+        Inserts the documents, replacing stored papers with the same key.
+
+        Args:
+            documents: Documents produced by the crawlers.
+            query_key: If given, the documents are also recorded as results of this query.
+
+        Returns:
+            The number of documents written. Documents without an id are skipped.
+        """
+
+        rows = []
+        for doc in documents:
+            key = paper_key(doc)
+            if key is None:
+                continue
+            row = _to_row(doc, key)
+            rows.append((key, *row, time.time()))
+
+        placeholders = ",".join("?" * (len(_COLUMNS) + 2))
+        updates = ", ".join(f"{col} = excluded.{col}" for col in _COLUMNS)
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO papers (paper_key, {', '.join(_COLUMNS)}, stored_at) VALUES ({placeholders})"
+                f" ON CONFLICT(paper_key) DO UPDATE SET {updates}, stored_at = excluded.stored_at",
+                rows
+            )
+            if query_key is not None:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO query_papers (query_key, paper_key) VALUES (?, ?)",
+                    [(query_key, row[0]) for row in rows]
+                )
+            self._conn.commit()
+
+        return len(rows)
+
+    def get(self, keys: list[str]) -> list[Paper]:
+        """
+        Returns the stored documents for the given paper keys, skipping unknown keys.
+        """
+
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT paper_key, {', '.join(_COLUMNS)} FROM papers WHERE paper_key IN ({placeholders})",
+                    chunk
+                )
+                for row in cursor:
+                    found[row[0]] = _from_row(row[1:])
+
+        return [found[key] for key in keys if key in found]
+
+    def query_documents(self, query_key: str, limit: int | None = None) -> list[Paper]:
+        """
+        Returns the stored results of a query, newest first.
+
+        Args:
+            query_key: The query key used when the documents were upserted.
+            limit: The maximum number of documents to return.
+
+        Returns:
+            The documents ordered by `updated_date` / `cdate`, newest first.
+        """
+
+        sql = (
+            f"SELECT {', '.join('p.' + col for col in _COLUMNS)} FROM papers p"
+            " JOIN query_papers q ON q.paper_key = p.paper_key"
+            " WHERE q.query_key = ?"
+            " ORDER BY COALESCE(p.updated_date, '') DESC, COALESCE(p.cdate, 0) DESC"
+        )
+        params: list[Any] = [query_key]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            return [_from_row(row) for row in self._conn.execute(sql, params)]
+
+    def search(self,
+               fts_query: str,
+               limit: int = 50,
+               source: str | None = None,
+               date: list[int] | None = None,
+               query_key: str | None = None) -> list[Paper]:
+        """
+        Full-text search over the titles and abstracts of all stored papers.
+
+        Args:
+            fts_query: An SQLite FTS5 query, e.g. built with soft_parsing_fts.
+            limit: The maximum number of documents to return.
+            source: Restrict to "arxiv" or "openreview" papers.
+            date: [start_year, end_year] on `updated_date` (arXiv) or `cdate` (OpenReview).
+            query_key: Restrict to the papers recorded under this query key, e.g. an ingested venue.
+
+        Returns:
+            The matching documents, best BM25 match first.
+        """
+
+        sql = (
+            f"SELECT {', '.join('p.' + col for col in _COLUMNS)} FROM papers_fts"
+            " JOIN papers p ON p.rowid = papers_fts.rowid"
+            " WHERE papers_fts MATCH ?"
+        )
+        params: list[Any] = [fts_query]
+        if source is not None:
+            sql += " AND p.source = ?"
+            params.append(source)
+        if query_key is not None:
+            sql += " AND p.paper_key IN (SELECT paper_key FROM query_papers WHERE query_key = ?)"
+            params.append(query_key)
+        if date and len(date) == 2:
+            start_year, end_year = date[0], date[1]
+            start_ms = int(datetime(start_year, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+            end_ms = int(datetime(end_year + 1, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+            sql += (" AND ((p.updated_date >= ? AND p.updated_date < ?)"
+                    " OR (p.updated_date IS NULL AND p.cdate >= ? AND p.cdate < ?))")
+            params += [f"{start_year:04d}", f"{end_year + 1:04d}", start_ms, end_ms]
+        sql += " ORDER BY bm25(papers_fts) LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            return [_from_row(row) for row in self._conn.execute(sql, params)]
+
+    def get_harvest_token(self, harvest_key: str) -> str | None:
+        """
+        Returns the saved resumption token of an unfinished harvest, or None.
+        """
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT token FROM harvests WHERE harvest_key = ?", (harvest_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_harvest_token(self, harvest_key: str, token: str | None) -> None:
+        """
+        Saves the resumption token of a harvest. None marks the harvest as finished.
+        """
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO harvests (harvest_key, token, updated_at) VALUES (?, ?, ?)",
+                (harvest_key, token, time.time())
+            )
+            self._conn.commit()
+
+    def get_sync(self, query_key: str) -> tuple[str | None, float] | None:
+        """
+        Returns (newest, synced_at) of the last sync of a query, or None if it was never synced.
+        `newest` is the ISO `updated_date` for arXiv queries and the `cdate` in ms for OpenReview queries.
+        """
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest, synced_at FROM syncs WHERE query_key = ?", (query_key,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def mark_synced(self, query_key: str, newest: str | None) -> None:
+        """
+        Records that a query was synced now. The newest marker never moves backwards.
+        """
+
+        previous = self.get_sync(query_key)
+        if previous and previous[0] is not None and (newest is None or _newer(previous[0], newest)):
+            newest = previous[0]
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO syncs (query_key, newest, synced_at) VALUES (?, ?, ?)",
+                (query_key, newest, time.time())
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+
+def _newer(a: str, b: str) -> bool:
+    # cdate markers are integers in ms, updated_date markers are ISO strings.
+    if a.isdigit() and b.isdigit():
+        return int(a) > int(b)
+    return a > b
+
+def _to_row(doc: dict[str, Any], key: str) -> tuple:
+    updated = doc.get('updated_date')
+    if isinstance(updated, datetime):
+        updated = updated.isoformat()
+    forum_id = doc.get('forum_id') or (key.split(":", 1)[1] if key.startswith("openreview:") else None)
+    return (
+        key.split(":", 1)[0],
+        doc.get('arxiv_id'),
+        forum_id,
+        doc.get('title', ''),
+        doc.get('url'),
+        doc.get('abstract'),
+        updated,
+        doc.get('cdate'),
+        doc.get('decision_info'),
+        doc.get('doi'),
+    )
+
+def _from_row(row: tuple) -> Paper:
+    record = dict(zip(_COLUMNS, row))
+    source = record.pop('source')
+
+    # Rebuild the same shape the crawlers produce.
+    if source == "arxiv":
+        return Paper(
+            title=record['title'],
+            url=record['url'],
+            abstract=record['abstract'],
+            updated_date=datetime.fromisoformat(record['updated_date']) if record['updated_date'] else None,
+            arxiv_id=record['arxiv_id'],
+            doi=record['doi'],
+        )
+    return Paper(
+        title=record['title'],
+        url=record['url'],
+        abstract=record['abstract'],
+        cdate=record['cdate'],
+        decision_info=record['decision_info'] or "",
+    )
@@ -1,4 +1,10 @@
+import os
+import queue
+import re
 import textwrap
+import threading
+import unicodedata
+from typing import Iterable, Iterator, TypeVar
 
 def document_print(document: list[dict[str, str]]) -> None:
     """
@@ -31,4 +37,114 @@ def document_print(document: list[dict[str, str]]) -> None:
         )
         print(wrapped_abstract)
 
-    print(f"\n{'=' * 58}")
\ No newline at end of file
+    print(f"\n{'=' * 58}")
+
+# Root directory for the on-disk caches and stores used by the crawler.
+# It can be moved with the PAPER_REC_CACHE_DIR environment variable.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PAPER_REC_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "paper-recommendation")
+)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_title(title: str) -> str:
+    """
+    Normalizes a paper title so that trivially different spellings compare equal.
+
+    Case, accents, punctuation and repeated whitespace are removed,
+    e.g. "Attention Is All You Need!" -> "attention is all you need".
+
+    Args:
+        title: The title of the paper.
+
+    Returns:
+        The normalized title.
+    """
+
+    text = unicodedata.normalize("NFKD", str(title or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+T = TypeVar("T")
+
+def batched(iterable: Iterable[T], batch_size: int) -> Iterator[list[T]]:
+    """
+    Groups the items of an iterable into lists of `batch_size` items.
+    The last batch may be shorter.
+
+    Args:
+        iterable: The items, e.g. the documents yielded by iter_crawling_basic.
+        batch_size: The number of items per batch.
+
+    Returns:
+        An iterator over the batches.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_PREFETCH_DONE = object()
+
+def prefetch(iterable: Iterable[T], max_buffered: int = 256) -> Iterator[T]:
+    """
+    Consumes an iterable in a background thread while the caller processes earlier items.
+
+    Wrapping a crawler generator in prefetch() keeps the crawl paging while the caller
+    is busy with the documents it already received, e.g. embedding them.
+    Exceptions raised by the iterable are re-raised in the caller.
+
+    Args:
+        iterable: The items to consume.
+        max_buffered: The maximum number of items buffered ahead of the caller.
+
+    Returns:
+        An iterator over the same items in the same order.
+    """
+
+    buffer: queue.Queue = queue.Queue(maxsize=max_buffered)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        # Gives up once the caller stopped reading, so the thread never blocks forever.
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_PREFETCH_DONE)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _PREFETCH_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
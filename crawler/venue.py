@@ -0,0 +1,152 @@
+import argparse
+from typing import Iterator
+
+import openreview
+
+from crawler.endpoints import get_endpoint
+from crawler.openreview_crawling import _as_str, _request_openreview
+from crawler.rate_limit import get_rate_limiter
+from crawler.record import Paper
+from crawler.store import PaperStore
+
+# The API returns at most 1000 notes per request.
+VENUE_PAGE_SIZE = 1000
+
+
+def venue_query_key(venue_id: str) -> str:
+    """
+    Returns the store query key under which the submissions of a venue are recorded.
+    """
+
+    return f"venue:{venue_id}"
+
+def _note_document(note) -> Paper | None:
+    if getattr(note, 'replyto', None):
+        return None
+
+    c = note.content or {}
+    title = _as_str(c.get('title')).strip()
+    abstract = _as_str(c.get('abstract')).strip()
+    if not title or not abstract:
+        return None
+
+    # venue is e.g. "ICLR 2024 poster" for accepted and "Submitted to ICLR 2024" for rejected papers
+    decision = _as_str(c.get('decision'))
+    venue = _as_str(c.get('venue'))
+    forum_id = getattr(note, 'forum', None) or note.id
+    return Paper(
+        title=title,
+        url=f"https://openreview.net/forum?id={forum_id}",
+        abstract=abstract,
+        cdate=note.cdate,
+        decision_info=decision or venue,
+    )
+
+def iter_venue_submissions(invitation: str,
+                           offset: int = 0,
+                           page_size: int = VENUE_PAGE_SIZE,
+                           client: openreview.api.OpenReviewClient | None = None) -> Iterator[tuple[list[Paper], int]]:
+    """
+    Pages through all notes of a submission invitation with get_notes.
+
+    Unlike search_notes, get_notes filtered by invitation only returns submissions (no
+    comments or reviews) and allows 1000 notes per request.
+
+    Args:
+        invitation: The submission invitation, e.g. "ICLR.cc/2024/Conference/-/Submission".
+        offset: Continue from this offset.
+        page_size: The number of notes per request.
+        client: The OpenReview client. Defaults to an anonymous client on get_endpoint("openreview").
+
+    Returns:
+        An iterator over (documents, offset of the next page) per page.
+    """
+
+    client = client or openreview.api.OpenReviewClient(baseurl=get_endpoint("openreview"))
+    limiter = get_rate_limiter("openreview")
+
+    while True:
+        notes = _request_openreview(
+            lambda: client.get_notes(invitation=invitation, limit=page_size, offset=offset, sort="number:asc"),
+            limiter
+        )
+        if notes is None:
+            raise RuntimeError(f"Cannot fetch notes of {invitation} at offset {offset}")
+
+        offset += len(notes)
+        documents = [doc for doc in map(_note_document, notes) if doc is not None]
+        yield documents, offset
+
+        if len(notes) < page_size:
+            return
+
+
+def ingest_openreview_venue(store: PaperStore,
+                            venue_id: str,
+                            invitation: str | None = None,
+                            resume: bool = True,
+                            max_pages: int | None = None,
+                            page_size: int = VENUE_PAGE_SIZE) -> int:
+    """
+    Bulk-ingests all submissions of an OpenReview venue into the local store.
+
+    The submissions are stored with their decision/venue string and recorded under
+    venue_query_key(venue_id), so accept, date and keyword filters can then run locally,
+    e.g. main_crawling(keywords, accept=True, date=[2024, 2024], venue=venue_id).
+    The offset is saved after every page, so an interrupted ingestion continues where it
+    stopped. A finished ingestion starts over on the next call to pick up new decisions.
+
+    Args:
+        store: The local paper store.
+        venue_id: The venue id, e.g. "ICLR.cc/2024/Conference" or "NeurIPS.cc/2023/Conference".
+        invitation: The submission invitation. Defaults to "<venue_id>/-/Submission".
+        resume: Continue from the saved offset of the same venue.
+        max_pages: Stop after this many pages. The ingestion can be resumed later.
+        page_size: The number of notes per request.
+
+    Returns:
+        The number of documents written to the store.
+    """
+
+    invitation = invitation or f"{venue_id}/-/Submission"
+    harvest_key = f"openreview-venue:{invitation}"
+    token = store.get_harvest_token(harvest_key) if resume else None
+    offset = int(token) if token else 0
+
+    written = 0
+    pages = 0
+    finished = True
+    for documents, next_offset in iter_venue_submissions(invitation, offset=offset, page_size=page_size):
+        written += store.upsert(documents, query_key=venue_query_key(venue_id))
+        store.set_harvest_token(harvest_key, str(next_offset))
+
+        pages += 1
+        print(f"[venue] {venue_id} page {pages}: {written} documents")
+        if max_pages is not None and pages >= max_pages:
+            finished = False
+            break
+
+    if finished:
+        store.set_harvest_token(harvest_key, None)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest all submissions of OpenReview venues into the local paper store.")
+    parser.add_argument("venues", nargs="+", help='e.g. "ICLR.cc/2024/Conference"')
+    parser.add_argument("--invitation", default=None, help="submission invitation (default: <venue>/-/Submission)")
+    parser.add_argument("--store", default=None, help="SQLite file of the paper store")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved offset")
+    args = parser.parse_args()
+
+    store = PaperStore(args.store) if args.store else PaperStore()
+    for venue_id in args.venues:
+        written = ingest_openreview_venue(store, venue_id, invitation=args.invitation,
+                                          resume=not args.restart, max_pages=args.max_pages)
+        print(f"[venue] {venue_id} done: {written} documents")
+    print(f"[venue] {len(store)} papers in store")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import json
+import os
+from typing import Iterable
+
+import numpy as np
+
+
+class _Segment:
+    """
+    An immutable term-major CSR block of postings.
+
+    The postings of term t are doc_ids[indptr[t]:indptr[t + 1]] with the term frequencies
+    tfs[...]. Terms added to the vocabulary after the segment was built have no row.
+    """
+
+    __slots__ = ("indptr", "doc_ids", "tfs")
+
+    def __init__(self, indptr: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray):
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+
+    @property
+    def num_terms(self) -> int:
+        return len(self.indptr) - 1
+
+    def term_ids(self) -> np.ndarray:
+        """
+        Returns the term id of every posting.
+        """
+        return np.repeat(np.arange(self.num_terms, dtype=np.int64), np.diff(self.indptr))
+
+    def postings(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        if term_id >= self.num_terms:
+            return self.doc_ids[:0], self.tfs[:0]
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+
+class BM25Index:
+    """
+    BM25 index over sparse term-document arrays, scored with vectorized numpy operations.
+
+    The scores are the same as rank_bm25.BM25Okapi, including its idf floor of
+    epsilon * average idf for terms that occur in more than half of the documents.
+
+    Postings are kept in term-major CSR segments. add() appends a new segment and remove()
+    only marks documents as removed, so both are cheap; compact() (called by save()) merges
+    the segments and drops the postings of removed documents. Document ids are positions in
+    insertion order and stay stable across add, remove, compact, save and load.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        self.vocab: dict[str, int] = {}
+        self.segments: list[_Segment] = []
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.df = np.zeros(0, dtype=np.int64)
+        self._idf: np.ndarray | None = None
+        self._norm: np.ndarray | None = None
+
+    @classmethod
+    def from_tokenized(cls, corpus: list[list[str]], **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        index.add(corpus)
+        return index
+
+    def __len__(self) -> int:
+        """
+        Returns the number of documents that are not removed.
+        """
+        return int(self.alive.sum())
+
+    @property
+    def num_docs(self) -> int:
+        """
+        Returns the number of document ids, including removed documents.
+        """
+        return len(self.doc_len)
+
+    def _invalidate(self) -> None:
+        self._idf = None
+        self._norm = None
+
+    def add(self, corpus: Iterable[list[str]]) -> np.ndarray:
+        """
+        Adds tokenized documents.
+
+        Args:
+            corpus: The tokens of each document.
+
+        Returns:
+            The ids of the new documents.
+        """
+
+        start = self.num_docs
+        term_ids: list[int] = []
+        lengths: list[int] = []
+        for tokens in corpus:
+            for token in tokens:
+                term_id = self.vocab.get(token)
+                if term_id is None:
+                    term_id = self.vocab[token] = len(self.vocab)
+                term_ids.append(term_id)
+            lengths.append(len(tokens))
+
+        num_new = len(lengths)
+        doc_ids = np.arange(start, start + num_new, dtype=np.int64)
+        if num_new == 0:
+            return doc_ids
+
+        num_terms = len(self.vocab)
+        terms = np.asarray(term_ids, dtype=np.int64)
+        docs = np.repeat(doc_ids, lengths)
+
+        # One (term, doc) key per token; unique() sorts them term-major and counts the tfs
+        keys, tfs = np.unique(terms * (start + num_new) + docs, return_counts=True)
+        posting_terms = keys // (start + num_new)
+        indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=num_terms), out=indptr[1:])
+        self.segments.append(_Segment(indptr,
+                                      (keys % (start + num_new)).astype(np.int32),
+                                      tfs.astype(np.float32)))
+
+        self.df = np.concatenate([self.df, np.zeros(num_terms - len(self.df), dtype=np.int64)])
+        self.df += np.bincount(posting_terms, minlength=num_terms)
+        self.doc_len = np.concatenate([self.doc_len, np.asarray(lengths, dtype=np.float32)])
+        self.alive = np.concatenate([self.alive, np.ones(num_new, dtype=bool)])
+        self._invalidate()
+        return doc_ids
+
+    def remove(self, doc_ids: Iterable[int]) -> None:
+        """
+        Removes documents. Their ids are not reused.
+        """
+
+        doc_ids = np.asarray(list(doc_ids), dtype=np.int64)
+        doc_ids = doc_ids[self.alive[doc_ids]] if len(doc_ids) else doc_ids
+        if len(doc_ids) == 0:
+            return
+
+        removed = np.zeros(self.num_docs, dtype=bool)
+        removed[doc_ids] = True
+        for segment in self.segments:
+            mask = removed[segment.doc_ids]
+            if mask.any():
+                self.df -= np.bincount(segment.term_ids()[mask], minlength=len(self.df))
+        self.alive[doc_ids] = False
+        self._invalidate()
+
+    def compact(self) -> None:
+        """
+        Merges all segments into one and drops the postings of removed documents.
+        """
+
+        if len(self.segments) <= 1 and (not self.segments or self.alive[self.segments[0].doc_ids].all()):
+            return
+
+        num_terms = len(self.vocab)
+        terms = np.concatenate([segment.term_ids() for segment in self.segments])
+        docs = np.concatenate([segment.doc_ids for segment in self.segments])
+        tfs = np.concatenate([segment.tfs for segment in self.segments])
+
+        keep = self.alive[docs]
+        terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+        # A stable sort by term keeps the doc ids of every term in ascending order
+        order = np.argsort(terms, kind="stable")
+        indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=num_terms), out=indptr[1:])
+        self.segments = [_Segment(indptr, docs[order].astype(np.int32), tfs[order])]
+
+    def idf(self) -> np.ndarray:
+        """
+        Returns the idf of every term, with the epsilon floor of rank_bm25.BM25Okapi.
+        """
+
+        if self._idf is None:
+            n = len(self)
+            df = self.df.astype(np.float64)
+            idf = np.log(n - df + 0.5) - np.log(df + 0.5)
+            present = self.df > 0
+            average_idf = idf[present].mean() if present.any() else 0.0
+            idf[present & (idf < 0)] = self.epsilon * average_idf
+            idf[~present] = 0.0
+            self._idf = idf.astype(np.float32)
+        return self._idf
+
+    def _length_norm(self) -> np.ndarray:
+        if self._norm is None:
+            n = len(self)
+            avgdl = self.doc_len[self.alive].sum() / n if n else 1.0
+            self._norm = (self.k1 * (1 - self.b + self.b * self.doc_len / max(avgdl, 1e-8))).astype(np.float32)
+        return self._norm
+
+    def get_scores(self, query: list[str], doc_ids: np.ndarray | None = None) -> np.ndarray:
+        """
+        Scores a tokenized query against the documents.
+
+        Args:
+            query: The query tokens. Repeated tokens count repeatedly, as in rank_bm25.
+            doc_ids: Only return the scores of these documents.
+
+        Returns:
+            A float32 array with one score per document id (or per entry of doc_ids).
+            Removed documents score 0.
+        """
+
+        idf = self.idf()
+        norm = self._length_norm()
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for token in query:
+            term_id = self.vocab.get(token)
+            if term_id is None or idf[term_id] == 0:
+                continue
+            for segment in self.segments:
+                docs, tfs = segment.postings(term_id)
+                if len(docs):
+                    scores[docs] += idf[term_id] * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        scores[~self.alive] = 0.0
+        return scores if doc_ids is None else scores[doc_ids]
+
+    def top_k(self, query: list[str], k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the ids and scores of the k best documents, best first.
+        """
+
+        scores = self.get_scores(query)
+        candidates = np.flatnonzero(self.alive)
+        k = min(k, len(candidates))
+        if k == 0:
+            return candidates[:0], scores[:0]
+
+        candidate_scores = scores[candidates]
+        if k < len(candidates):
+            part = np.argpartition(-candidate_scores, k - 1)[:k]
+        else:
+            part = np.arange(len(candidates))
+        best = part[np.argsort(-candidate_scores[part], kind="stable")]
+        return candidates[best], candidate_scores[best]
+
+    def save(self, path: str) -> None:
+        """
+        Compacts the index and writes it to a directory of .npy files that load() can memory-map.
+        Saving over the directory the index was loaded from is safe.
+        """
+
+        self.compact()
+        os.makedirs(path, exist_ok=True)
+        segment = self.segments[0] if self.segments else _Segment(
+            np.zeros(len(self.vocab) + 1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        )
+        arrays = {
+            "indptr": segment.indptr, "doc_ids": segment.doc_ids, "tfs": segment.tfs,
+            "doc_len": self.doc_len, "alive": self.alive, "df": self.df,
+        }
+        # Written next to the old files and swapped in, since a loaded index may still map them
+        for name, array in arrays.items():
+            tmp = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp, array)
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+
+        terms = [None] * len(self.vocab)
+        for term, term_id in self.vocab.items():
+            terms[term_id] = term
+        meta = {"k1": self.k1, "b": self.b, "epsilon": self.epsilon, "terms": terms}
+        tmp = os.path.join(path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        """
+        Loads an index written by save(). With mmap the postings stay on disk and are paged in
+        on demand; add() and remove() still work since they never modify existing postings.
+        """
+
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(k1=meta["k1"], b=meta["b"], epsilon=meta["epsilon"])
+        index.vocab = {term: term_id for term_id, term in enumerate(meta["terms"])}
+
+        mmap_mode = "r" if mmap else None
+        load = lambda name, mode=None: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+        index.segments = [_Segment(load("indptr", mmap_mode), load("doc_ids", mmap_mode), load("tfs", mmap_mode))]
+        index.doc_len = load("doc_len")
+        index.alive = load("alive")
+        index.df = load("df")
+        return index
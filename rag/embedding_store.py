@@ -0,0 +1,228 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Callable
+
+import numpy as np
+
+from crawler.utils import DEFAULT_CACHE_DIR
+
+DEFAULT_EMBEDDING_DIR = os.path.join(DEFAULT_CACHE_DIR, "embeddings")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _model_dir(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+
+
+class EmbeddingStore:
+    """
+    Persistent cache of text embeddings for one encoder model.
+
+    Embeddings are rows of a memory-mapped matrix (`vectors.<dtype>`) and an SQLite index
+    maps the hash of each text to its row, so the key is (model name, text hash). `encode()`
+    only sends texts that are not stored yet to the encoder, so repeated or overlapping
+    candidate sets cost almost no encoding, also after a restart.
+
+    Rows are allocated inside an SQLite write transaction (`BEGIN IMMEDIATE`, then
+    `MAX(row) + 1`) and the matrix file only ever grows, so several instances or processes
+    can write to the same directory without overwriting each other's rows. Within a process,
+    use get_embedding_store() so all callers share one instance per directory.
+    """
+
+    def __init__(self,
+                 model_name: str,
+                 dim: int,
+                 root: str = DEFAULT_EMBEDDING_DIR,
+                 dtype: str = "float16",
+                 initial_capacity: int = 4096):
+        """
+        Args:
+            model_name: The encoder name. Every model gets its own directory under `root`.
+            dim: The embedding dimension.
+            root: The directory of all embedding stores.
+            dtype: "float16" (half the disk and page cache) or "float32".
+            initial_capacity: The number of rows allocated when the matrix file is created.
+        """
+
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.path = os.path.join(root, _model_dir(model_name))
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit mode; add() manages its own BEGIN IMMEDIATE transactions
+        self._conn = sqlite3.connect(os.path.join(self.path, "index.sqlite3"), timeout=60,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS rows (text_hash TEXT PRIMARY KEY, row INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS rows_row ON rows (row);
+            """
+        )
+        self._check_meta()
+
+        self._vectors_path = os.path.join(self.path, f"vectors.{self.dtype.name}")
+        self._row_bytes = self.dim * self.dtype.itemsize
+        # "ab" creates the file without truncating one that another instance already grew
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < self._row_bytes:
+                f.truncate(max(initial_capacity, 1) * self._row_bytes)
+        self._open()
+
+    def _check_meta(self) -> None:
+        stored = dict(self._conn.execute("SELECT key, value FROM meta"))
+        expected = {"dim": str(self.dim), "dtype": self.dtype.name, "model_name": self.model_name}
+        for key, value in expected.items():
+            if key in stored and stored[key] != value:
+                raise ValueError(f"Embedding store {self.path} has {key}={stored[key]}, not {value}")
+        self._conn.executemany("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", expected.items())
+
+    def _open(self) -> None:
+        capacity = os.path.getsize(self._vectors_path) // self._row_bytes
+        self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+    def _reserve(self, rows: int) -> None:
+        """
+        Makes the mapped matrix hold at least `rows` rows. Called inside the write transaction.
+        The file is never shrunk: its current size, which another writer may have grown past
+        this instance's mapping, is the lower bound.
+        """
+        if rows <= self._matrix.shape[0]:
+            return
+        self._matrix.flush()
+        del self._matrix
+        capacity = os.path.getsize(self._vectors_path) // self._row_bytes
+        if rows > capacity:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(max(rows, 2 * capacity) * self._row_bytes)
+        self._open()
+
+    def lookup(self, hashes: list[str]) -> dict[str, int]:
+        """
+        Returns the rows of the stored hashes, skipping unknown hashes.
+        """
+
+        with self._lock:
+            return self._lookup(hashes)
+
+    def _lookup(self, hashes: list[str]) -> dict[str, int]:
+        found = {}
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self._conn.execute(
+                f"SELECT text_hash, row FROM rows WHERE text_hash IN ({placeholders})", chunk
+            ))
+        return found
+
+    def add(self, hashes: list[str], vectors: np.ndarray) -> list[int]:
+        """
+        Appends embeddings and returns their rows.
+
+        The rows are allocated after the last row of the index inside one write transaction,
+        and the vectors are flushed to disk before it commits, so a crash never leaves index
+        rows pointing at missing data. Hashes that another writer stored in the meantime
+        keep their existing rows.
+        """
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(hashes), self.dim)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row_of = self._lookup(hashes)
+                new: dict[str, int] = {}  # hash -> position of its vector
+                for i, h in enumerate(hashes):
+                    if h not in row_of and h not in new:
+                        new[h] = i
+                start = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+                if new:
+                    self._reserve(start + len(new))
+                    self._matrix[start:start + len(new)] = vectors[list(new.values())].astype(self.dtype)
+                    self._matrix.flush()
+                    new_rows = {h: start + j for j, h in enumerate(new)}
+                    self._conn.executemany("INSERT INTO rows (text_hash, row) VALUES (?, ?)", new_rows.items())
+                    row_of.update(new_rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row_of[h] for h in hashes]
+
+    def get(self, rows: list[int]) -> np.ndarray:
+        """
+        Returns the embeddings at the given rows as float32, shape [len(rows), dim].
+        """
+
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            # Rows written by another process may lie past this instance's mapping
+            if len(rows) and rows.max() >= self._matrix.shape[0]:
+                self._matrix.flush()
+                del self._matrix
+                self._open()
+            return np.asarray(self._matrix[rows], dtype=np.float32)
+
+    def encode(self, texts: list[str], encode_fn: Callable[[list[str]], np.ndarray]) -> np.ndarray:
+        """
+        Returns the embeddings of the texts, encoding only those that are not stored yet.
+
+        Args:
+            texts: The texts to embed.
+            encode_fn: Encodes a list of texts into an array of shape [len(texts), dim].
+
+        Returns:
+            A float32 array of shape [len(texts), dim], in the order of `texts`.
+        """
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        hashes = [text_hash(text) for text in texts]
+        row_of = self.lookup(list(dict.fromkeys(hashes)))
+
+        missing: dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in row_of and h not in missing:
+                missing[h] = text
+        if missing:
+            vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            row_of.update(zip(missing.keys(), self.add(list(missing.keys()), vectors)))
+
+        return self.get([row_of[h] for h in hashes])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+
+_stores: dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+def get_embedding_store(model_name: str, dim: int, root: str = DEFAULT_EMBEDDING_DIR,
+                        dtype: str = "float16") -> EmbeddingStore:
+    """
+    Returns the process-wide EmbeddingStore of a model directory, opening it on first use.
+
+    Every retriever using the same model then shares one store (one connection, one lock,
+    one memory map) instead of opening the directory twice.
+
+    Raises:
+        ValueError: The shared store was opened with another dimension or dtype.
+    """
+
+    path = os.path.realpath(os.path.join(root, _model_dir(model_name)))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = EmbeddingStore(model_name, dim, root=root, dtype=dtype)
+    if store.dim != dim or store.dtype != np.dtype(dtype):
+        raise ValueError(f"Embedding store {store.path} has dim={store.dim}, dtype={store.dtype.name}")
+    return store
@@ -1,51 +1,115 @@
 from rag import model
+from rag.bm25_index import BM25Index
+from rag.embedding_store import get_embedding_store
+from rag.token_cache import TokenCache
+import numpy as np
 import torch
-from rank_bm25 import BM25Okapi
 import spacy
 import torch.nn.functional as F
 
 
+def _min_max(scores: torch.Tensor) -> torch.Tensor:
+    """
+    Min-max normalize scores to [0, 1] along the last dimension, leaving a row unchanged when
+    none of its scores is positive. torch.where keeps the check on the device instead of
+    syncing on a Python bool.
+    """
+    low = scores.amin(dim=-1, keepdim=True)
+    high = scores.amax(dim=-1, keepdim=True)
+    return torch.where(high > 0, (scores - low) / (high - low + 1e-8), scores)
+
+
 class HybridRetriever:
-    def __init__(self, encoder_model_name: str="all-mpnet-base-v2", use_cuda: bool=True):
-        if use_cuda:
-            self.encoder = model.get_encoder(encoder_model_name).to("cuda")
-        else:
-            self.encoder = model.get_encoder(encoder_model_name)
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, encoder_model_name: str="all-mpnet-base-v2", use_cuda: bool=True, cache_embeddings: bool=True,
+                 cache_tokens: bool=True, batch_size: int=256, n_process: int=1):
+        # Shared with every other component that uses the same encoder on the same device
+        self.encoder = model.get_shared_encoder(encoder_model_name, "cuda" if use_cuda else "cpu")
+        # Document embeddings are cached on disk by (model name, text hash); one store per model is shared
+        self.embedding_store = get_embedding_store(
+            encoder_model_name, self.encoder.get_sentence_embedding_dimension()
+        ) if cache_embeddings else None
+        # Lemmas only need the tagger and attribute ruler; the parser and NER are never used
+        self.nlp = spacy.load("en_core_web_sm", disable=["parser", "ner"])
+        self.batch_size = batch_size
+        self.n_process = n_process
+        # BM25 tokens are cached on disk by (spaCy model and version, text hash)
+        self.token_cache = TokenCache(f"{self.nlp.meta['name']}-{self.nlp.meta['version']}") if cache_tokens else None
         self.bm25 = None
 
+    @staticmethod
+    def _doc_tokens(doc) -> list[str]:
+        return [token.lemma_.lower() for token in doc if not token.is_stop and token.is_alpha]
+
     def tokenize(self, text: str):
-        return [token.lemma_.lower() for token in self.nlp(text) if not token.is_stop and token.is_alpha]
+        return self._doc_tokens(self.nlp(text))
+
+    def tokenize_many(self, texts: list[str], batch_size: int | None = None, n_process: int | None = None) -> list[list[str]]:
+        """
+        Tokenize many texts with nlp.pipe. Only texts missing from the token cache are processed.
+
+        Args:
+            texts (list[str]): texts to tokenize
+            batch_size (int, optional): texts per spaCy batch. Defaults to self.batch_size.
+            n_process (int, optional): spaCy worker processes. Defaults to self.n_process.
+
+        Returns:
+            list[list[str]]: tokens of each text
+        """
+        batch_size = batch_size or self.batch_size
+        n_process = n_process or self.n_process
+
+        def tokenize_fn(missing: list[str]) -> list[list[str]]:
+            # Extra processes only pay off on larger inputs
+            processes = n_process if len(missing) >= 4 * batch_size else 1
+            return [self._doc_tokens(doc) for doc in self.nlp.pipe(missing, batch_size=batch_size, n_process=processes)]
+
+        if self.token_cache is None:
+            return tokenize_fn(texts)
+        return self.token_cache.tokenize(texts, tokenize_fn)
 
-    def build_bm25(self, refs: list[str]):
-        tokenized = [self.tokenize(ref) for ref in refs]
-        self.bm25 = BM25Okapi(tokenized)
+    def build_bm25(self, refs: list[str], tokenized: list[list[str]] | None = None):
+        """
+        Build the BM25 index of one candidate set. run() calls this for every new set of papers;
+        a corpus that does not change between queries can be indexed once, saved with
+        BM25Index.save and passed to run() as bm25_index=BM25Index.load(path).
+        """
+        if tokenized is None:
+            tokenized = self.tokenize_many(refs)
+        self.bm25 = BM25Index.from_tokenized(tokenized)
 
     def get_embeddings(self, input_list: list[str]):
         """
-        Encode a list of strings into a tensor of embeddings.
+        Encode a list of strings into a tensor of L2-normalized embeddings.
+        Only strings missing from the embedding store are sent to the encoder.
         """
-        return self.encoder.encode(input_list, convert_to_tensor=True)
+        if self.embedding_store is None:
+            return self.encoder.encode(input_list, convert_to_tensor=True, normalize_embeddings=True)
+        embs = self.embedding_store.encode(input_list, lambda texts: self.encoder.encode(texts, convert_to_numpy=True))
+        return F.normalize(torch.from_numpy(embs).to(self.encoder.device), dim=-1)
 
-    def compute_cosine_similarity(self, query_emb: torch.Tensor, ref_embs: torch.Tensor) -> list[float]:
+    def compute_cosine_similarity(self, query_emb: torch.Tensor, ref_embs: torch.Tensor,
+                                  normalized: bool = False) -> torch.Tensor:
         """
         Compute cosine similarity between a query embedding and reference embeddings.
 
         Args:
             query_emb (torch.Tensor): query embedding tensor (shape: [dim] or [1, dim])
             ref_embs (torch.Tensor): reference embeddings tensor (shape: [N, dim])
+            normalized (bool): ref_embs are already L2-normalized (as returned by get_embeddings),
+                so the scores are a single matrix-vector product
 
         Returns:
-            list[float]: cosine similarity scores for each reference
+            torch.Tensor: cosine similarity scores for each reference (shape: [N])
         """
-        if query_emb.dim() == 1:
-            query_emb = query_emb.unsqueeze(0)
+        query_emb = F.normalize(query_emb.reshape(-1), dim=0).to(ref_embs.dtype)
+        if not normalized:
+            ref_embs = F.normalize(ref_embs, dim=-1)
 
-        cosine_scores = F.cosine_similarity(query_emb, ref_embs)
+        return ref_embs @ query_emb
 
-        return cosine_scores.tolist()
-
-    def run(self, query: str, titles: list[str], abstracts: list[str], alpha: float = 0.7, top_k: int = 1000):
+    def run(self, query: str, titles: list[str], abstracts: list[str], alpha: float = 0.7, top_k: int = 1000,
+            tokenized_refs: list[list[str]] | None = None, ref_embs: torch.Tensor | None = None,
+            bm25_index: BM25Index | None = None, query_emb: torch.Tensor | None = None):
         """
         Hybrid retrieval using BM25 and cosine similarity.
 
@@ -55,6 +119,11 @@ class HybridRetriever:
             abstracts (list[str]): abstracts of papers
             alpha (float): weight for BM25 score (1-alpha for cosine similarity)
             top_k (int): number of top indices to return
+            tokenized_refs (list[list[str]], optional): precomputed tokens of "title\nabstract" for each paper
+            ref_embs (torch.Tensor, optional): precomputed title embeddings from get_embeddings (shape: [N, dim])
+            bm25_index (BM25Index, optional): prebuilt or loaded index whose document ids are the positions
+                in titles. Defaults to a fresh index of the given papers.
+            query_emb (torch.Tensor, optional): precomputed query embedding
 
         Returns:
             list[int]: indices of top-k documents ranked by hybrid score
@@ -62,30 +131,67 @@ class HybridRetriever:
         if alpha < 0 or alpha > 1:
             raise ValueError("alpha must be in [0, 1]")
 
-        documents = []
-        for i in range(len(titles)):
-            documents.append(titles[i] + "\n" + abstracts[i])
+        if bm25_index is None:
+            documents = []
+            for i in range(len(titles)):
+                documents.append(titles[i] + "\n" + abstracts[i])
+            self.build_bm25(documents, tokenized=tokenized_refs)
+            bm25_index = self.bm25
 
-        self.build_bm25(documents)
+        if query_emb is None:
+            query_emb = self.encoder.encode(query, convert_to_tensor=True)
+        if ref_embs is None:
+            ref_embs = self.get_embeddings(titles)
+        cos_tensor = self.compute_cosine_similarity(query_emb, ref_embs, normalized=True).float()
 
+        # The BM25 scores are wrapped without a copy and only moved to the embeddings' device
         tokenized_query = self.tokenize(query)
-        bm25_scores = self.bm25.get_scores(tokenized_query).tolist()
+        bm25_tensor = torch.from_numpy(bm25_index.get_scores(tokenized_query)).to(cos_tensor.device)
 
-        query_emb = self.encoder.encode(query, convert_to_tensor=True)
-        ref_embs = self.get_embeddings(titles)
-        cosine_scores = self.compute_cosine_similarity(query_emb, ref_embs)
+        hybrid_scores = torch.add(_min_max(cos_tensor) * (1 - alpha), _min_max(bm25_tensor), alpha=alpha)
 
-        bm25_tensor = torch.tensor(bm25_scores, dtype=torch.float32)
-        cos_tensor = torch.tensor(cosine_scores, dtype=torch.float32)
+        top_k = min(top_k, len(titles))
+        top_indices = torch.topk(hybrid_scores, k=top_k).indices.tolist()
 
-        if bm25_tensor.max() > 0:
-            bm25_tensor = (bm25_tensor - bm25_tensor.min()) / (bm25_tensor.max() - bm25_tensor.min() + 1e-8)
-        if cos_tensor.max() > 0:
-            cos_tensor = (cos_tensor - cos_tensor.min()) / (cos_tensor.max() - cos_tensor.min() + 1e-8)
+        return top_indices
 
-        hybrid_scores = alpha * bm25_tensor + (1 - alpha) * cos_tensor
+    def run_batch(self, queries: list[str], titles: list[str], abstracts: list[str], alpha: float = 0.7,
+                  top_k: int = 1000, tokenized_refs: list[list[str]] | None = None,
+                  ref_embs: torch.Tensor | None = None, bm25_index: BM25Index | None = None,
+                  query_embs: torch.Tensor | None = None) -> torch.Tensor:
+        """
+        Hybrid retrieval of many queries over the same papers.
+        The BM25 index and the title embeddings are built once and all queries are scored
+        with one matrix product.
 
-        top_k = min(top_k, len(titles))
-        top_indices = torch.topk(hybrid_scores, k=top_k).indices.tolist()
+        Args:
+            queries (list[str]): query strings
+            titles, abstracts, alpha, top_k, tokenized_refs, ref_embs, bm25_index: see run()
+            query_embs (torch.Tensor, optional): precomputed query embeddings (shape: [Q, dim])
 
-        return top_indices
\ No newline at end of file
+        Returns:
+            torch.Tensor: indices of the top-k documents of each query (shape: [Q, top_k])
+        """
+        if alpha < 0 or alpha > 1:
+            raise ValueError("alpha must be in [0, 1]")
+
+        if bm25_index is None:
+            documents = [titles[i] + "\n" + abstracts[i] for i in range(len(titles))]
+            self.build_bm25(documents, tokenized=tokenized_refs)
+            bm25_index = self.bm25
+
+        if query_embs is None:
+            query_embs = self.encoder.encode(queries, convert_to_tensor=True)
+        if ref_embs is None:
+            ref_embs = self.get_embeddings(titles)
+        query_embs = F.normalize(query_embs.to(ref_embs.dtype), dim=-1)
+        cos_scores = (query_embs @ ref_embs.T).float()
+
+        query_tokens = [self._doc_tokens(doc) for doc in self.nlp.pipe(queries, batch_size=self.batch_size)]
+        bm25_scores = np.stack([bm25_index.get_scores(tokens) for tokens in query_tokens])
+        bm25_scores = torch.from_numpy(bm25_scores).to(cos_scores.device)
+
+        hybrid_scores = torch.add(_min_max(cos_scores) * (1 - alpha), _min_max(bm25_scores), alpha=alpha)
+
+        top_k = min(top_k, len(titles))
+        return torch.topk(hybrid_scores, k=top_k, dim=1).indices
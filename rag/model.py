@@ -1,3 +1,7 @@
+import gc
+import threading
+
+import torch
 from sentence_transformers import SentenceTransformer, CrossEncoder
 
 bi_encoder_name_dict = {
@@ -25,4 +29,79 @@ def get_cross_encoder(model_name: str) -> CrossEncoder:
     if model_name in cross_encoder_name_dict.keys():
         return CrossEncoder(cross_encoder_name_dict[model_name])
     else:
-        return CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
\ No newline at end of file
+        return CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+
+# Process-wide models keyed by (kind, resolved model name, device)
+_registry: dict[tuple[str, str, str], SentenceTransformer | CrossEncoder] = {}
+_registry_lock = threading.Lock()
+_load_locks: dict[tuple[str, str, str], threading.Lock] = {}
+
+def _resolve(kind: str, model_name: str) -> str:
+    if kind == "encoder":
+        return bi_encoder_name_dict.get(model_name, "sentence-transformers/all-mpnet-base-v2")
+    if kind == "cross_encoder":
+        return cross_encoder_name_dict.get(model_name, "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    raise ValueError(f"Unknown model kind: {kind}")
+
+def get_shared_model(kind: str, model_name: str, device: str = "cpu") -> SentenceTransformer | CrossEncoder:
+    """
+    Returns the process-wide model of (kind, model_name, device), loading it on first use.
+
+    Every caller asking for the same model gets the same instance, so e.g. the hybrid and dense
+    retrievers share one encoder. Loading is thread-safe: concurrent callers of the same key wait
+    for a single load, while different models load in parallel.
+
+    Args:
+        kind: "encoder" (SentenceTransformer) or "cross_encoder" (CrossEncoder).
+        model_name: A short name from the name dicts. Unknown names fall back to the default model.
+        device: e.g. "cpu" or "cuda".
+    """
+
+    key = (kind, _resolve(kind, model_name), device)
+    with _registry_lock:
+        if key in _registry:
+            return _registry[key]
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        with _registry_lock:
+            if key in _registry:
+                return _registry[key]
+        model_cls = SentenceTransformer if kind == "encoder" else CrossEncoder
+        loaded = model_cls(key[1], device=device)
+        with _registry_lock:
+            _registry[key] = loaded
+        return loaded
+
+def get_shared_encoder(model_name: str, device: str = "cpu") -> SentenceTransformer:
+    return get_shared_model("encoder", model_name, device)
+
+def get_shared_cross_encoder(model_name: str, device: str = "cpu") -> CrossEncoder:
+    return get_shared_model("cross_encoder", model_name, device)
+
+def release(kind: str | None = None, model_name: str | None = None, device: str | None = None) -> int:
+    """
+    Drops the registry's references to the matching models; no filters release every model.
+    The memory is freed once the retrievers holding them are gone as well.
+
+    Returns:
+        The number of released models.
+    """
+
+    with _registry_lock:
+        keys = [
+            key for key in _registry
+            if (kind is None or key[0] == kind)
+            and (model_name is None or key[1] == _resolve(key[0], model_name))
+            and (device is None or key[2] == device)
+        ]
+        for key in keys:
+            del _registry[key]
+            _load_locks.pop(key, None)
+
+    if keys:
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    return len(keys)
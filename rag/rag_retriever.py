@@ -1,10 +1,18 @@
 import torch
 from rag import model
+from rag.ann_index import IVFIndex
+from rag.embedding_store import get_embedding_store
 import torch.nn.functional as F
 
 class RAGRetriever:
-    def __init__(self, model_name:str="all-MiniLM-L6-v2", use_cuda:bool=True):
-        self.encoder = model.get_encoder(model_name).to("cuda") if use_cuda else model.get_encoder(model_name)
+    def __init__(self, model_name:str="all-MiniLM-L6-v2", use_cuda:bool=True, cache_embeddings:bool=True):
+        # Shared with every other component that uses the same encoder on the same device
+        self.encoder = model.get_shared_encoder(model_name, "cuda" if use_cuda else "cpu")
+        # Document embeddings are cached on disk by (model name, text hash); one store per model is shared
+        self.embedding_store = get_embedding_store(
+            model_name, self.encoder.get_sentence_embedding_dimension()
+        ) if cache_embeddings else None
+        self.index: IVFIndex | None = None
 
     def get_embedding(self, input_str: str):
         """
@@ -14,37 +22,123 @@ class RAGRetriever:
 
     def get_embeddings(self, input_list: list[str]):
         """
-        Encode a list of strings into a tensor of embeddings.
+        Encode a list of strings into a tensor of L2-normalized embeddings.
+        Only strings missing from the embedding store are sent to the encoder.
         """
-        return self.encoder.encode(input_list, convert_to_tensor=True)
+        if self.embedding_store is None:
+            return self.encoder.encode(input_list, convert_to_tensor=True, normalize_embeddings=True)
+        embs = self.embedding_store.encode(input_list, lambda texts: self.encoder.encode(texts, convert_to_numpy=True))
+        return F.normalize(torch.from_numpy(embs).to(self.encoder.device), dim=-1)
 
-    def compute_cosine_similarity(self, query_emb: torch.Tensor, ref_embs: torch.Tensor) -> list[float]:
+    def compute_cosine_similarity(self, query_emb: torch.Tensor, ref_embs: torch.Tensor,
+                                  normalized: bool = False) -> torch.Tensor:
         """
         Compute cosine similarity between a query embedding and reference embeddings.
 
         Args:
             query_emb (torch.Tensor): query embedding tensor (shape: [dim] or [1, dim])
             ref_embs (torch.Tensor): reference embeddings tensor (shape: [N, dim])
+            normalized (bool): ref_embs are already L2-normalized (as returned by get_embeddings),
+                so the scores are a single matrix-vector product
 
         Returns:
-            list[float]: cosine similarity scores for each reference
+            torch.Tensor: cosine similarity scores for each reference (shape: [N])
         """
-        if query_emb.dim() == 1:
-            query_emb = query_emb.unsqueeze(0)
+        query_emb = F.normalize(query_emb.reshape(-1), dim=0).to(ref_embs.dtype)
+        if not normalized:
+            ref_embs = F.normalize(ref_embs, dim=-1)
 
-        cosine_scores = F.cosine_similarity(query_emb, ref_embs)
+        return ref_embs @ query_emb
 
-        return cosine_scores.tolist()
-
-    def run(self, query: str, refs: list, top_k: int = 3):
+    def run(self, query: str, refs: list, top_k: int = 3, ref_embs: torch.Tensor = None,
+            query_emb: torch.Tensor = None):
         """
         Full pipeline: encode query and references, compute similarities, return top-k matches.
+        Pass `ref_embs` (from get_embeddings) / `query_emb` to reuse embeddings computed earlier.
         """
-        query_emb = self.get_embedding(query)
-        ref_embs = self.get_embeddings(refs)
+        if query_emb is None:
+            query_emb = self.get_embedding(query)
+        if ref_embs is None:
+            ref_embs = self.get_embeddings(refs)
 
-        scores = self.compute_cosine_similarity(query_emb, ref_embs)
+        scores = self.compute_cosine_similarity(query_emb, ref_embs, normalized=True)
 
         top_k = min(top_k, len(refs))
-        top_indices = torch.topk(torch.tensor(scores), k=top_k).indices.tolist()
-        return top_indices
\ No newline at end of file
+        top_indices = torch.topk(scores, k=top_k).indices.tolist()
+        return top_indices
+
+    def run_batch(self, queries: list[str], ref_embs: torch.Tensor, top_k: int = 100,
+                  candidates: torch.Tensor | None = None, query_embs: torch.Tensor | None = None) -> torch.Tensor:
+        """
+        Dense retrieval of many queries at once.
+
+        Args:
+            queries (list[str]): query strings
+            ref_embs (torch.Tensor): reference embeddings from get_embeddings (shape: [N, dim])
+            top_k (int): number of indices to return per query
+            candidates (torch.Tensor, optional): per-query candidate rows of ref_embs (shape: [Q, K]),
+                e.g. the output of HybridRetriever.run_batch. Defaults to all rows for every query.
+            query_embs (torch.Tensor, optional): precomputed query embeddings (shape: [Q, dim])
+
+        Returns:
+            torch.Tensor: rows of ref_embs of the top-k documents of each query (shape: [Q, top_k])
+        """
+        if query_embs is None:
+            query_embs = self.encoder.encode(queries, convert_to_tensor=True)
+        query_embs = F.normalize(query_embs.to(ref_embs.dtype), dim=-1)
+
+        if candidates is None:
+            scores = query_embs @ ref_embs.T
+            top_k = min(top_k, scores.shape[1])
+            return torch.topk(scores, k=top_k, dim=1).indices
+
+        candidates = candidates.to(ref_embs.device)
+        # [Q, K, dim] x [Q, dim, 1] -> [Q, K]
+        scores = torch.bmm(ref_embs[candidates], query_embs.unsqueeze(-1)).squeeze(-1)
+        top_k = min(top_k, scores.shape[1])
+        best = torch.topk(scores, k=top_k, dim=1).indices
+        return torch.gather(candidates, 1, best)
+
+    def build_index(self, refs: list[str], ids: list[int] | None = None, nlist: int | None = None,
+                    nprobe: int = 16) -> IVFIndex:
+        """
+        Embed a corpus and add it to the ANN index used by search().
+        The first call creates the index; later calls add to it.
+
+        Args:
+            refs (list[str]): texts of the corpus documents
+            ids (list[int], optional): ids returned by search(). Defaults to consecutive ids.
+            nlist (int, optional): fixed number of IVF lists of a new index. Defaults to about
+                4 * sqrt(N), chosen again whenever the index retrains as it grows
+            nprobe (int): default number of lists searched per query of a new index
+
+        Returns:
+            IVFIndex: the index
+        """
+        if self.index is None:
+            self.index = IVFIndex(self.encoder.get_sentence_embedding_dimension(), nlist=nlist, nprobe=nprobe)
+        embs = self.get_embeddings(refs).float().cpu().numpy()
+        self.index.add(embs, ids=ids)
+        return self.index
+
+    def load_index(self, path: str) -> IVFIndex:
+        self.index = IVFIndex.load(path)
+        return self.index
+
+    def search(self, query: str, top_k: int = 100, nprobe: int | None = None) -> list[int]:
+        """
+        Approximate dense retrieval over the whole indexed corpus (see build_index / load_index).
+
+        Args:
+            query (str): query string
+            top_k (int): number of ids to return
+            nprobe (int, optional): number of IVF lists searched; more is slower but finds more
+
+        Returns:
+            list[int]: ids of the top-k documents, best first
+        """
+        if self.index is None:
+            raise ValueError("No index; call build_index() or load_index() first")
+        query_emb = self.get_embedding(query).float().cpu().numpy()
+        _, ids = self.index.search(query_emb, top_k, nprobe=nprobe)
+        return [i for i in ids[0].tolist() if i >= 0]
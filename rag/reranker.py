@@ -4,12 +4,35 @@ import torch.nn.functional as F
 
 class Reranker:
     def __init__(self, model_name: str="ms-marco-MiniLM-L-6-v2", use_cuda: bool=True):
-        self.encoder = model.get_cross_encoder(model_name).to("cuda") if use_cuda else model.get_cross_encoder(model_name)
+        self.encoder = model.get_shared_cross_encoder(model_name, "cuda" if use_cuda else "cpu")
 
     def run(self, query: str, refs: list[str], top_k: int=10):
         pairs = [[query, ref] for ref in refs]
         scores = self.encoder.predict(pairs)
 
         top_k = min(top_k, len(refs))
-        top_indices = torch.topk(torch.tensor(scores), k=top_k).indices.tolist()
-        return top_indices
\ No newline at end of file
+        top_indices = torch.topk(torch.from_numpy(scores), k=top_k).indices.tolist()
+        return top_indices
+
+    def run_batch(self, queries: list[str], refs: list[list[str]], top_k: int=10, batch_size: int=64):
+        """
+        Rerank the candidates of many queries. The (query, ref) pairs of all queries go through
+        the cross-encoder together, so its batches stay full.
+
+        Args:
+            queries (list[str]): query strings
+            refs (list[list[str]]): candidate texts of each query
+            top_k (int): number of indices to return per query
+            batch_size (int): pairs per cross-encoder batch
+
+        Returns:
+            list[list[int]]: indices into refs[i] of the top-k candidates of query i
+        """
+        pairs = [[query, ref] for query, query_refs in zip(queries, refs) for ref in query_refs]
+        scores = torch.from_numpy(self.encoder.predict(pairs, batch_size=batch_size)) if pairs else torch.zeros(0)
+
+        top_indices = []
+        for query_scores in torch.split(scores, [len(query_refs) for query_refs in refs]):
+            k = min(top_k, len(query_scores))
+            top_indices.append(torch.topk(query_scores, k=k).indices.tolist())
+        return top_indices
@@ -2,7 +2,13 @@ from rag.hybrid_retriever import HybridRetriever
 from rag.model import get_encoder
 from rag.rag_retriever import RAGRetriever
 from rich.logging import RichHandler
+from typing import Callable, Iterable
 import logging
+import torch
+
+from crawler.dedup import find_duplicates, merge_group
+from crawler.record import PaperBatch
+from crawler.utils import batched, prefetch
 
 from rag.reranker import Reranker
 
@@ -17,46 +23,66 @@ hybrid_retriever = None
 rag_retriever = None
 reranker = None
 
+def _as_batch(documents: list[dict] | PaperBatch) -> PaperBatch:
+    return documents if isinstance(documents, PaperBatch) else PaperBatch.from_records(documents)
+
+def _field_texts(batch: PaperBatch, field: str) -> list[str]:
+    """
+    Returns the texts of a PaperBatch field: "title", "abstract" or "ref" (title + abstract).
+    """
+    if field == "title":
+        return batch.titles
+    if field == "abstract":
+        return batch.abstracts
+    if field == "ref":
+        return batch.refs
+    raise ValueError(f"Unknown text field: {field}")
+
+def _dedupe_batch(batch: PaperBatch) -> PaperBatch:
+    groups = find_duplicates(batch.records)
+    if len(groups) == len(batch):
+        return batch
+    return PaperBatch.from_records([merge_group(batch.records, group) for group in groups])
+
+def _replace_rows(embs: torch.Tensor, rows: list[int], compute: Callable[[], torch.Tensor]) -> torch.Tensor:
+    """
+    Returns embs with the given rows replaced by compute(), which only runs if there are rows.
+    """
+    if not rows:
+        return embs
+    return embs.index_copy(0, torch.tensor(rows, device=embs.device), compute())
+
 def hybrid_retrieve(model: HybridRetriever,
                     query: str,
-                    documents: list[dict],
+                    documents: list[dict] | PaperBatch,
                     alpha: float=0.7,
-                    top_k: int=1000):
-    if len(documents) <= top_k:
-        return documents
-
-    titles = [doc['title'] for doc in documents]
-    abstracts = [doc['abstract'] for doc in documents]
+                    top_k: int=1000) -> PaperBatch:
+    batch = _as_batch(documents)
+    if len(batch) <= top_k:
+        return batch
 
-    top_indices = model.run(query, titles, abstracts, alpha=alpha, top_k=top_k)
-    retrieved_documents = [documents[i] for i in top_indices]
-
-    return retrieved_documents
+    top_indices = model.run(query, batch.titles, batch.abstracts, alpha=alpha, top_k=top_k)
+    return batch.take(top_indices)
 
 def rag_retrieve(model: RAGRetriever,
                  query: str,
-                 documents: list[dict],
-                 top_k: int=100):
-    if len(documents) <= top_k:
-        return documents
-
-    refs = [doc['title'] + "\n" + doc['abstract'] for doc in documents]
+                 documents: list[dict] | PaperBatch,
+                 top_k: int=100) -> PaperBatch:
+    batch = _as_batch(documents)
+    if len(batch) <= top_k:
+        return batch
 
-    top_indices = model.run(query, refs, top_k=top_k)
-    retrieved_documents = [documents[i] for i in top_indices]
-
-    return retrieved_documents
+    top_indices = model.run(query, batch.refs, top_k=top_k)
+    return batch.take(top_indices)
 
 def rerank(model: Reranker,
            query: str,
-           documents: list[dict],
-           top_k: int=10):
-    refs = [doc['title'] + "\n" + doc['abstract'] for doc in documents]
-
-    top_indices = model.run(query, refs, top_k=top_k)
-    retrieved_documents = [documents[i] for i in top_indices]
+           documents: list[dict] | PaperBatch,
+           top_k: int=10) -> PaperBatch:
+    batch = _as_batch(documents)
 
-    return retrieved_documents
+    top_indices = model.run(query, batch.refs, top_k=top_k)
+    return batch.take(top_indices)
 
 def setup(encoder_model_name: str = "all-MiniLM-L6-v2",
           cross_encoder_model_name: str = "ms-marco-MiniLM-L-6-v2",
@@ -70,20 +96,73 @@ def setup(encoder_model_name: str = "all-MiniLM-L6-v2",
     logging.info("Loading Reranker...")
     reranker = Reranker(cross_encoder_model_name, use_cuda=use_cuda)
 
+def _cascade(query: str,
+             documents: PaperBatch,
+             alpha: float,
+             top_k: int,
+             hybrid_field: str,
+             dense_field: str,
+             tokenized_refs: list[list[str]] | None = None,
+             hybrid_embs: torch.Tensor | None = None,
+             dense_embs: torch.Tensor | None = None) -> PaperBatch:
+    """
+    Runs the hybrid, dense and rerank stages, computing every embedding at most once.
+
+    The query is encoded once when both retrievers share an encoder. Document embeddings of a
+    field are computed once over all documents; when the dense stage uses the same encoder and
+    field as the hybrid stage it reads the survivors' rows instead of encoding them again.
+    hybrid_embs / dense_embs are optional precomputed embeddings of all documents.
+    """
+    shared_encoder = hybrid_retriever.encoder is rag_retriever.encoder
+    query_emb = None
+
+    # Same cut-offs as hybrid_retrieve / rag_retrieve
+    indices = list(range(len(documents)))
+    if len(documents) > 1000:
+        logging.info("Running Hybrid Retriever...")
+        query_emb = hybrid_retriever.encoder.encode(query, convert_to_tensor=True)
+        if hybrid_embs is None:
+            hybrid_embs = hybrid_retriever.get_embeddings(_field_texts(documents, hybrid_field))
+        indices = hybrid_retriever.run(query, documents.titles, documents.abstracts,
+                                       alpha=alpha, top_k=1000,
+                                       tokenized_refs=tokenized_refs,
+                                       ref_embs=hybrid_embs,
+                                       query_emb=query_emb)
+
+    if len(indices) > 100:
+        logging.info("Running RAG Retriever...")
+        if dense_embs is None and shared_encoder and dense_field == hybrid_field:
+            dense_embs = hybrid_embs
+        texts = _field_texts(documents, dense_field)
+        if dense_embs is None:
+            survivor_embs = rag_retriever.get_embeddings([texts[i] for i in indices])
+        else:
+            survivor_embs = dense_embs[indices]
+        dense_indices = rag_retriever.run(query, [texts[i] for i in indices], top_k=100,
+                                          ref_embs=survivor_embs,
+                                          query_emb=query_emb if shared_encoder else None)
+        indices = [indices[i] for i in dense_indices]
+
+    logging.info("Running Reranker...")
+    return rerank(reranker, query, documents.take(indices), top_k=top_k)
+
 def run(query: str,
-        documents: list[dict],
+        documents: list[dict] | PaperBatch,
         alpha: float=0.7,
         top_k: int = 10,
         encoder_model_name: str = "all-MiniLM-L6-v2",
         cross_encoder_model_name: str = "ms-marco-MiniLM-L-6-v2",
-        use_cuda: bool = True) -> list[dict]:
+        use_cuda: bool = True,
+        deduplicate: bool = True,
+        hybrid_field: str = "title",
+        dense_field: str = "ref") -> list[dict]:
     """
     Retrieve the top-k most relevant documents for a given query.
 
     Args:
         query (str): Query string used for paper search.
-        documents (list[dict]): List of document dictionaries.
-            Each document should have the following format:
+        documents (list[dict] | PaperBatch): List of document dictionaries or Paper records,
+            or a PaperBatch built from them. Each document should have the following format:
             {
                 "title": str,
                 "url": str,
@@ -94,17 +173,204 @@ def run(query: str,
         encoder_model_name (str, optional): model_name for BERT used in RAGRetriever. Defaults to "all-MiniLM-L6-v2".
         cross_encoder_model_name (str, optional): model_name for Reranker. Defaults to "ms-marco-MiniLM-L-6-v2".
         use_cuda (bool, optional): Whether to use CUDA or not. Defaults to True.
+        deduplicate (bool, optional): Collapse near-duplicate papers (e.g. the arXiv and OpenReview
+            versions of a paper) before retrieval. Defaults to True.
+        hybrid_field (str, optional): Text embedded for the hybrid stage: "title", "abstract" or
+            "ref" (title + abstract). Defaults to "title".
+        dense_field (str, optional): Text embedded for the dense stage. Defaults to "ref". With the
+            same field in both stages the documents are embedded only once.
 
     Returns:
         list[dict]: A list of tuples containing top-k documents sorted by score in descending order.
     """
     global hybrid_retriever, rag_retriever, reranker
 
-    logging.info("Running Hybrid Retriever...")
-    retrieved_documents = hybrid_retrieve(hybrid_retriever, query, documents, alpha=alpha)
-    logging.info("Running RAG Retriever...")
-    retrieved_documents = rag_retrieve(rag_retriever, query, retrieved_documents)
-    logging.info("Running Reranker...")
-    retrieved_documents = rerank(reranker, query, retrieved_documents, top_k=top_k)
+    # Titles/abstracts/refs are extracted once; the stages narrow the batch by index
+    batch = _as_batch(documents)
+    if deduplicate:
+        batch = _dedupe_batch(batch)
+
+    return _cascade(query, batch, alpha, top_k, hybrid_field, dense_field).records
+
+def run_stream(query: str,
+               document_stream: Iterable[dict],
+               alpha: float = 0.7,
+               top_k: int = 10,
+               batch_size: int = 64,
+               deduplicate: bool = True,
+               hybrid_field: str = "title",
+               dense_field: str = "ref") -> list[dict]:
+    """
+    Same as run(), but consumes documents while they are still being crawled.
+
+    The stream (e.g. iter_crawling_basic) is read in a background thread. Batches of
+    `batch_size` documents are tokenized and embedded as they arrive, so most of that cost is
+    hidden behind the crawler's network waits. Only what the stages will use is prepared: the
+    hybrid stage's tokens and embeddings once more than 1000 documents arrived, and the dense
+    embeddings once more than 100 did. Once the stream ends, the three stages run on the
+    precomputed tokens and embeddings.
+
+    Args:
+        query (str): Query string used for paper search.
+        document_stream (Iterable[dict]): Documents in the same format as in run().
+        alpha (float, optional): weight for BM25 score (1-alpha for cosine similarity)
+        top_k (int, optional): Number of top results to return.
+        batch_size (int, optional): Number of documents tokenized and embedded together.
+        deduplicate (bool, optional): Collapse near-duplicate papers before retrieval.
+        hybrid_field (str, optional): Text embedded for the hybrid stage, see run().
+        dense_field (str, optional): Text embedded for the dense stage, see run().
+
+    Returns:
+        list[dict]: top-k documents sorted by score in descending order.
+    """
+    global hybrid_retriever, rag_retriever, reranker
+
+    # One embedding pass serves both stages when they share the encoder and the field
+    separate_dense = not (hybrid_retriever.encoder is rag_retriever.encoder and dense_field == hybrid_field)
+
+    chunks = []
+    token_chunks = []
+    hybrid_chunks = []
+    dense_chunks = []
+    count = 0
 
-    return retrieved_documents
\ No newline at end of file
+    logging.info("Preparing documents while crawling...")
+    for batch in batched(prefetch(document_stream), batch_size):
+        chunks.append(PaperBatch.from_records(batch))
+        count += len(batch)
+
+        # Only what _cascade will use is prepared, with the same cut-offs: tokens and hybrid
+        # embeddings once the stream passes 1000 documents, dense embeddings once it passes 100.
+        # The chunks that arrived before a cut-off was passed are caught up then.
+        if count > 1000:
+            for chunk in chunks[len(token_chunks):]:
+                token_chunks.append(hybrid_retriever.tokenize_many(chunk.refs))
+        if count > 1000 or (count > 100 and not separate_dense):
+            for chunk in chunks[len(hybrid_chunks):]:
+                hybrid_chunks.append(hybrid_retriever.get_embeddings(_field_texts(chunk, hybrid_field)))
+        if separate_dense and 100 < count <= 1000:
+            for chunk in chunks[len(dense_chunks):]:
+                dense_chunks.append(rag_retriever.get_embeddings(_field_texts(chunk, dense_field)))
+        elif separate_dense and count > 1000 and dense_chunks:
+            # Past the hybrid cut-off the dense stage only embeds the 1000 survivors
+            dense_chunks = []
+
+    documents = PaperBatch.concat(chunks)
+    if not documents:
+        return []
+    # Whatever was not prepared is left to _cascade, which computes it if a stage still needs it
+    tokenized_refs = [tokens for part in token_chunks for tokens in part] if token_chunks else None
+    hybrid_embs = torch.cat(hybrid_chunks) if hybrid_chunks else None
+    dense_embs = torch.cat(dense_chunks) if dense_chunks else None
+
+    if deduplicate:
+        # Every group keeps the precomputed rows of its first record
+        groups = find_duplicates(documents.records)
+        if len(groups) < len(documents):
+            keep = [group[0] for group in groups]
+            merged = PaperBatch.from_records([merge_group(documents.records, group) for group in groups])
+
+            # merge_group fills an empty title or abstract from the other records of the group,
+            # so those groups are tokenized and embedded again from the merged text
+            changed = [i for i, k in enumerate(keep)
+                       if merged.titles[i] != documents.titles[k] or merged.abstracts[i] != documents.abstracts[k]]
+            updated = merged.take(changed)
+            if tokenized_refs is not None:
+                tokenized_refs = [tokenized_refs[i] for i in keep]
+                if changed:
+                    for i, tokens in zip(changed, hybrid_retriever.tokenize_many(updated.refs)):
+                        tokenized_refs[i] = tokens
+            if hybrid_embs is not None:
+                hybrid_embs = _replace_rows(hybrid_embs[keep], changed,
+                                            lambda: hybrid_retriever.get_embeddings(_field_texts(updated, hybrid_field)))
+            if dense_embs is not None:
+                dense_embs = _replace_rows(dense_embs[keep], changed,
+                                           lambda: rag_retriever.get_embeddings(_field_texts(updated, dense_field)))
+            documents = merged
+
+    return _cascade(query, documents, alpha, top_k, hybrid_field, dense_field,
+                    tokenized_refs=tokenized_refs,
+                    hybrid_embs=hybrid_embs,
+                    dense_embs=dense_embs).records
+
+def run_batch(queries: list[str],
+              documents: list[dict] | PaperBatch,
+              alpha: float = 0.7,
+              top_k: int = 10,
+              deduplicate: bool = True,
+              hybrid_field: str = "title",
+              dense_field: str = "ref",
+              rerank_batch_size: int = 64) -> list[list[dict]]:
+    """
+    Same as run() for many queries over the same documents.
+
+    The BM25 index and the document embeddings are built once for all queries, every stage
+    scores all queries with matrix-matrix products, and the cross-encoder pairs of all
+    queries are reranked in shared batches.
+
+    Args:
+        queries (list[str]): Query strings.
+        documents (list[dict] | PaperBatch): Documents in the same format as in run().
+        alpha (float, optional): weight for BM25 score (1-alpha for cosine similarity)
+        top_k (int, optional): Number of top results to return per query.
+        deduplicate (bool, optional): Collapse near-duplicate papers before retrieval.
+        hybrid_field (str, optional): Text embedded for the hybrid stage, see run().
+        dense_field (str, optional): Text embedded for the dense stage, see run().
+        rerank_batch_size (int, optional): (query, document) pairs per cross-encoder batch.
+
+    Returns:
+        list[list[dict]]: the top-k documents of each query, sorted by score in descending order.
+    """
+    global hybrid_retriever, rag_retriever, reranker
+
+    batch = _as_batch(documents)
+    if deduplicate:
+        batch = _dedupe_batch(batch)
+    if not queries:
+        return []
+    if not batch:
+        return [[] for _ in queries]
+
+    shared_encoder = hybrid_retriever.encoder is rag_retriever.encoder
+    query_embs = None
+    hybrid_embs = None
+
+    # Same cut-offs as run(); candidates holds the surviving rows of every query, shape [Q, K]
+    candidates = None
+    if len(batch) > 1000:
+        logging.info("Running Hybrid Retriever...")
+        query_embs = hybrid_retriever.encoder.encode(queries, convert_to_tensor=True)
+        hybrid_embs = hybrid_retriever.get_embeddings(_field_texts(batch, hybrid_field))
+        candidates = hybrid_retriever.run_batch(queries, batch.titles, batch.abstracts,
+                                                alpha=alpha, top_k=1000,
+                                                tokenized_refs=hybrid_retriever.tokenize_many(batch.refs),
+                                                ref_embs=hybrid_embs,
+                                                query_embs=query_embs)
+
+    num_candidates = len(batch) if candidates is None else candidates.shape[1]
+    if num_candidates > 100:
+        logging.info("Running RAG Retriever...")
+        dense_query_embs = query_embs if shared_encoder else None
+        if shared_encoder and dense_field == hybrid_field and hybrid_embs is not None:
+            candidates = rag_retriever.run_batch(queries, hybrid_embs, top_k=100, candidates=candidates,
+                                                 query_embs=dense_query_embs)
+        else:
+            # Only documents that survived for at least one query are embedded; their rows in
+            # dense_embs are their positions in `rows`
+            texts = _field_texts(batch, dense_field)
+            rows = torch.arange(len(batch)) if candidates is None else torch.unique(candidates.cpu())
+            dense_embs = rag_retriever.get_embeddings([texts[i] for i in rows.tolist()])
+            if candidates is not None:
+                position = torch.empty(len(batch), dtype=torch.long)
+                position[rows] = torch.arange(len(rows))
+                candidates = position[candidates.cpu()]
+            top = rag_retriever.run_batch(queries, dense_embs, top_k=100, candidates=candidates,
+                                          query_embs=dense_query_embs)
+            candidates = rows.to(top.device)[top]
+
+    logging.info("Running Reranker...")
+    indices = [list(range(len(batch)))] * len(queries) if candidates is None else candidates.tolist()
+    refs = batch.refs
+    ranked = reranker.run_batch(queries, [[refs[i] for i in rows] for rows in indices],
+                                top_k=top_k, batch_size=rerank_batch_size)
+    return [batch.take([rows[i] for i in best]).records for rows, best in zip(indices, ranked)]
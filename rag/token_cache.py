@@ -0,0 +1,103 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable
+
+from crawler.utils import DEFAULT_CACHE_DIR
+from rag.embedding_store import text_hash
+
+DEFAULT_TOKEN_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "tokens.sqlite3")
+
+
+class TokenCache:
+    """
+    Persistent cache of BM25 tokens keyed by (pipeline, text hash).
+
+    `pipeline` names the tokenizer, e.g. "en_core_web_sm-3.7.1", so tokens of another spaCy
+    model or version are never mixed in. `tokenize()` only runs the tokenizer on texts that
+    are not cached yet.
+    """
+
+    def __init__(self, pipeline: str, path: str = DEFAULT_TOKEN_CACHE_PATH):
+        """
+        Args:
+            pipeline: The name and version of the tokenizer.
+            path: The SQLite file of the cache.
+        """
+
+        self.pipeline = pipeline
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tokens (
+                pipeline TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                PRIMARY KEY (pipeline, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def lookup(self, hashes: list[str]) -> dict[str, list[str]]:
+        """
+        Returns the cached tokens of the given hashes, skipping unknown hashes.
+        """
+
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, tokens FROM tokens WHERE pipeline = ? AND text_hash IN ({placeholders})",
+                    [self.pipeline, *chunk]
+                )
+                found.update((h, json.loads(tokens)) for h, tokens in rows)
+        return found
+
+    def add(self, hashes: list[str], tokens: list[list[str]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokens (pipeline, text_hash, tokens) VALUES (?, ?, ?)",
+                [(self.pipeline, h, json.dumps(t)) for h, t in zip(hashes, tokens)]
+            )
+            self._conn.commit()
+
+    def tokenize(self, texts: list[str], tokenize_fn: Callable[[list[str]], list[list[str]]]) -> list[list[str]]:
+        """
+        Returns the tokens of the texts, tokenizing only those that are not cached yet.
+
+        Args:
+            texts: The texts to tokenize.
+            tokenize_fn: Tokenizes a list of texts, one token list per text.
+
+        Returns:
+            One token list per text, in the order of `texts`.
+        """
+
+        if not texts:
+            return []
+
+        hashes = [text_hash(text) for text in texts]
+        tokens_of = self.lookup(list(dict.fromkeys(hashes)))
+
+        missing: dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in tokens_of and h not in missing:
+                missing[h] = text
+        if missing:
+            new_tokens = tokenize_fn(list(missing.values()))
+            self.add(list(missing.keys()), new_tokens)
+            tokens_of.update(zip(missing.keys(), new_tokens))
+
+        return [tokens_of[h] for h in hashes]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tokens WHERE pipeline = ?", (self.pipeline,)).fetchone()[0]
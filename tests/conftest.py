@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Keep the on-disk caches and stores of the code under test out of the user's cache directory.
+# Set before any crawler/rag module reads DEFAULT_CACHE_DIR.
+os.environ.setdefault("PAPER_REC_CACHE_DIR", tempfile.mkdtemp(prefix="paper-rec-tests-"))
@@ -0,0 +1,67 @@
+import numpy as np
+
+from rag.ann_index import IVFIndex, evaluate_recall
+
+
+def clustered(n, dim=32, clusters=200, seed=0):
+    centers = np.random.default_rng(0).normal(size=(clusters, dim))
+    rng = np.random.default_rng(seed)
+    return centers[rng.integers(clusters, size=n)] + 0.6 * rng.normal(size=(n, dim))
+
+
+def test_small_index_is_searched_exactly():
+    vectors = clustered(10)
+    index = IVFIndex(32)
+    index.add(vectors)
+
+    assert not index.is_trained
+    scores, ids = index.search(vectors[3], k=20)
+    assert ids[0, 0] == 3
+    assert (ids[0, 10:] == -1).all() and np.isinf(scores[0, 10:]).all()
+
+
+def test_incremental_build_retrains_as_the_corpus_grows():
+    # The build path of RAGRetriever.build_index: a handful of refs, then a large corpus
+    data = clustered(25_010, seed=1)
+    index = IVFIndex(32)
+    index.add(data[:10])
+    for start in range(10, len(data), 1000):
+        index.add(data[start:start + 1000])
+        if len(index) < index.min_train_size:
+            assert not index.is_trained
+
+    # Trained at 5,010 vectors and again once the index quadrupled
+    assert len(index) == len(data)
+    assert index.trained_size == 21_010
+    assert index.num_lists == int(4 * 21_010 ** 0.5)
+
+    # A probe of 16 of the 579 lists scores under 3% of the vectors
+    results = {r["nprobe"]: r for r in evaluate_recall(index, clustered(100, seed=2), k=10, nprobes=(1, 16))}
+    assert results[16]["recall"] >= 0.95
+    assert results[1]["recall"] < results[16]["recall"]
+
+
+def test_fixed_nlist_is_kept():
+    index = IVFIndex(32, nlist=16)
+    index.add(clustered(39 * 16 - 1, seed=3))
+    assert not index.is_trained
+
+    index.add(clustered(5000, seed=4))
+    assert index.is_trained and index.num_lists == 16
+
+
+def test_mmap_index_only_copies_the_lists_it_appends_to(tmp_path):
+    data = clustered(5000, seed=5)
+    index = IVFIndex(32, min_train_size=1000)
+    index.add(data)
+    index.save(str(tmp_path))
+
+    loaded = IVFIndex.load(str(tmp_path))
+    np.testing.assert_array_equal(loaded.search(data[:5], k=5)[1], index.search(data[:5], k=5)[1])
+    loaded.add(data[:1], ids=[10_000])
+    copied = [lst for lst in loaded._lists if not isinstance(lst.vectors, np.memmap)]
+    assert len(copied) == 1 and 10_000 in copied[0].ids
+
+    loaded.remove([10_000])
+    loaded.save(str(tmp_path))
+    assert len(IVFIndex.load(str(tmp_path))) == len(data)
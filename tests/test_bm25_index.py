@@ -0,0 +1,85 @@
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from rag.bm25_index import BM25Index
+
+CORPUS = [
+    ["retrieval", "augmented", "generation"],
+    ["dense", "retrieval", "with", "retrieval", "models"],
+    ["graph", "neural", "networks"],
+    ["retrieval", "benchmark"],
+    ["language", "models", "for", "retrieval"],
+]
+
+
+def random_corpus(n, vocab=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[f"t{t}" for t in rng.integers(vocab, size=rng.integers(1, 30))] for _ in range(n)]
+
+
+def test_scores_match_bm25okapi():
+    # "retrieval" is in 4 of 5 documents, so its idf is negative and takes the epsilon floor
+    index = BM25Index.from_tokenized(CORPUS)
+    reference = BM25Okapi(CORPUS)
+    for query in (["retrieval"], ["dense", "retrieval"], ["models", "models", "graph"], ["unknown"]):
+        np.testing.assert_allclose(index.get_scores(query), reference.get_scores(query), rtol=1e-5, atol=1e-6)
+
+    assert index.idf()[index.vocab["retrieval"]] > 0
+
+
+def test_add_remove_and_compact_match_a_fresh_index():
+    corpus = random_corpus(300)
+    index = BM25Index.from_tokenized(corpus[:100])
+    index.add(corpus[100:])
+    index.remove(range(0, 300, 3))
+
+    kept = [doc for i, doc in enumerate(corpus) if i % 3]
+    fresh = BM25Index.from_tokenized(kept)
+    query = ["t1", "t2", "t3", "t50"]
+    alive = np.flatnonzero(index.alive)
+    np.testing.assert_allclose(index.get_scores(query)[alive], fresh.get_scores(query), rtol=1e-5)
+    assert (index.get_scores(query)[::3] == 0).all()
+
+    index.compact()
+    assert len(index.segments) == 1 and len(index) == len(kept)
+    np.testing.assert_allclose(index.get_scores(query)[alive], fresh.get_scores(query), rtol=1e-5)
+
+
+def test_top_k_skips_removed_documents():
+    index = BM25Index.from_tokenized(CORPUS)
+    scores = index.get_scores(["retrieval", "models"])
+    ids, top_scores = index.top_k(["retrieval", "models"], k=3)
+    assert list(ids) == list(np.argsort(-scores, kind="stable")[:3])
+    np.testing.assert_allclose(top_scores, scores[ids])
+
+    index.remove([ids[0]])
+    assert ids[0] not in index.top_k(["retrieval", "models"], k=5)[0]
+    assert len(index.top_k(["retrieval"], k=10)[0]) == 4
+
+
+def test_save_load_round_trip(tmp_path):
+    corpus = random_corpus(500, seed=1)
+    index = BM25Index.from_tokenized(corpus)
+    index.remove([0, 1, 2])
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+    query = ["t3", "t7", "t7"]
+    np.testing.assert_allclose(loaded.get_scores(query), index.get_scores(query))
+    assert loaded.vocab == index.vocab and len(loaded) == len(index)
+
+
+def test_saving_a_loaded_index_over_its_own_files(tmp_path):
+    index = BM25Index.from_tokenized(random_corpus(15_000, seed=2))
+    index.save(str(tmp_path))
+
+    # An unchanged index is not compacted, so save() reads the very files it replaces
+    expected = index.get_scores(["t5", "t9"])
+    BM25Index.load(str(tmp_path)).save(str(tmp_path))
+    np.testing.assert_allclose(BM25Index.load(str(tmp_path)).get_scores(["t5", "t9"]), expected)
+
+    loaded = BM25Index.load(str(tmp_path))
+    loaded.add(random_corpus(10, seed=3))
+    expected = loaded.get_scores(["t5", "t9"])
+    loaded.save(str(tmp_path))
+    np.testing.assert_allclose(BM25Index.load(str(tmp_path)).get_scores(["t5", "t9"]), expected)
@@ -0,0 +1,34 @@
+from crawler.citation_cache import CitationCache
+
+
+def test_put_never_exceeds_max_entries():
+    cache = CitationCache(":memory:", max_entries=10)
+    for i in range(25):
+        cache.put("crossref", f"Paper {i}", i)
+        assert len(cache) <= 10
+
+    # The newest entries survive, the oldest are evicted
+    assert cache.get("crossref", "Paper 24") == 24
+    assert cache.get("crossref", "Paper 0") is None
+
+def test_put_many_and_overwrites_respect_max_entries():
+    cache = CitationCache(":memory:", max_entries=10)
+    cache.put_many("openalex", {f"Paper {i}": i for i in range(40)})
+    assert len(cache) == 10
+
+    # Replacing an existing entry does not count as a new row
+    cache.put("openalex", "Paper 39", 1)
+    cache.put("openalex", "paper 39!", 2)
+    assert len(cache) == 10
+    assert cache.get("openalex", "Paper 39") == 2
+
+def test_dois_differing_only_in_punctuation_are_kept_apart():
+    cache = CitationCache(":memory:")
+    cache.put_many("crossref-doi", {"10.1000/ab.c-1": 5, "10.1000/ab-c.1": 7, "10.1000/abc_1": 9})
+
+    assert cache.get_many("crossref-doi", ["10.1000/AB.C-1", "10.1000/ab-c.1", "10.1000/abc_1", "10.1000/abc1"]) == {
+        "10.1000/AB.C-1": 5, "10.1000/ab-c.1": 7, "10.1000/abc_1": 9,
+    }
+    # Title sources still match trivially different spellings
+    cache.put("crossref", "Attention Is All You Need", 3)
+    assert cache.get("crossref", "attention is all you need!") == 3
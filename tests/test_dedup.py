@@ -0,0 +1,48 @@
+from crawler.dedup import dedupe, find_duplicates, merge_group
+
+
+def test_same_arxiv_id_or_doi_is_grouped():
+    records = [
+        {'title': "A paper", 'arxiv_id': "2401.00001v1", 'url': "https://arxiv.org/pdf/2401.00001v1"},
+        {'title': "Something else entirely", 'doi': "10.1/ABC"},
+        {'title': "A paper (v2)", 'arxiv_id': "2401.00001v2", 'url': "https://arxiv.org/pdf/2401.00001v2"},
+        {'title': "Yet another title", 'doi': "10.1/abc"},
+    ]
+    assert find_duplicates(records) == [[0, 2], [1, 3]]
+
+
+def test_near_duplicate_titles_are_grouped():
+    records = [
+        {'title': "Attention Is All You Need", 'source': "arxiv"},
+        {'title': "Graph neural networks: a review", 'source': "arxiv"},
+        {'title': "Attention is all you need!", 'source': "openreview"},
+    ]
+    assert find_duplicates(records) == [[0, 2], [1]]
+
+
+def test_all_pairs_of_a_bucket_are_compared():
+    # With a single band of one row the three titles share one bucket, and the first one is
+    # similar to neither of the others, which are duplicates of each other
+    records = [
+        {'title': "A graph survey benchmark view of Dense passage retrieval for open domain question answering"},
+        {'title': "Dense passage retrieval for open domain question answering"},
+        {'title': "Dense passage retrieval for open-domain question answering systems"},
+    ]
+    assert find_duplicates(records, num_perm=1, bands=1) == [[0], [1, 2]]
+
+
+def test_merge_fills_missing_fields_and_joins_sources():
+    records = [
+        {'title': "Attention Is All You Need", 'abstract': "", 'source': "arxiv"},
+        {'title': "Attention is all you need", 'abstract': "The Transformer.", 'source': "openreview",
+         'decision_info': "NeurIPS 2017"},
+        {'title': "Attention is all you need.", 'source': "arxiv+crossref"},
+    ]
+    merged = merge_group(records, [0, 1, 2])
+    assert merged['title'] == "Attention Is All You Need"
+    assert merged['abstract'] == "The Transformer."
+    assert merged['decision_info'] == "NeurIPS 2017"
+    assert merged['source'] == "arxiv+openreview+crossref"
+
+    [deduped] = dedupe(records)
+    assert deduped['source'] == "arxiv+openreview+crossref"
@@ -0,0 +1,76 @@
+import multiprocessing
+import zlib
+
+import numpy as np
+
+from rag.embedding_store import EmbeddingStore, get_embedding_store
+
+DIM = 8
+
+
+def _fake_encoder(texts: list[str]) -> np.ndarray:
+    # A deterministic embedding per text, so every read can be checked against it
+    return np.stack([np.random.default_rng(zlib.crc32(text.encode())).normal(size=DIM) for text in texts])
+
+def _assert_cached(store: EmbeddingStore, texts: list[str]) -> None:
+    np.testing.assert_allclose(store.encode(texts, _fake_encoder), _fake_encoder(texts), atol=1e-2)
+
+
+def test_encode_only_sends_missing_texts(tmp_path):
+    store = EmbeddingStore("model", DIM, root=str(tmp_path))
+    calls = []
+    def encode_fn(texts):
+        calls.append(list(texts))
+        return _fake_encoder(texts)
+
+    store.encode(["a", "b", "a"], encode_fn)
+    store.encode(["b", "c"], encode_fn)
+    assert calls == [["a", "b"], ["c"]]
+    assert len(store) == 3
+
+def test_interleaved_instances_do_not_overwrite_each_other(tmp_path):
+    # Two instances on one directory, e.g. a hybrid retriever caching titles and a dense
+    # retriever caching title + abstract with the same model. A tiny initial capacity makes
+    # both grow the matrix file while the other one has already written rows.
+    hybrid = EmbeddingStore("model", DIM, root=str(tmp_path), initial_capacity=2)
+    dense = EmbeddingStore("model", DIM, root=str(tmp_path), initial_capacity=2)
+
+    titles = [f"title {i}" for i in range(300)]
+    refs = [f"title {i}\nabstract {i}" for i in range(300)]
+    for start in range(0, 300, 7):
+        hybrid.encode(titles[start:start + 7], _fake_encoder)
+        dense.encode(refs[start:start + 5], _fake_encoder)
+        dense.encode(refs[start + 5:start + 7], _fake_encoder)
+
+    _assert_cached(hybrid, titles)
+    _assert_cached(dense, refs)
+    _assert_cached(hybrid, refs)
+
+    # The data on disk is consistent as well
+    fresh = EmbeddingStore("model", DIM, root=str(tmp_path))
+    assert len(fresh) == 600
+    _assert_cached(fresh, titles + refs)
+
+def test_get_embedding_store_shares_one_instance(tmp_path):
+    first = get_embedding_store("shared-model", DIM, root=str(tmp_path))
+    assert get_embedding_store("shared-model", DIM, root=str(tmp_path)) is first
+    assert get_embedding_store("other-model", DIM, root=str(tmp_path)) is not first
+
+
+def _write_from_process(root: str, prefix: str) -> None:
+    store = EmbeddingStore("model", DIM, root=root, initial_capacity=2)
+    for i in range(0, 200, 10):
+        store.encode([f"{prefix} {j}" for j in range(i, i + 10)], _fake_encoder)
+
+def test_concurrent_processes_share_a_store(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_write_from_process, args=(str(tmp_path), prefix)) for prefix in "ab"]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    store = EmbeddingStore("model", DIM, root=str(tmp_path))
+    assert len(store) == 400
+    _assert_cached(store, [f"{prefix} {j}" for prefix in "ab" for j in range(200)])
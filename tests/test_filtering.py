@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from crawler.filtering import FilterChain, openreview_date_filter, paper_year
+from crawler.record import Paper
+
+
+def _ms(year: int) -> int:
+    return int(datetime(year, 6, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+def test_paper_year_does_not_modify_the_document():
+    doc = {'title': "A", 'cdate': _ms(2023)}
+    assert paper_year(doc) == 2023
+    assert doc == {'title': "A", 'cdate': _ms(2023)}
+
+    paper = Paper(title="B", cdate=_ms(2022))
+    assert paper_year(paper) == 2022
+    assert 'year' not in paper
+
+def test_paper_year_prefers_an_explicit_year():
+    paper = Paper(title="A", cdate=_ms(2022), year=2021)
+    assert paper_year(paper) == 2021
+    assert paper.year == 2021 and paper_year(Paper(title="B", cdate=_ms(2022))) == 2022
+
+def test_date_filters_leave_inputs_unchanged():
+    docs = [{'title': "A", 'cdate': _ms(2021)}, {'title': "B", 'cdate': _ms(2024)}, {'title': "C", 'year': 2024}]
+    before = [dict(doc) for doc in docs]
+
+    assert [doc['title'] for doc in openreview_date_filter(docs, [2023, 2024])] == ["B", "C"]
+    assert [doc['title'] for doc in FilterChain(date=[2020, 2021], source="openreview").stream(docs)] == ["A"]
+    assert docs == before
+
+def test_arxiv_year_comes_from_updated_date():
+    doc = {'updated_date': datetime(2020, 1, 1, tzinfo=timezone.utc)}
+    assert FilterChain(date=[2020, 2020], source="arxiv")(doc)
+    assert not FilterChain(date=[2021, 2024], source="arxiv")(doc)
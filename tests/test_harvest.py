@@ -0,0 +1,49 @@
+import pytest
+
+from crawler.harvest import harvest_arxiv
+from crawler.rate_limit import reset_rate_limiters
+from crawler.replay import StandInServer
+from crawler.store import PaperStore
+
+
+@pytest.fixture
+def server():
+    reset_rate_limiters(1000)
+    with StandInServer(synthetic=250) as server:
+        yield server
+    reset_rate_limiters()
+
+
+def test_harvest_pages_through_all_records(server, tmp_path):
+    store = PaperStore(str(tmp_path / "papers.sqlite3"))
+    written = harvest_arxiv(store)
+
+    assert written == 250 and len(store) == 250
+    assert server.requests["arxiv_oai"] == 3
+
+
+def test_harvest_resumes_after_max_pages_and_then_only_asks_for_changes(server, tmp_path):
+    store = PaperStore(str(tmp_path / "papers.sqlite3"))
+    assert harvest_arxiv(store, max_pages=1) == 100
+
+    # The second run continues from the saved token instead of starting over
+    assert harvest_arxiv(store) == 150
+    assert server.requests["arxiv_oai"] == 3 and len(store) == 250
+
+    # A finished harvest only asks for the records changed since it started
+    assert harvest_arxiv(store) == 0
+    assert server.requests["arxiv_oai"] == 4
+
+    assert harvest_arxiv(store, resume=False) == 250
+    assert server.requests["arxiv_oai"] == 7
+
+
+def test_harvest_keeps_only_the_wanted_categories(server, tmp_path):
+    store = PaperStore(str(tmp_path / "papers.sqlite3"))
+    written = harvest_arxiv(store, categories=["cs.CL"])
+
+    # Record i is in cs.CL when i % 3 is 0 or 2
+    assert written == sum(i % 3 != 1 for i in range(250))
+    titles = {doc['title'] for doc in store.search("harvested", limit=500)}
+    assert "Synthetic harvested paper 1" not in titles
+    assert {"Synthetic harvested paper 0", "Synthetic harvested paper 2"} <= titles
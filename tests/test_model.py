@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from rag import model
+
+
+class SlowModel:
+    loads = 0
+    lock = threading.Lock()
+
+    def __init__(self, name, device="cpu"):
+        with SlowModel.lock:
+            SlowModel.loads += 1
+        time.sleep(0.05)
+        self.name = name
+        self.device = device
+
+
+@pytest.fixture
+def slow_models(monkeypatch):
+    # Loading the real checkpoints is not what these tests are about
+    monkeypatch.setattr(model, "SentenceTransformer", SlowModel)
+    monkeypatch.setattr(model, "CrossEncoder", SlowModel)
+    SlowModel.loads = 0
+    model.release()
+    yield
+    model.release()
+
+
+def test_same_key_returns_the_same_instance(slow_models):
+    encoder = model.get_shared_encoder("all-MiniLM-L6-v2", "cpu")
+    assert model.get_shared_model("encoder", "all-MiniLM-L6-v2", "cpu") is encoder
+    assert encoder.name == "sentence-transformers/all-MiniLM-L6-v2"
+
+    # Other kinds and devices are separate models
+    assert model.get_shared_cross_encoder("ms-marco-MiniLM-L-6-v2", "cpu") is not encoder
+    assert model.get_shared_encoder("all-MiniLM-L6-v2", "cuda") is not encoder
+    assert SlowModel.loads == 3
+
+    assert model.release(kind="encoder") == 2
+    assert model.get_shared_encoder("all-MiniLM-L6-v2", "cpu") is not encoder
+
+
+def test_concurrent_callers_share_a_single_load(slow_models):
+    results = []
+    def get(name):
+        results.append(model.get_shared_encoder(name, "cpu"))
+
+    threads = [threading.Thread(target=get, args=("all-MiniLM-L6-v2" if i % 2 else "all-mpnet-base-v2",))
+               for i in range(16)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowModel.loads == 2
+    assert len({id(result) for result in results}) == 2
+    # The two models load in parallel rather than one after the other for every caller
+    assert time.perf_counter() - start < 16 * 0.05
@@ -0,0 +1,86 @@
+import pytest
+import requests
+
+from crawler.benchmark import run_benchmarks
+from crawler.crawling import sync_arxiv
+from crawler.rate_limit import RateLimiter, request_with_limiter, reset_rate_limiters
+from crawler.replay import StandInServer
+from crawler.store import PaperStore
+from crawler.venue import ingest_openreview_venue, venue_query_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PaperStore(str(tmp_path / "papers.sqlite3"))
+
+
+@pytest.fixture
+def fast_limiters():
+    reset_rate_limiters(1000)
+    yield
+    reset_rate_limiters()
+
+
+def test_limiter_waits_out_injected_429s():
+    limiter = RateLimiter(rate=100, burst=10)
+    with StandInServer(synthetic=10, throttle_every=2, retry_after=0.2) as server:
+        url = server.url("crossref") + "/works"
+        for _ in range(3):
+            response = request_with_limiter(requests.Session(), url, limiter, params={"query.title": "x"})
+            assert response.status_code == 200
+
+    # Requests 2 and 4 were throttled and retried after Retry-After
+    assert server.requests["crossref"] == 5 and server.throttled["crossref"] == 2
+    assert limiter.throttled == 2 and limiter.requests == 5
+    assert limiter.total_slept >= 2 * 0.2 * 0.9
+    assert limiter.rate < 100
+
+
+def test_limiter_gives_up_after_max_retries():
+    limiter = RateLimiter(rate=100, burst=10)
+    with StandInServer(synthetic=10, throttle_every=1, retry_after=0.05) as server:
+        response = request_with_limiter(requests.Session(), server.url("crossref") + "/works", limiter,
+                                        max_retries=2, params={"query.title": "x"})
+
+    # The last 429 is returned to the caller instead of being retried
+    assert response.status_code == 429
+    assert server.requests["crossref"] == 3 and limiter.throttled == 2
+
+
+def test_sync_arxiv_pages_once_then_only_asks_for_updates(store, fast_limiters):
+    with StandInServer(synthetic=250) as server:
+        documents = sync_arxiv(store, "all:retrieval", num=250)
+        assert len(documents) == 250
+        assert server.requests["arxiv"] == 3
+
+        # Nothing is newer than the stored papers, so one page answers the second sync
+        assert len(sync_arxiv(store, "all:retrieval", num=250)) == 250
+        assert server.requests["arxiv"] == 4
+
+
+def test_sync_arxiv_survives_throttling(store, fast_limiters):
+    with StandInServer(synthetic=250, throttle_every=2, retry_after=0.05) as server:
+        assert len(sync_arxiv(store, "all:retrieval", num=250)) == 250
+        assert server.throttled["arxiv"] >= 1
+
+
+def test_ingest_openreview_venue_pages_and_resumes(store, fast_limiters):
+    venue = "Synthetic.cc/2024/Conference"
+    with StandInServer(synthetic=250) as server:
+        assert ingest_openreview_venue(store, venue, page_size=100, max_pages=1) == 100
+        assert server.requests["openreview"] == 1
+
+        # The saved offset is continued; the short last page ends the ingestion
+        assert ingest_openreview_venue(store, venue, page_size=100) == 150
+        assert server.requests["openreview"] == 3
+
+    assert len(store.query_documents(venue_query_key(venue))) == 250
+
+
+def test_benchmark_counts_requests_and_throttling():
+    with StandInServer(synthetic=250, throttle_every=3, retry_after=0.05) as server:
+        [result] = run_benchmarks(server, num=250, scale=1000, only=["crawling_basic"])
+
+    assert result["name"] == "crawling_basic" and result["docs"] == 250
+    assert result["requests"] == result["limiter_requests"] >= 3
+    assert result["throttled"] >= 1
@@ -0,0 +1,122 @@
+import zlib
+
+import numpy as np
+import pytest
+import spacy
+import torch
+from rank_bm25 import BM25Okapi
+from spacy.language import Language
+
+from rag import model, run
+
+
+def _seed(text):
+    return zlib.crc32(text.encode())
+
+
+class HashingEncoder:
+    """Bag of words with one fixed random vector per word, plus a little noise per text."""
+
+    device = torch.device("cpu")
+
+    def __init__(self, name, device="cpu"):
+        self.name = name
+
+    def get_sentence_embedding_dimension(self):
+        return 64
+
+    def _embed(self, text):
+        words = text.lower().split() or [""]
+        emb = sum(np.random.default_rng(_seed(word)).normal(size=64) for word in words)
+        return (emb + 0.1 * np.random.default_rng(_seed(text)).normal(size=64)).astype(np.float32)
+
+    def encode(self, texts, convert_to_tensor=False, normalize_embeddings=False, convert_to_numpy=True):
+        embs = np.stack([self._embed(text) for text in ([texts] if isinstance(texts, str) else texts)])
+        if normalize_embeddings:
+            embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+        if isinstance(texts, str):
+            embs = embs[0]
+        return torch.from_numpy(embs) if convert_to_tensor else embs
+
+
+class OverlapCrossEncoder:
+    """Scores a pair by its shared words; a per-text fraction breaks the ties."""
+
+    def __init__(self, name, device="cpu"):
+        self.name = name
+
+    def predict(self, pairs, batch_size=32):
+        return np.array([len(set(query.split()) & set(ref.split())) + _seed(ref) / 2 ** 32
+                         for query, ref in pairs], dtype=np.float32)
+
+
+@Language.component("test_lowercase_lemmas")
+def lowercase_lemmas(doc):
+    for token in doc:
+        token.lemma_ = token.lower_
+    return doc
+
+
+def blank_pipeline(name, disable=()):
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_lowercase_lemmas")
+    return nlp
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    # No checkpoints or spaCy models are downloaded; the stages only need these interfaces
+    monkeypatch.setattr(model, "SentenceTransformer", HashingEncoder)
+    monkeypatch.setattr(model, "CrossEncoder", OverlapCrossEncoder)
+    monkeypatch.setattr(spacy, "load", blank_pipeline)
+    model.release()
+    run.setup(use_cuda=False)
+    yield
+    model.release()
+
+
+def random_documents(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = ["".join(rng.choice(list("abcdefghijklmnop"), size=7)) for _ in range(400)]
+    words = lambda size: " ".join(rng.choice(vocab, size=size))
+    documents = [{"title": words(8), "url": f"https://example.org/{i}", "abstract": words(40)} for i in range(n)]
+    return documents, vocab
+
+
+def min_max(scores):
+    return (scores - scores.min()) / (scores.max() - scores.min() + 1e-8) if scores.max() > 0 else scores
+
+
+def test_hybrid_scores_match_a_reference_computation(pipeline):
+    documents, vocab = random_documents(300)
+    titles = [doc["title"] for doc in documents]
+    abstracts = [doc["abstract"] for doc in documents]
+    retriever = run.hybrid_retriever
+    query = " ".join(vocab[:3])
+
+    # The list-based scoring the tensor path replaced
+    bm25 = BM25Okapi([retriever.tokenize(t + "\n" + a) for t, a in zip(titles, abstracts)])
+    bm25_scores = bm25.get_scores(retriever.tokenize(query))
+    embs = retriever.encoder.encode(titles, normalize_embeddings=True)
+    query_emb = retriever.encoder.encode(query)
+    cos_scores = embs @ (query_emb / np.linalg.norm(query_emb))
+    expected = np.argsort(-(0.7 * min_max(bm25_scores) + 0.3 * min_max(cos_scores)))[:50]
+
+    assert retriever.run(query, titles, abstracts, alpha=0.7, top_k=50) == list(expected)
+    assert run.rag_retriever.run(query, titles, top_k=20) == list(np.argsort(-cos_scores)[:20])
+
+
+def test_run_batch_matches_run_per_query(pipeline):
+    # More than 1000 documents, so the hybrid, dense and rerank stages all run
+    documents, vocab = random_documents(1500, seed=1)
+    queries = [" ".join(vocab[i:i + 3]) for i in (0, 10, 20)]
+
+    # Titles for the hybrid stage and refs for the dense stage: only the survivors get dense embeddings
+    expected = [[doc["url"] for doc in run.run(query, documents, top_k=10)] for query in queries]
+    results = run.run_batch(queries, documents, top_k=10, rerank_batch_size=7)
+    assert [[doc["url"] for doc in result] for result in results] == expected
+
+    # With the same field in both stages the dense stage reuses the hybrid embeddings
+    expected = [[doc["url"] for doc in run.run(query, documents, top_k=5, hybrid_field="ref")] for query in queries]
+    results = run.run_batch(queries, documents, top_k=5, hybrid_field="ref")
+    assert [[doc["url"] for doc in result] for result in results] == expected
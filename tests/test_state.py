@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+from crawler.record import Paper
+from crawler.state import CrawlState, checkpoint_tag, load_or_new_state
+
+
+def _state() -> CrawlState:
+    paper = Paper(title="A", url="u", abstract="x", updated_date=datetime(2024, 1, 2, tzinfo=timezone.utc))
+    return CrawlState(offset=100, seen={"2401.00001v1"}, documents=[paper])
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "crawl.json")
+    tag = checkpoint_tag("all:rag", sort_op="submitted")
+    _state().save(path, tag=tag)
+
+    loaded = CrawlState.load(path, tag=tag)
+    assert loaded.offset == 100
+    assert loaded.seen == {"2401.00001v1"}
+    assert loaded.documents[0].updated_date == datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+def test_checkpoint_of_other_crawl_parameters_is_ignored(tmp_path):
+    path = str(tmp_path / "crawl.json")
+    _state().save(path, tag=checkpoint_tag("all:rag", source="arxiv", sort_op="submitted",
+                                           date=(2023, 2024), accept=False))
+
+    for other in (
+        checkpoint_tag("all:rag", source="arxiv", sort_op="lastupdate", date=(2023, 2024), accept=False),
+        checkpoint_tag("all:rag", source="arxiv", sort_op="submitted", date=(2020, 2024), accept=False),
+        checkpoint_tag("all:rag", source="arxiv", sort_op="submitted", date=(2023, 2024), accept=True),
+        checkpoint_tag("all:llm", source="arxiv", sort_op="submitted", date=(2023, 2024), accept=False),
+    ):
+        assert CrawlState.load(path, tag=other) is None
+        assert load_or_new_state(None, path, resume=True, tag=other).offset == 0
@@ -0,0 +1,31 @@
+from rag.token_cache import TokenCache
+
+
+def test_only_missing_texts_are_tokenized(tmp_path):
+    calls = []
+    def tokenize_fn(texts):
+        calls.append(list(texts))
+        return [text.lower().split() for text in texts]
+
+    cache = TokenCache("pipeline-1", path=str(tmp_path / "tokens.sqlite3"))
+    assert cache.tokenize(["Dense Retrieval", "BM25", "Dense Retrieval"], tokenize_fn) == [
+        ["dense", "retrieval"], ["bm25"], ["dense", "retrieval"]]
+    assert calls == [["Dense Retrieval", "BM25"]]
+
+    assert cache.tokenize(["BM25", "Graph Networks"], tokenize_fn) == [["bm25"], ["graph", "networks"]]
+    assert calls[-1] == ["Graph Networks"]
+    assert len(cache) == 3
+
+
+def test_tokens_persist_per_pipeline(tmp_path):
+    path = str(tmp_path / "tokens.sqlite3")
+    TokenCache("pipeline-1", path=path).tokenize(["Dense Retrieval"], lambda texts: [["dense", "retrieval"]])
+
+    def fail(texts):
+        raise AssertionError(f"tokenized again: {texts}")
+    assert TokenCache("pipeline-1", path=path).tokenize(["Dense Retrieval"], fail) == [["dense", "retrieval"]]
+
+    # Another tokenizer version never sees these tokens
+    other = TokenCache("pipeline-2", path=path)
+    assert len(other) == 0
+    assert other.tokenize(["Dense Retrieval"], lambda texts: [["dense", "retriev"]]) == [["dense", "retriev"]]